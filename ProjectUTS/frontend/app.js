@@ -7,6 +7,7 @@
  * - CRUD Buku, Anggota, Peminjaman
  * - Dashboard dengan statistik
  * - Real-time data fetching
+ * - Incremental list sync via the change feed
  */
 
 // =============================================================================
@@ -23,6 +24,8 @@ const ENDPOINTS = {
     buku: `${API_BASE_URL}/buku/`,
     anggota: `${API_BASE_URL}/anggota/`,
     peminjaman: `${API_BASE_URL}/peminjaman/`,
+    changes: `${API_BASE_URL}/changes/`,
+    stream: `${API_BASE_URL}/stream/`,
 };
 
 
@@ -40,6 +43,18 @@ let state = {
     peminjaman: [],
 };
 
+/**
+ * Local copies of the unfiltered lists (Map id -> item), kept up to date
+ * from the change feed so switching pages only moves the deltas.
+ * A list is null until it is loaded, or after the server asks for a reload.
+ */
+let synced = {
+    seq: null,
+    buku: null,
+    anggota: null,
+    peminjaman: null,
+};
+
 
 // =============================================================================
 // UTILITY FUNCTIONS
@@ -95,6 +110,11 @@ async function refreshAccessToken() {
             const data = await response.json();
             state.accessToken = data.access;
             localStorage.setItem('accessToken', data.access);
+            // Refresh token dirotasi: token lama sudah dicabut server
+            if (data.refresh) {
+                state.refreshToken = data.refresh;
+                localStorage.setItem('refreshToken', data.refresh);
+            }
             return true;
         }
         return false;
@@ -137,6 +157,104 @@ function showToast(message, type = 'info') {
     }, 5000);
 }
 
+/**
+ * Load every page of a cursor-paginated list endpoint.
+ * Returns the Response of the last request plus the merged results.
+ */
+async function fetchAllPages(url) {
+    let results = [];
+    let response;
+    let next = url;
+
+    while (next) {
+        response = await apiRequest(next);
+        if (!response.ok) break;
+
+        const data = await response.json();
+        results = results.concat(data.results);
+        next = data.next;
+    }
+
+    return { response, results };
+}
+
+/**
+ * Apply every change since the last known sequence number to the local copies.
+ * The first call only records the current sequence number. Concurrent callers
+ * share the request that is already in flight.
+ */
+let syncInFlight = null;
+function syncChanges() {
+    if (!syncInFlight) {
+        syncInFlight = fetchChanges().finally(() => { syncInFlight = null; });
+    }
+    return syncInFlight;
+}
+
+async function fetchChanges() {
+    let more = true;
+
+    while (more) {
+        const url = synced.seq === null ? ENDPOINTS.changes : `${ENDPOINTS.changes}?since=${synced.seq}`;
+        const response = await apiRequest(url);
+        if (!response.ok) return false;
+
+        const data = await response.json();
+        if (data.reset) {
+            synced.buku = synced.anggota = synced.peminjaman = null;
+        }
+        data.results.forEach(applyChange);
+        synced.seq = data.seq;
+        more = data.ada_lanjutan;
+    }
+
+    return true;
+}
+
+/**
+ * Apply a single change feed entry to its local copy
+ */
+function applyChange(change) {
+    if (change.aksi === 'reset') {
+        synced[change.model] = null;
+        return;
+    }
+
+    const items = synced[change.model];
+    if (!items) return;
+
+    if (change.aksi === 'hapus') {
+        items.delete(change.id);
+    } else {
+        items.set(change.id, change.data);
+    }
+}
+
+const SYNCED_ORDER = {
+    buku: (a, b) => a.id - b.id,
+    anggota: (a, b) => a.id - b.id,
+    peminjaman: (a, b) => b.tanggal_pinjam.localeCompare(a.tanggal_pinjam) || b.id - a.id,
+};
+
+/**
+ * Return the full, up-to-date list for a model.
+ * Loads it once, afterwards only the change feed is fetched.
+ */
+async function getSyncedList(model) {
+    // Sync first: changes made during the full load are replayed on the next sync
+    if (!(await syncChanges())) return null;
+
+    if (!synced[model]) {
+        // Loans without nested buku/anggota, same shape as the change feed
+        const url = model === 'peminjaman' ? `${ENDPOINTS.peminjaman}?expand=` : ENDPOINTS[model];
+        const { response, results } = await fetchAllPages(url);
+        if (!response.ok) return null;
+        synced[model] = new Map(results.map(item => [item.id, item]));
+    }
+
+    return [...synced[model].values()].sort(SYNCED_ORDER[model]);
+}
+
 /**
  * Format date to Indonesian format
  */
@@ -308,6 +426,8 @@ function logout() {
     localStorage.removeItem('accessToken');
     localStorage.removeItem('refreshToken');
     localStorage.removeItem('user');
+    synced = { seq: null, buku: null, anggota: null, peminjaman: null };
+    stopLiveUpdates();
 
     document.getElementById('main-app').classList.add('hidden');
     document.getElementById('login-page').classList.remove('hidden');
@@ -348,6 +468,7 @@ function showMainApp() {
     document.getElementById('main-app').classList.remove('hidden');
     updateUserDisplay();
     loadDashboard();
+    startLiveUpdates();
 }
 
 /**
@@ -454,11 +575,7 @@ async function loadDashboard() {
         if (response.ok) {
             const data = await response.json();
 
-            // Update stats
-            document.getElementById('stat-total-buku').textContent = data.total_buku;
-            document.getElementById('stat-total-anggota').textContent = data.total_anggota;
-            document.getElementById('stat-dipinjam').textContent = data.total_dipinjam;
-            document.getElementById('stat-tersedia').textContent = data.buku_tersedia;
+            renderDashboardStats(data);
 
             // Load active loans
             loadActiveLoans();
@@ -469,14 +586,58 @@ async function loadDashboard() {
     }
 }
 
+/**
+ * Update the dashboard stat cards
+ */
+function renderDashboardStats(data) {
+    document.getElementById('stat-total-buku').textContent = data.total_buku;
+    document.getElementById('stat-total-anggota').textContent = data.total_anggota;
+    document.getElementById('stat-dipinjam').textContent = data.total_dipinjam;
+    document.getElementById('stat-tersedia').textContent = data.buku_tersedia;
+}
+
+/**
+ * Live dashboard updates over Server-Sent Events (only served under ASGI).
+ * The browser reconnects by itself and resends the last event id. If the
+ * server cannot stream (e.g. runserver/WSGI answers 501) the dashboard
+ * simply keeps loading on navigation as before.
+ */
+let liveSource = null;
+function startLiveUpdates() {
+    if (liveSource || typeof EventSource === 'undefined') return;
+
+    liveSource = new EventSource(ENDPOINTS.stream);
+    liveSource.addEventListener('dashboard', (e) => {
+        renderDashboardStats(JSON.parse(e.data));
+    });
+    // A loan was borrowed, returned or removed (or the server asks for a reload);
+    // a burst of events only reloads the active loans once
+    let refreshTimer = null;
+    const refreshLoans = () => {
+        clearTimeout(refreshTimer);
+        refreshTimer = setTimeout(() => {
+            if (state.currentPage === 'dashboard') loadActiveLoans();
+        }, 300);
+    };
+    liveSource.addEventListener('peminjaman', refreshLoans);
+    liveSource.addEventListener('reset', refreshLoans);
+}
+
+function stopLiveUpdates() {
+    if (liveSource) {
+        liveSource.close();
+        liveSource = null;
+    }
+}
+
 /**
  * Load active loans for dashboard
  */
 async function loadActiveLoans() {
     try {
-        const response = await apiRequest(`${ENDPOINTS.peminjaman}?status=aktif`);
+        const response = await apiRequest(`${ENDPOINTS.peminjaman}?status=aktif&page_size=5`);
         if (response.ok) {
-            const data = await response.json();
+            const data = (await response.json()).results;
             const container = document.getElementById('active-loans-list');
 
             if (data.length === 0) {
@@ -517,21 +678,25 @@ async function loadActiveLoans() {
  */
 async function loadBuku() {
     try {
-        let url = ENDPOINTS.buku;
         const search = document.getElementById('buku-search')?.value;
         const filter = document.getElementById('buku-filter')?.value;
 
-        const params = new URLSearchParams();
-        if (search) params.append('search', search);
-        if (filter) params.append('available', filter);
-
-        if (params.toString()) url += `?${params.toString()}`;
-
-        const response = await apiRequest(url);
-        if (response.ok) {
-            state.buku = await response.json();
-            renderBukuTable();
+        let results;
+        if (search) {
+            // Full-text search (ranked by relevance) stays on the server
+            const params = new URLSearchParams({ search });
+            if (filter) params.append('available', filter);
+            const { response, results: found } = await fetchAllPages(`${ENDPOINTS.buku}?${params.toString()}`);
+            if (!response.ok) return;
+            results = found;
+        } else {
+            results = await getSyncedList('buku');
+            if (!results) return;
+            if (filter) results = results.filter(b => b.is_available === (filter === 'true'));
         }
+
+        state.buku = results;
+        renderBukuTable();
     } catch (error) {
         console.error('Failed to load buku:', error);
         showToast('Gagal memuat data buku', 'error');
@@ -699,16 +864,22 @@ async function deleteBuku(id) {
  */
 async function loadAnggota() {
     try {
-        let url = ENDPOINTS.anggota;
         const search = document.getElementById('anggota-search')?.value;
 
-        if (search) url += `?search=${encodeURIComponent(search)}`;
-
-        const response = await apiRequest(url);
-        if (response.ok) {
-            state.anggota = await response.json();
-            renderAnggotaGrid();
+        let results;
+        if (search) {
+            const { response, results: found } = await fetchAllPages(
+                `${ENDPOINTS.anggota}?search=${encodeURIComponent(search)}`
+            );
+            if (!response.ok) return;
+            results = found;
+        } else {
+            results = await getSyncedList('anggota');
+            if (!results) return;
         }
+
+        state.anggota = results;
+        renderAnggotaGrid();
     } catch (error) {
         console.error('Failed to load anggota:', error);
         showToast('Gagal memuat data anggota', 'error');
@@ -870,16 +1041,14 @@ async function deleteAnggota(id) {
  */
 async function loadPeminjaman() {
     try {
-        let url = ENDPOINTS.peminjaman;
         const filter = document.getElementById('peminjaman-filter')?.value;
 
-        if (filter) url += `?status=${filter}`;
+        // Book titles and member names come from the synced lists
+        const results = await getSyncedList('peminjaman');
+        if (!results || !(await getSyncedList('buku')) || !(await getSyncedList('anggota'))) return;
 
-        const response = await apiRequest(url);
-        if (response.ok) {
-            state.peminjaman = await response.json();
-            renderPeminjamanTable();
-        }
+        state.peminjaman = filter ? results.filter(p => p.status_peminjaman === filter) : results;
+        renderPeminjamanTable();
     } catch (error) {
         console.error('Failed to load peminjaman:', error);
         showToast('Gagal memuat data peminjaman', 'error');
@@ -907,8 +1076,8 @@ function renderPeminjamanTable() {
     tbody.innerHTML = state.peminjaman.map(p => `
         <tr>
             <td>#${p.id}</td>
-            <td><strong>${p.buku_detail?.judul || 'Buku #' + p.buku}</strong></td>
-            <td>${p.anggota_detail?.nama || 'Anggota #' + p.anggota}</td>
+            <td><strong>${synced.buku?.get(p.buku)?.judul || 'Buku #' + p.buku}</strong></td>
+            <td>${synced.anggota?.get(p.anggota)?.nama || 'Anggota #' + p.anggota}</td>
             <td>${formatDate(p.tanggal_pinjam)}</td>
             <td>${formatDate(p.tanggal_kembali)}</td>
             <td>
@@ -946,18 +1115,17 @@ function filterPeminjaman() {
 async function loadPeminjamanFormData() {
     try {
         // Load available books
-        const bukuResponse = await apiRequest(`${ENDPOINTS.buku}?available=true`);
-        if (bukuResponse.ok) {
-            const bukuList = await bukuResponse.json();
+        const bukuList = await getSyncedList('buku');
+        if (bukuList) {
             const bukuSelect = document.getElementById('peminjaman-buku');
             bukuSelect.innerHTML = '<option value="">-- Pilih Buku --</option>' +
-                bukuList.map(b => `<option value="${b.id}">${b.judul} - ${b.penulis}</option>`).join('');
+                bukuList.filter(b => b.is_available)
+                    .map(b => `<option value="${b.id}">${b.judul} - ${b.penulis}</option>`).join('');
         }
 
         // Load anggota
-        const anggotaResponse = await apiRequest(ENDPOINTS.anggota);
-        if (anggotaResponse.ok) {
-            const anggotaList = await anggotaResponse.json();
+        const anggotaList = await getSyncedList('anggota');
+        if (anggotaList) {
             const anggotaSelect = document.getElementById('peminjaman-anggota');
             anggotaSelect.innerHTML = '<option value="">-- Pilih Anggota --</option>' +
                 anggotaList.map(a => `<option value="${a.id}">${a.nama} (${a.email})</option>`).join('');
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 from datetime import timedelta
 
@@ -46,6 +47,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Paling luar agar latensi & query seluruh request ikut terukur (/api/metrics/)
+    'iventaris_app.metrics.MetrikMiddleware',
+    'iventaris_app.routers.PrimerMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -83,9 +87,76 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    },
+    # Replika baca lokal: salinan db.sqlite3 yang diperbarui `manage.py sync_replica`
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db_replica.sqlite3',
+        'TEST': {'MIRROR': 'default'},
+    },
 }
 
+# Alias replika yang menerima query baca (lihat iventaris_app/routers.py).
+# Kosong = semua query ke default. Contoh: DATABASE_REPLICAS=replica
+DATABASE_REPLICAS = [a for a in os.environ.get('DATABASE_REPLICAS', '').split(',') if a]
+
+DATABASE_ROUTERS = ['iventaris_app.routers.ReplikaRouter']
+
+# Cache bersama antar worker. Tanpa REDIS_URL memakai cache memori per proses.
+# - default: cache best-effort (respons API anonim, fragmen template), boleh
+#   menggusur entri saat penuh.
+# - keamanan: refresh token yang dicabut & versi user JWT. Tidak boleh
+#   menggusur entri yang masih berlaku (lihat iventaris_app/cache_backends.py);
+#   dengan Redis pakai instance terpisah ber-maxmemory-policy noeviction
+#   (REDIS_KEAMANAN_URL, default REDIS_URL).
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        },
+        'keamanan': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ.get('REDIS_KEAMANAN_URL', os.environ['REDIS_URL']),
+            'KEY_PREFIX': 'keamanan',
+        },
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        },
+        'keamanan': {
+            'BACKEND': 'iventaris_app.cache_backends.CacheTanpaGusur',
+            'LOCATION': 'keamanan',
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        },
+    }
+
+
+# Umur maksimal respons API anonim di cache (detik). Penulisan data langsung
+# membuat kunci baru (lihat iventaris_app/versions.py), jadi ini hanya batas memori.
+API_CACHE_TIMEOUT = 300
+
+# Lama pinjam default (hari): jatuh tempo = tanggal pinjam + LAMA_PINJAM_HARI
+LAMA_PINJAM_HARI = 14
+
+# Peminjaman yang selesai lebih dari ARSIP_SETELAH_HARI hari lalu dipindah ke
+# tabel arsip oleh `manage.py archive_loans` (lihat iventaris_app/arsip.py)
+ARSIP_SETELAH_HARI = 365
+
+# Entri log perubahan (/api/changes/) yang lebih tua dari ini dibuang oleh
+# `manage.py compact_changes`; klien yang tertinggal lebih lama memuat ulang
+PERUBAHAN_RETENSI_HARI = 7
+
+# Stream SSE /api/stream/ (lihat iventaris_app/events.py): interval periksa
+# perubahan dari proses lain, heartbeat, antrian per klien, dan batas koneksi
+SSE_INTERVAL_DETIK = 2
+SSE_HEARTBEAT_DETIK = 15
+SSE_ANTRIAN = 64
+SSE_MAKS_KLIEN = 10000
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -135,13 +206,22 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'iventaris_app.authentication.CachedJWTAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ],
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    # Token bucket per route (lihat iventaris_app/throttling.py): kapasitas/periode isi ulang
+    'DEFAULT_THROTTLE_RATES': {
+        'login.ip': '20/min',
+        'login.username': '5/min',
+        'register.ip': '5/min',
+    },
+    # Jumlah reverse proxy tepercaya di depan aplikasi. Tanpa nilai ini
+    # X-Forwarded-For tidak dipercaya dan throttle per IP memakai REMOTE_ADDR.
+    'NUM_PROXIES': int(os.environ['NUM_PROXIES']) if os.environ.get('NUM_PROXIES') else None,
 }
 
 
@@ -156,8 +236,14 @@ SIMPLE_JWT = {
     'BLACKLIST_AFTER_ROTATION': True,
     'AUTH_HEADER_TYPES': ('Bearer',),
     'AUTH_TOKEN_CLASSES': ('rest_framework_simplejwt.tokens.AccessToken',),
+    # Refresh token lama dicabut lewat cache, bukan app token_blacklist
+    'TOKEN_REFRESH_SERIALIZER': 'iventaris_app.serializers.RefreshTokenSerializer',
 }
 
+# Cache user hasil autentikasi JWT per proses (lihat iventaris_app/authentication.py)
+JWT_USER_CACHE_MAKS = 1024
+JWT_USER_CACHE_TTL = 300  # detik
+
 
 # =============================================================================
 # DRF SPECTACULAR (SWAGGER) CONFIGURATION
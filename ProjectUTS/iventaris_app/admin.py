@@ -1,6 +1,16 @@
-from .models import Buku, Anggota, Peminjaman
+from .models import Buku, Anggota, Peminjaman, PeminjamanArsip
 from django.contrib import admin
 
 admin.site.register(Buku)
 admin.site.register(Anggota)
-admin.site.register(Peminjaman)
+
+
+@admin.register(Peminjaman)
+class PeminjamanAdmin(admin.ModelAdmin):
+    # __str__ memakai judul buku & nama anggota: join agar tidak query per baris
+    list_select_related = ('buku', 'anggota')
+
+
+@admin.register(PeminjamanArsip)
+class PeminjamanArsipAdmin(admin.ModelAdmin):
+    list_select_related = ('buku', 'anggota')
@@ -1,22 +1,26 @@
 from rest_framework.routers import DefaultRouter
-from rest_framework_simplejwt.views import (
-    TokenObtainPairView,
-    TokenRefreshView,
-)
+from rest_framework_simplejwt.views import TokenRefreshView
 from drf_spectacular.views import (
     SpectacularAPIView,
     SpectacularSwaggerView,
     SpectacularRedocView,
 )
 from django.urls import path, include
+from . import async_views
 from .views import (
     BukuViewSet,
     AnggotaViewSet,
     PeminjamanViewSet,
     DashboardAPIView,
+    AnalitikPeminjamanAPIView,
+    BukuTerpopulerAPIView,
+    AnggotaTeraktifAPIView,
+    PerubahanAPIView,
+    LoginAPIView,
     RegisterAPIView,
     UserProfileAPIView,
     KembalikanPeminjamanAPIView,
+    metrik,
 )
 
 # Router untuk ViewSets
@@ -27,7 +31,7 @@ router.register(r'peminjaman', PeminjamanViewSet, basename='peminjaman')
 
 urlpatterns = [
     # ===== Authentication Endpoints =====
-    path('auth/login/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
+    path('auth/login/', LoginAPIView.as_view(), name='token_obtain_pair'),
     path('auth/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('auth/register/', RegisterAPIView.as_view(), name='register'),
     path('auth/profile/', UserProfileAPIView.as_view(), name='user_profile'),
@@ -35,9 +39,33 @@ urlpatterns = [
     # ===== Dashboard Endpoint =====
     path('dashboard/', DashboardAPIView.as_view(), name='api-dashboard'),
     
+    # ===== Analitik (tabel rekap) =====
+    path('analitik/peminjaman/', AnalitikPeminjamanAPIView.as_view(), name='api-analitik-peminjaman'),
+    path('analitik/buku-terpopuler/', BukuTerpopulerAPIView.as_view(), name='api-analitik-buku'),
+    path('analitik/anggota-teraktif/', AnggotaTeraktifAPIView.as_view(), name='api-analitik-anggota'),
+    
+    # ===== Log Perubahan (sinkronisasi inkremental) =====
+    path('changes/', PerubahanAPIView.as_view(), name='api-changes'),
+    
     # ===== Peminjaman Actions =====
     path('peminjaman/<int:pk>/kembalikan/', KembalikanPeminjamanAPIView.as_view(), name='api-kembalikan'),
     
+    # ===== Endpoint Baca Async (ASGI) =====
+    path('async/dashboard/', async_views.dashboard, name='api-async-dashboard'),
+    path('async/buku/', async_views.buku_list, name='api-async-buku-list'),
+    path('async/buku/<int:pk>/', async_views.buku_detail, name='api-async-buku-detail'),
+    path('async/anggota/', async_views.anggota_list, name='api-async-anggota-list'),
+    path('async/anggota/<int:pk>/', async_views.anggota_detail, name='api-async-anggota-detail'),
+    path('async/anggota/<int:pk>/riwayat/', async_views.anggota_riwayat, name='api-async-anggota-riwayat'),
+    path('async/peminjaman/', async_views.peminjaman_list, name='api-async-peminjaman-list'),
+    path('async/peminjaman/<int:pk>/', async_views.peminjaman_detail, name='api-async-peminjaman-detail'),
+    
+    # ===== Stream Live (SSE, ASGI) =====
+    path('stream/', async_views.stream, name='api-stream'),
+    
+    # ===== Monitoring =====
+    path('metrics/', metrik, name='api-metrics'),
+    
     # ===== Swagger/OpenAPI Documentation =====
     path('schema/', SpectacularAPIView.as_view(), name='schema'),
     path('docs/', SpectacularSwaggerView.as_view(url_name='schema'), name='swagger-ui'),
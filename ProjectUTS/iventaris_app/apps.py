@@ -3,3 +3,6 @@ from django.apps import AppConfig
 class IventarisAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'iventaris_app'
+
+    def ready(self):
+        from . import metrics, signals  # noqa: F401
@@ -0,0 +1,80 @@
+"""
+Pemisahan tabel panas / arsip untuk peminjaman selesai.
+
+Peminjaman yang sudah selesai lebih lama dari ARSIP_SETELAH_HARI dipindahkan
+dari tabel Peminjaman ke PeminjamanArsip (`manage.py archive_loans`, jalankan
+berkala). Tabel Peminjaman yang dipakai transaksi harian (pinjam, kembalikan,
+daftar aktif, terlambat) tetap kecil, sedangkan riwayat anggota dan ekspor
+membaca kedua tabel. Id asli dipertahankan di arsip.
+
+Setiap batch dipindah dalam satu transaksi: bulk_create ke arsip lalu DELETE
+langsung dari tabel panas (tanpa signal), karena isi gabungan kedua tabel
+tidak berubah: penghitung selesai dan tabel rekap tetap sama, hanya
+penghitung `peminjaman_arsip` yang bertambah. Di log perubahan peminjaman
+yang diarsipkan tercatat sebagai hapus, karena tidak lagi ada di daftar
+peminjaman.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import changes, counters, versions
+from .models import Peminjaman, PeminjamanArsip
+
+
+UKURAN_BATCH = 500
+
+
+def batas_default():
+    """Peminjaman yang selesai sebelum tanggal ini boleh diarsipkan"""
+    return timezone.localdate() - timedelta(days=getattr(settings, 'ARSIP_SETELAH_HARI', 365))
+
+
+def kandidat(sebelum):
+    """Peminjaman selesai yang dikembalikan (atau dipinjam, jika tanggal kembali kosong) sebelum `sebelum`"""
+    return Peminjaman.objects.filter(status_peminjaman='selesai').filter(
+        Q(tanggal_kembali__lt=sebelum) | Q(tanggal_kembali__isnull=True, tanggal_pinjam__lt=sebelum)
+    )
+
+
+def _pindahkan(batch):
+    kolom = [f.attname for f in PeminjamanArsip._meta.concrete_fields]
+    PeminjamanArsip.objects.bulk_create(
+        [PeminjamanArsip(**{k: getattr(p, k) for k in kolom}) for p in batch]
+    )
+    ids = [p.pk for p in batch]
+    q = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {q(Peminjaman._meta.db_table)} WHERE {q("id")} IN ({", ".join(["%s"] * len(ids))})',
+            ids,
+        )
+    counters.ubah({counters.PEMINJAMAN_ARSIP: len(ids)})
+    changes.catat([(Peminjaman, pk, changes.HAPUS) for pk in ids])
+    versions.naikkan(versions.PEMINJAMAN)
+
+
+def arsipkan(sebelum=None, ukuran_batch=UKURAN_BATCH, progress=None):
+    """
+    Pindahkan semua kandidat ke arsip, `ukuran_batch` baris per transaksi.
+    `progress(jumlah)` dipanggil setelah setiap batch. Mengembalikan total.
+    """
+    sebelum = sebelum or batas_default()
+    total = terakhir = 0
+    while True:
+        with transaction.atomic():
+            # Keyset per id (index peminjaman_status_id_idx): setiap batch
+            # melanjutkan dari batch sebelumnya tanpa memindai & mengurutkan
+            # ulang semua peminjaman selesai
+            batch = list(kandidat(sebelum).filter(id__gt=terakhir).order_by('id')[:ukuran_batch])
+            if not batch:
+                break
+            _pindahkan(batch)
+        terakhir = batch[-1].pk
+        total += len(batch)
+        if progress:
+            progress(total)
+    return total
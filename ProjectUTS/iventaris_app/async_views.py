@@ -0,0 +1,171 @@
+"""
+Endpoint baca API versi async untuk dijalankan di bawah ASGI (uvicorn, daphne).
+
+View DRF selalu sinkron, sehingga di bawah ASGI setiap request tetap memakai
+satu thread selama menunggu database. View di sini berupa view async Django
+biasa yang memakai ORM async dan menghasilkan JSON yang sama persis dengan
+endpoint sync-nya (serializer, filter, cursor pagination dan ETag yang sama).
+Serializer tidak melakukan query karena semua nilai turunan sudah dianotasi
+di queryset. Hanya GET/HEAD dan hanya JSON; tulis tetap lewat endpoint DRF.
+"""
+from functools import wraps
+
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET, require_safe
+from rest_framework.exceptions import APIException
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from . import counters, events, versions
+from .models import Anggota
+from .pagination import AnggotaPagination, BukuPagination, PeminjamanPagination
+from .serializers import AnggotaSerializer, BukuSerializer, DashboardSerializer, PeminjamanSerializer
+from .views import (
+    filter_anggota, filter_buku, filter_peminjaman, queryset_anggota, queryset_buku, queryset_peminjaman,
+    queryset_riwayat,
+)
+
+
+def _json(data, status=200):
+    return HttpResponse(JSONRenderer().render(data), status=status, content_type='application/json')
+
+
+def _tidak_ditemukan(model):
+    # Pesan sama dengan Http404 dari DRF
+    return _json({'detail': f'No {model._meta.object_name} matches the given query.'}, status=404)
+
+
+def _api(view_func):
+    """Bungkus request Django sebagai Request DRF dan ubah APIException jadi JSON"""
+    @wraps(view_func)
+    async def wrapper(request, *args, **kwargs):
+        try:
+            return await view_func(Request(request), *args, **kwargs)
+        except APIException as e:
+            return _json({'detail': e.detail}, status=e.status_code)
+    return wrapper
+
+
+async def _daftar(request, queryset, paginator, serializer_class):
+    page = await paginator.apaginate_queryset(queryset, request)
+    data = serializer_class(page, many=True, context={'request': request}).data
+    return _json(paginator.get_paginated_response(data).data)
+
+
+async def _detail(request, queryset, pk, serializer_class):
+    obj = await queryset.filter(pk=pk).afirst()
+    if obj is None:
+        return _tidak_ditemukan(queryset.model)
+    return _json(serializer_class(obj, context={'request': request}).data)
+
+
+# =============================================================================
+# DASHBOARD
+# =============================================================================
+
+@require_safe
+async def dashboard(request):
+    """Statistik dashboard dari tabel Penghitung (lihat DashboardAPIView)"""
+    data = await counters.adata_dashboard()
+
+    async def buat_respons():
+        return _json(DashboardSerializer(data, context={'request': request}).data)
+
+    return await versions.arespons_kondisional(request, data, buat_respons)
+
+
+# =============================================================================
+# BUKU
+# =============================================================================
+
+@require_safe
+@versions.kondisional(versions.BUKU, versions.PEMINJAMAN)
+@_api
+async def buku_list(request):
+    queryset = filter_buku(queryset_buku(request.query_params), request.query_params)
+    return await _daftar(request, queryset, BukuPagination(), BukuSerializer)
+
+
+@require_safe
+@versions.kondisional(versions.BUKU, versions.PEMINJAMAN)
+@_api
+async def buku_detail(request, pk):
+    return await _detail(request, queryset_buku(request.query_params), pk, BukuSerializer)
+
+
+# =============================================================================
+# ANGGOTA
+# =============================================================================
+
+@require_safe
+@versions.kondisional(versions.ANGGOTA, versions.PEMINJAMAN)
+@_api
+async def anggota_list(request):
+    queryset = filter_anggota(queryset_anggota(request.query_params), request.query_params)
+    return await _daftar(request, queryset, AnggotaPagination(), AnggotaSerializer)
+
+
+@require_safe
+@versions.kondisional(versions.ANGGOTA, versions.PEMINJAMAN)
+@_api
+async def anggota_detail(request, pk):
+    return await _detail(request, queryset_anggota(request.query_params), pk, AnggotaSerializer)
+
+
+@require_safe
+@versions.kondisional(versions.BUKU, versions.ANGGOTA, versions.PEMINJAMAN)
+@_api
+async def anggota_riwayat(request, pk):
+    """Riwayat peminjaman anggota (lihat AnggotaViewSet.riwayat)"""
+    if not await Anggota.objects.filter(pk=pk).aexists():
+        return _tidak_ditemukan(Anggota)
+    querysets = [qs.filter(anggota_id=pk) for qs in queryset_riwayat(request.query_params)]
+    paginator = PeminjamanPagination()
+    page = await paginator.apaginate_querysets(querysets, request)
+    data = PeminjamanSerializer(page, many=True, context={'request': request}).data
+    return _json(paginator.get_paginated_response(data).data)
+
+
+# =============================================================================
+# PEMINJAMAN
+# =============================================================================
+
+@require_safe
+@versions.kondisional(versions.BUKU, versions.ANGGOTA, versions.PEMINJAMAN)
+@_api
+async def peminjaman_list(request):
+    queryset = filter_peminjaman(queryset_peminjaman(request.query_params), request.query_params)
+    return await _daftar(request, queryset, PeminjamanPagination(), PeminjamanSerializer)
+
+
+@require_safe
+@versions.kondisional(versions.BUKU, versions.ANGGOTA, versions.PEMINJAMAN)
+@_api
+async def peminjaman_detail(request, pk):
+    return await _detail(request, queryset_peminjaman(request.query_params), pk, PeminjamanSerializer)
+
+
+# =============================================================================
+# STREAM (SSE)
+# =============================================================================
+
+@require_GET
+async def stream(request):
+    """Event dashboard & peminjaman live lewat Server-Sent Events (lihat events.py)"""
+    if not isinstance(request, ASGIRequest):
+        # Di bawah WSGI setiap koneksi akan memegang satu thread selamanya
+        return _json({'detail': 'Stream hanya tersedia lewat server ASGI (iventaris/asgi.py).'}, status=501)
+    pelanggan = events.hub.berlangganan()
+    if pelanggan is None:
+        return _json({'detail': 'Terlalu banyak koneksi stream, coba lagi nanti.'}, status=503)
+    try:
+        awal = await events.pembuka(request.headers.get('last-event-id'))
+    except BaseException:
+        events.hub.berhenti(pelanggan)
+        raise
+    response = StreamingHttpResponse(events.alirkan(pelanggan, awal), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Jangan ditahan buffer reverse proxy (nginx)
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,130 @@
+"""
+Autentikasi JWT dengan cache user.
+
+JWTAuthentication bawaan simplejwt membaca baris User dari database di setiap
+request, padahal id user sudah ada di token. CachedJWTAuthentication
+menyimpan user hasil lookup di cache LRU per proses (ukuran & umur terbatas),
+dengan kunci id user + versi user. Versi disimpan di cache `keamanan` dan
+dinaikkan setiap kali user, grup, atau permission-nya berubah (lihat
+signals.py), sehingga perubahan dari profil API maupun admin langsung
+berlaku tanpa menunggu TTL. Dengan beberapa worker, CACHES harus berupa
+cache bersama (mis. Redis) agar versi terlihat oleh semua proses.
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from .cache_backends import keamanan
+
+
+KUNCI_VERSI_SEMUA = 'auth:user:versi'
+
+
+def _kunci_versi(user_id):
+    return f'auth:user:versi:{user_id}'
+
+
+class CacheUser:
+    """Cache LRU dengan TTL, aman dipakai banyak thread"""
+
+    def __init__(self, maks, ttl):
+        self.maks = maks
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._data = OrderedDict()  # kunci -> (kedaluwarsa, user)
+
+    def ambil(self, kunci):
+        with self._lock:
+            isi = self._data.get(kunci)
+            if isi is None:
+                return None
+            if isi[0] <= time.monotonic():
+                del self._data[kunci]
+                return None
+            self._data.move_to_end(kunci)
+            return isi[1]
+
+    def simpan(self, kunci, user):
+        with self._lock:
+            self._data[kunci] = (time.monotonic() + self.ttl, user)
+            self._data.move_to_end(kunci)
+            while len(self._data) > self.maks:
+                self._data.popitem(last=False)
+
+    def kosongkan(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+cache_user = CacheUser(
+    maks=getattr(settings, 'JWT_USER_CACHE_MAKS', 1024),
+    ttl=getattr(settings, 'JWT_USER_CACHE_TTL', 300),
+)
+
+
+def _naikkan(kunci):
+    keamanan().set(kunci, time.time_ns(), None)
+
+
+def invalidasi_user(user_id):
+    """
+    Buang user dari cache semua proses. Dinaikkan lagi setelah commit agar
+    request lain tidak sempat menyimpan data lama dengan versi baru.
+    """
+    kunci = _kunci_versi(user_id)
+    _naikkan(kunci)
+    transaction.on_commit(lambda: _naikkan(kunci))
+
+
+def invalidasi_semua():
+    """Buang semua user dari cache (mis. permission sebuah grup berubah)"""
+    _naikkan(KUNCI_VERSI_SEMUA)
+    transaction.on_commit(lambda: _naikkan(KUNCI_VERSI_SEMUA))
+
+
+def _versi(*kunci):
+    cache = keamanan()
+    versi = cache.get_many(kunci)
+    for k in kunci:
+        if k not in versi:
+            # Versi yang hilang (belum ada atau tergusur dari cache) diberi
+            # nilai baru, jangan 0, agar tidak cocok lagi dengan entri lama
+            cache.add(k, time.time_ns(), None)
+            versi[k] = cache.get(k)
+    return tuple(versi[k] for k in kunci)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication yang melewati query User selama cache masih berlaku"""
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_('Token contained no recognizable user identification'))
+
+        kunci = (str(user_id),) + _versi(_kunci_versi(user_id), KUNCI_VERSI_SEMUA)
+        user = cache_user.ambil(kunci)
+        if user is None:
+            # Lookup + cek is_active & revoke token dari simplejwt
+            user = super().get_user(validated_token)
+            cache_user.simpan(kunci, user)
+        elif api_settings.CHECK_REVOKE_TOKEN and validated_token.get(
+            api_settings.REVOKE_TOKEN_CLAIM
+        ) != get_md5_hash_password(user.password):
+            raise AuthenticationFailed(_("The user's password has been changed."), code='password_changed')
+
+        # Salinan per request: atribut yang ditempel view tidak bocor ke request lain
+        return copy.copy(user)
@@ -0,0 +1,349 @@
+"""
+Benchmark in-process untuk endpoint API dan template.
+
+Setiap skenario dijalankan lewat django.test.Client (tanpa jaringan) beberapa
+kali: latensi p50/p99 dari semua ulangan, jumlah query dari ulangan terakhir,
+dan puncak memori dari satu ulangan terpisah dengan tracemalloc (supaya
+tracemalloc tidak ikut memperlambat pengukuran latensi). Skenario yang
+menulis data dijalankan di dalam transaksi yang di-rollback.
+"""
+import asyncio
+import fnmatch
+import json
+import platform
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime
+
+import django
+from django.contrib.auth.models import User
+from django.db import DEFAULT_DB_ALIAS, connection, connections, transaction
+from django.test import AsyncClient, Client
+from django.test.utils import (
+    CaptureQueriesContext, setup_databases, setup_test_environment, teardown_databases, teardown_test_environment,
+)
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .models import Anggota, Buku, Peminjaman
+from .routers import replika
+from .seeder import buat_perpustakaan
+
+
+@dataclass
+class Skenario:
+    nama: str
+    url: str
+    method: str = 'get'
+    data: dict = field(default_factory=dict)
+    headers: dict = field(default_factory=dict)
+    login: bool = False
+    # Skenario yang mengubah data di-rollback setiap ulangan
+    menulis: bool = False
+
+
+def daftar_skenario():
+    """Skenario untuk data yang sedang ada di database (dipanggil setelah seeding)"""
+    buku = Buku.objects.order_by('pk').first()
+    buku_tersedia = Buku.objects.dengan_ketersediaan().filter(sudah_dipinjam=False).order_by('-pk').first()
+    anggota = (
+        Anggota.objects.dengan_total_peminjaman().order_by('-total_peminjaman', 'pk').first()
+    )
+    aktif = Peminjaman.objects.filter(status_peminjaman='aktif').order_by('-pk').first()
+    peminjaman = Peminjaman.objects.order_by('-pk').first()
+    if not (buku and anggota and peminjaman):
+        raise ValueError('Database kosong: jalankan seeder terlebih dahulu.')
+
+    skenario = [
+        # API baca
+        Skenario('api.buku.list', reverse('buku-list')),
+        Skenario('api.buku.list.available', reverse('buku-list'), data={'available': 'true'}),
+        Skenario('api.buku.search', reverse('buku-list'), data={'search': buku.judul.split()[0]}),
+        Skenario('api.buku.detail', reverse('buku-detail', args=[buku.pk])),
+        Skenario('api.anggota.list', reverse('anggota-list')),
+        Skenario('api.anggota.search', reverse('anggota-list'), data={'search': anggota.nama.split()[0]}),
+        Skenario('api.anggota.detail', reverse('anggota-detail', args=[anggota.pk])),
+        Skenario('api.anggota.riwayat', reverse('anggota-riwayat', args=[anggota.pk])),
+        Skenario('api.anggota.riwayat_export', reverse('anggota-riwayat-export', args=[anggota.pk])),
+        Skenario('api.peminjaman.list', reverse('peminjaman-list')),
+        Skenario('api.peminjaman.list.aktif', reverse('peminjaman-list'), data={'status': 'aktif'}),
+        Skenario('api.peminjaman.list.buku', reverse('peminjaman-list'), data={'buku': buku.pk}),
+        Skenario('api.peminjaman.detail', reverse('peminjaman-detail', args=[peminjaman.pk])),
+        Skenario('api.peminjaman.overdue', reverse('peminjaman-overdue')),
+        Skenario('api.peminjaman.export.anggota', reverse('peminjaman-export'), data={'anggota': anggota.pk}),
+        Skenario('api.dashboard', reverse('api-dashboard')),
+        Skenario('api.analitik.peminjaman', reverse('api-analitik-peminjaman'), data={'per': 'bulan', 'dari': '2015-01-01'}),
+        Skenario('api.analitik.buku', reverse('api-analitik-buku')),
+        Skenario('api.analitik.anggota', reverse('api-analitik-anggota')),
+        Skenario('api.auth.profile', reverse('user_profile'), login=True),
+        # Template
+        Skenario('web.dashboard', reverse('dashboard')),
+        Skenario('web.buku.list', reverse('daftar-buku')),
+        Skenario('web.buku.search', reverse('daftar-buku'), data={'q': buku.judul.split()[0]}),
+        Skenario('web.peminjaman.list', reverse('daftar-peminjaman')),
+        Skenario('web.anggota.riwayat', reverse('riwayat-peminjaman', args=[anggota.pk])),
+        # API tulis (rollback)
+        Skenario('api.buku.create', reverse('buku-list'), method='post', login=True, menulis=True,
+                 data={'judul': 'Benchmark', 'penulis': 'Benchmark', 'tahun': 2024}),
+    ]
+    if buku_tersedia:
+        skenario.append(Skenario(
+            'api.peminjaman.create', reverse('peminjaman-list'), method='post', login=True, menulis=True,
+            data={'buku': buku_tersedia.pk, 'anggota': anggota.pk, 'tanggal_pinjam': '2025-01-01'},
+        ))
+    if aktif:
+        skenario.append(Skenario(
+            'api.peminjaman.kembalikan', reverse('api-kembalikan', args=[aktif.pk]),
+            method='post', login=True, menulis=True,
+        ))
+    return skenario
+
+
+@contextmanager
+def database_benchmark(skala=None, progress=None):
+    """
+    Jalankan blok di database uji terpisah berisi perpustakaan sintetis
+    `skala` (argumen buat_perpustakaan); replika menjadi mirror-nya dan
+    database pengembangan tidak tersentuh. Tanpa `skala` blok memakai
+    database yang sedang aktif apa adanya.
+    """
+    try:
+        setup_test_environment()
+        lingkungan_uji = True
+    except RuntimeError:
+        # Sudah di dalam test runner
+        lingkungan_uji = False
+    konfigurasi_lama = None
+    try:
+        if skala is not None:
+            konfigurasi_lama = setup_databases(verbosity=0, interactive=False, serialized_aliases=())
+            if progress:
+                progress(f'Seeding {skala} ...')
+            buat_perpustakaan(**skala)
+        yield
+    finally:
+        if konfigurasi_lama is not None:
+            teardown_databases(konfigurasi_lama, verbosity=0)
+        if lingkungan_uji:
+            teardown_test_environment()
+
+
+def pilih(skenario, only=None, skip=None):
+    """Saring skenario dengan pola glob (mis. 'api.*', 'web.peminjaman.*')"""
+    if only:
+        skenario = [s for s in skenario if any(fnmatch.fnmatch(s.nama, p) for p in only)]
+    if skip:
+        skenario = [s for s in skenario if not any(fnmatch.fnmatch(s.nama, p) for p in skip)]
+    return skenario
+
+
+def persentil(nilai, p):
+    """Persentil nearest-rank dari daftar yang sudah terurut"""
+    if not nilai:
+        return 0.0
+    indeks = max(0, min(len(nilai) - 1, round(p / 100 * len(nilai) + 0.5) - 1))
+    return nilai[indeks]
+
+
+class Benchmark:
+    def __init__(self, ulangan=20, pemanasan=2):
+        self.ulangan = ulangan
+        self.pemanasan = pemanasan
+        self.client = Client()
+        self._token = None
+
+    def _header_login(self):
+        if self._token is None:
+            user, _ = User.objects.get_or_create(username='benchmark')
+            self._token = str(RefreshToken.for_user(user).access_token)
+        return {'HTTP_AUTHORIZATION': f'Bearer {self._token}'}
+
+    def _panggil(self, s):
+        extra = dict(s.headers)
+        if s.login:
+            extra.update(self._header_login())
+        if s.method == 'get':
+            response = self.client.get(s.url, s.data, **extra)
+        else:
+            response = getattr(self.client, s.method)(s.url, s.data, content_type='application/json', **extra)
+        # Respons stream (ekspor) baru selesai setelah seluruh isinya dibaca
+        if response.streaming:
+            for _ in response.streaming_content:
+                pass
+        return response
+
+    def _sekali(self, s):
+        if not s.menulis:
+            return self._panggil(s)
+        with transaction.atomic():
+            response = self._panggil(s)
+            transaction.set_rollback(True)
+        return response
+
+    def ukur(self, s):
+        for _ in range(self.pemanasan):
+            self._sekali(s)
+
+        waktu = []
+        for _ in range(self.ulangan):
+            with ExitStack() as stack:
+                # Primer & replika (lihat routers.py)
+                queries = [
+                    stack.enter_context(CaptureQueriesContext(connections[alias]))
+                    for alias in [DEFAULT_DB_ALIAS] + replika()
+                ]
+                mulai = time.perf_counter()
+                response = self._sekali(s)
+                waktu.append((time.perf_counter() - mulai) * 1000)
+            # Dihitung sekarang: log query dikosongkan lagi di request berikutnya
+            jumlah_query = sum(len(q) for q in queries)
+        waktu.sort()
+
+        tracemalloc.start()
+        try:
+            self._sekali(s)
+            _, puncak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        return {
+            'status': response.status_code,
+            'p50_ms': round(persentil(waktu, 50), 3),
+            'p99_ms': round(persentil(waktu, 99), 3),
+            'mean_ms': round(sum(waktu) / len(waktu), 3),
+            'queries': jumlah_query,
+            'peak_kb': round(puncak / 1024, 1),
+        }
+
+    def jalankan(self, skenario, progress=None):
+        hasil = {}
+        for s in skenario:
+            hasil[s.nama] = self.ukur(s)
+            if progress:
+                progress(s.nama, hasil[s.nama])
+        return hasil
+
+
+# =============================================================================
+# UJI BEBAN WSGI vs ASGI
+# =============================================================================
+
+def pasangan_async():
+    """
+    Pasangan (nama, url WSGI/DRF, url ASGI/async) untuk endpoint baca yang
+    punya versi async (lihat async_views.py).
+    """
+    buku = Buku.objects.order_by('pk').first()
+    anggota = Anggota.objects.dengan_total_peminjaman().order_by('-total_peminjaman', 'pk').first()
+    peminjaman = Peminjaman.objects.order_by('-pk').first()
+    if not (buku and anggota and peminjaman):
+        raise ValueError('Database kosong: jalankan seeder terlebih dahulu.')
+    return [
+        ('dashboard', reverse('api-dashboard'), reverse('api-async-dashboard')),
+        ('buku.list', reverse('buku-list'), reverse('api-async-buku-list')),
+        ('buku.detail', reverse('buku-detail', args=[buku.pk]), reverse('api-async-buku-detail', args=[buku.pk])),
+        ('anggota.list', reverse('anggota-list'), reverse('api-async-anggota-list')),
+        ('anggota.riwayat', reverse('anggota-riwayat', args=[anggota.pk]),
+         reverse('api-async-anggota-riwayat', args=[anggota.pk])),
+        ('peminjaman.list', reverse('peminjaman-list'), reverse('api-async-peminjaman-list')),
+        ('peminjaman.detail', reverse('peminjaman-detail', args=[peminjaman.pk]),
+         reverse('api-async-peminjaman-detail', args=[peminjaman.pk])),
+    ]
+
+
+def _ringkas(waktu, status, durasi):
+    waktu.sort()
+    return {
+        'rps': round(len(waktu) / durasi, 1) if durasi else 0.0,
+        'p50_ms': round(persentil(waktu, 50), 3),
+        'p99_ms': round(persentil(waktu, 99), 3),
+        'gagal': sum(1 for s in status if s >= 400),
+    }
+
+
+def beban_wsgi(url, konkurensi, jumlah):
+    """`jumlah` GET ke `url` lewat handler WSGI oleh `konkurensi` thread sekaligus"""
+    lokal = threading.local()
+
+    def satu(_):
+        if not hasattr(lokal, 'client'):
+            lokal.client = Client()
+        mulai = time.perf_counter()
+        response = lokal.client.get(url)
+        return (time.perf_counter() - mulai) * 1000, response.status_code
+
+    with ThreadPoolExecutor(max_workers=konkurensi) as pool:
+        mulai = time.perf_counter()
+        hasil = list(pool.map(satu, range(jumlah)))
+        durasi = time.perf_counter() - mulai
+    return _ringkas([w for w, _ in hasil], [s for _, s in hasil], durasi)
+
+
+async def _beban_asgi(url, konkurensi, jumlah):
+    client = AsyncClient()
+    batas = asyncio.Semaphore(konkurensi)
+
+    async def satu():
+        async with batas:
+            mulai = time.perf_counter()
+            response = await client.get(url)
+            return (time.perf_counter() - mulai) * 1000, response.status_code
+
+    mulai = time.perf_counter()
+    hasil = await asyncio.gather(*(satu() for _ in range(jumlah)))
+    durasi = time.perf_counter() - mulai
+    return _ringkas([w for w, _ in hasil], [s for _, s in hasil], durasi)
+
+
+def beban_asgi(url, konkurensi, jumlah):
+    """`jumlah` GET ke `url` lewat handler ASGI dengan `konkurensi` request sekaligus"""
+    return asyncio.run(_beban_asgi(url, konkurensi, jumlah))
+
+
+def metadata(skala, ulangan):
+    return {
+        'waktu': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'database': connection.vendor,
+        'skala': skala,
+        'ulangan': ulangan,
+    }
+
+
+def bandingkan(hasil, baseline, toleransi=0.2, min_selisih_ms=1.0):
+    """
+    Bandingkan `hasil` dengan `baseline` (keduanya {nama: metrik}).
+    Regresi: query bertambah, atau p50/p99/peak_kb naik lebih dari
+    `toleransi` (p50/p99 juga harus naik minimal `min_selisih_ms`).
+    Mengembalikan daftar (nama, metrik, baseline, sekarang).
+    """
+    regresi = []
+    for nama, sekarang in hasil.items():
+        lama = baseline.get(nama)
+        if not lama:
+            continue
+        if sekarang['queries'] > lama['queries']:
+            regresi.append((nama, 'queries', lama['queries'], sekarang['queries']))
+        for metrik in ('p50_ms', 'p99_ms'):
+            if (sekarang[metrik] > lama[metrik] * (1 + toleransi)
+                    and sekarang[metrik] - lama[metrik] >= min_selisih_ms):
+                regresi.append((nama, metrik, lama[metrik], sekarang[metrik]))
+        if sekarang['peak_kb'] > lama['peak_kb'] * (1 + toleransi):
+            regresi.append((nama, 'peak_kb', lama['peak_kb'], sekarang['peak_kb']))
+    return regresi
+
+
+def simpan(path, data):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+        f.write('\n')
+
+
+def muat(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
@@ -0,0 +1,152 @@
+"""
+Pinjam & kembalikan banyak buku dalam satu request.
+
+Setiap batch memakai query massal dengan jumlah tetap (in_bulk, bulk_create,
+bulk_update) di dalam satu transaksi. Hasilnya dilaporkan per item, dan aturan
+ketersediaannya sama dengan jalur satu-per-satu.
+"""
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import serializers, status
+
+from .models import Anggota, Buku, BukuSedangDipinjam, Peminjaman, jatuh_tempo_default
+from .serializers import PeminjamanSerializer, PinjamMassalItemSerializer
+from .signals import peminjaman_massal
+
+
+PESAN_TIDAK_ADA = serializers.PrimaryKeyRelatedField.default_error_messages['does_not_exist']
+
+
+def _gagal(index, kode, errors):
+    return {'index': index, 'status': kode, 'errors': errors}
+
+
+def pinjam_massal(items, context=None):
+    """Buat peminjaman aktif untuk setiap item; item yang tidak valid dilewati"""
+    hasil = [None] * len(items)
+    valid = []
+    for index, item in enumerate(items):
+        serializer = PinjamMassalItemSerializer(data=item)
+        if serializer.is_valid():
+            valid.append((index, serializer.validated_data))
+        else:
+            hasil[index] = _gagal(index, status.HTTP_400_BAD_REQUEST, serializer.errors)
+
+    buku = Buku.objects.in_bulk({data['buku'] for _, data in valid})
+    anggota = Anggota.objects.in_bulk({data['anggota'] for _, data in valid})
+
+    with transaction.atomic():
+        # Satu query ke partial index peminjaman_aktif_unik untuk seluruh batch
+        sedang_dipinjam = set(
+            Peminjaman.objects.filter(
+                buku_id__in=buku, status_peminjaman='aktif'
+            ).values_list('buku_id', flat=True)
+        )
+
+        baru = []
+        for index, data in valid:
+            errors = {}
+            if data['buku'] not in buku:
+                errors['buku'] = [PESAN_TIDAK_ADA.format(pk_value=data['buku'])]
+            elif data['buku'] in sedang_dipinjam:
+                errors['buku'] = [
+                    f"Buku '{buku[data['buku']].judul}' sedang dipinjam dan tidak tersedia."
+                ]
+            if data['anggota'] not in anggota:
+                errors['anggota'] = [PESAN_TIDAK_ADA.format(pk_value=data['anggota'])]
+            if errors:
+                hasil[index] = _gagal(index, status.HTTP_400_BAD_REQUEST, errors)
+                continue
+
+            # Buku yang sama dua kali dalam satu batch juga ditolak
+            sedang_dipinjam.add(data['buku'])
+            baru.append((index, Peminjaman(
+                buku=buku[data['buku']],
+                anggota=anggota[data['anggota']],
+                tanggal_pinjam=data['tanggal_pinjam'],
+                tanggal_kembali=data.get('tanggal_kembali'),
+                # bulk_create melewati save(), jatuh tempo default diisi di sini
+                jatuh_tempo=data.get('jatuh_tempo') or jatuh_tempo_default(data['tanggal_pinjam']),
+                status_peminjaman='aktif',
+            )))
+
+        dibuat = _simpan_massal(baru, hasil)
+
+    detail = Peminjaman.objects.dengan_detail().in_bulk([p.pk for _, p in dibuat])
+    for index, peminjaman in dibuat:
+        hasil[index] = {
+            'index': index,
+            'status': status.HTTP_201_CREATED,
+            'data': PeminjamanSerializer(detail[peminjaman.pk], context=context).data,
+        }
+    return hasil
+
+
+def _simpan_massal(baru, hasil):
+    """
+    bulk_create seluruh peminjaman. Jika ada peminjaman lain yang masuk lebih
+    dulu (constraint dilanggar), ulangi satu per satu agar item lain tetap tersimpan.
+    """
+    try:
+        with transaction.atomic():
+            Peminjaman.objects.bulk_create([p for _, p in baru])
+    except IntegrityError:
+        dibuat = []
+        for index, peminjaman in baru:
+            try:
+                peminjaman.save()
+            except BukuSedangDipinjam as e:
+                hasil[index] = _gagal(index, status.HTTP_400_BAD_REQUEST, {
+                    'buku': [f"Buku '{e.buku.judul}' sedang dipinjam dan tidak tersedia."]
+                })
+            else:
+                dibuat.append((index, peminjaman))
+        return dibuat
+
+    for _, peminjaman in baru:
+        peminjaman._status_tersimpan = 'aktif'
+    peminjaman_massal.send(sender=Peminjaman, dibuat=[p for _, p in baru], dikembalikan=[])
+    return baru
+
+
+def kembalikan_massal(ids, context=None):
+    """Kembalikan setiap peminjaman pada `ids`; hasil mengikuti urutan `ids`"""
+    hari_ini = timezone.localdate()
+
+    with transaction.atomic():
+        peminjaman = {
+            p.pk: p for p in Peminjaman.objects.dengan_detail()
+            .select_for_update(of=('self',)).filter(pk__in=ids)
+        }
+        dikembalikan = []
+        hasil = []
+        for index, pk in enumerate(ids):
+            p = peminjaman.get(pk)
+            if p is None:
+                hasil.append(_gagal(index, status.HTTP_404_NOT_FOUND, {'detail': 'Peminjaman tidak ditemukan.'}))
+            elif p.status_peminjaman == 'selesai':
+                hasil.append(_gagal(index, status.HTTP_400_BAD_REQUEST, {
+                    'error': 'Buku ini sudah dikembalikan sebelumnya.'
+                }))
+            else:
+                p.status_peminjaman = 'selesai'
+                p.tanggal_kembali = hari_ini
+                # Buku hanya bisa punya satu peminjaman aktif, jadi kini tersedia
+                p.buku_sudah_dipinjam = False
+                dikembalikan.append(p)
+                hasil.append({'index': index, 'objek': p})
+
+        Peminjaman.objects.bulk_update(dikembalikan, ['status_peminjaman', 'tanggal_kembali'], batch_size=500)
+        for p in dikembalikan:
+            p._status_tersimpan = 'selesai'
+        peminjaman_massal.send(sender=Peminjaman, dibuat=[], dikembalikan=dikembalikan)
+
+    for item in hasil:
+        p = item.pop('objek', None)
+        if p is not None:
+            item.update({
+                'status': status.HTTP_200_OK,
+                'message': f"Buku '{p.buku.judul}' berhasil dikembalikan!",
+                'data': PeminjamanSerializer(p, context=context).data,
+            })
+    return hasil
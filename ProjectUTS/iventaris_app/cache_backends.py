@@ -0,0 +1,35 @@
+"""
+Cache untuk state keamanan (refresh token dicabut, versi user JWT).
+
+State ini tidak boleh hilang sebelum waktunya: jti yang tergusur dari cache
+membuat refresh token yang sudah dicabut berlaku lagi. Karena itu disimpan di
+alias cache terpisah (`keamanan`) dari cache best-effort (respons anonim,
+fragmen template) yang boleh digusur, sehingga banjir URL unik hanya
+menggusur sesama entri best-effort.
+"""
+import time
+
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+
+
+KEAMANAN = 'keamanan'
+
+
+def keamanan():
+    return caches[KEAMANAN]
+
+
+class CacheTanpaGusur(LocMemCache):
+    """
+    LocMemCache yang tidak pernah menggusur entri yang masih berlaku. Saat
+    MAX_ENTRIES tercapai hanya entri kedaluwarsa yang dibuang; jika semuanya
+    masih berlaku, batasnya digandakan.
+    """
+
+    def _cull(self):
+        sekarang = time.time()
+        for kunci in [k for k, exp in self._expire_info.items() if exp is not None and exp <= sekarang]:
+            self._delete(kunci)
+        if len(self._cache) >= self._max_entries:
+            self._max_entries = len(self._cache) * 2
@@ -0,0 +1,164 @@
+"""
+Log perubahan (change feed) untuk sinkronisasi inkremental klien.
+
+Setiap create/update/delete Buku, Anggota dan Peminjaman menambah baris
+Perubahan di transaksi yang sama (lihat signals.py). `seq` selalu naik dan
+tidak pernah dipakai ulang, dan SQLite hanya mengizinkan satu transaksi
+tulis, jadi urutan seq sama dengan urutan commit. Klien menyimpan seq
+terakhir lalu memanggil `/api/changes/?since=<seq>`: hanya objek yang
+berubah sejak itu yang dikirim, dengan bentuk yang sama dengan item
+daftarnya (peminjaman tanpa relasi bersarang).
+
+Peminjaman juga mengubah field turunan buku (is_available) dan anggota
+(total_peminjaman), jadi keduanya ikut dicatat. Operasi massal yang
+melewati signal (impor, seeder) mencatat `reset` per model: klien memuat
+ulang daftar model tersebut.
+
+`manage.py compact_changes` membuang entri yang lebih tua dari
+PERUBAHAN_RETENSI_HARI dan entri yang sudah digantikan entri lebih baru
+untuk objek yang sama. Klien dengan `since` sebelum batas pemadatan
+menerima `reset: true`.
+"""
+from django.db import transaction
+from django.db.models import Max
+
+from .models import Anggota, Buku, Peminjaman, Penghitung, Perubahan
+from .serializers import AnggotaSerializer, BukuSerializer, PeminjamanRingkasSerializer
+
+
+BUAT = 'buat'
+UBAH = 'ubah'
+HAPUS = 'hapus'
+RESET = 'reset'
+
+NAMA = {
+    Buku: 'buku',
+    Anggota: 'anggota',
+    Peminjaman: 'peminjaman',
+}
+
+# Model yang field turunannya ikut berubah bersama model kunci
+TERDAMPAK = {
+    Peminjaman: (Buku, Anggota),
+}
+
+# Penghitung: seq terbesar yang sudah dibuang oleh pemadatan retensi
+BATAS = 'perubahan.batas'
+
+
+def catat(entri, using=None):
+    """Tambahkan entri [(model, id, aksi), ...] ke log dalam satu INSERT"""
+    entri = list(dict.fromkeys(entri))
+    if entri:
+        Perubahan.objects.using(using).bulk_create(
+            [Perubahan(model=NAMA[model], objek_id=pk, aksi=aksi) for model, pk, aksi in entri]
+        )
+
+
+def entri_peminjaman(peminjaman, aksi, relasi_lama=None):
+    """
+    Entri log satu peminjaman beserta buku & anggotanya.
+    `relasi_lama` = (buku_id, anggota_id) sebelum disimpan, jika berpindah.
+    """
+    entri = [(Peminjaman, peminjaman.pk, aksi)]
+    for relasi in ((peminjaman.buku_id, peminjaman.anggota_id), relasi_lama):
+        if relasi is not None:
+            entri += [(Buku, relasi[0], UBAH), (Anggota, relasi[1], UBAH)]
+    return entri
+
+
+def reset(model, using=None):
+    """Catat bahwa `model` (dan model terdampaknya) berubah massal tanpa log per objek"""
+    catat([(m, None, RESET) for m in (model,) + TERDAMPAK.get(model, ())], using=using)
+
+
+def seq_terakhir():
+    return Perubahan.objects.order_by('-seq').values_list('seq', flat=True).first() or 0
+
+
+def _batas():
+    return Penghitung.objects.filter(nama=BATAS).values_list('nilai', flat=True).first() or 0
+
+
+# =============================================================================
+# BACA
+# =============================================================================
+
+def _queryset(model):
+    """Queryset dengan anotasi field turunan (tanpa query per baris saat serialisasi)"""
+    if model is Buku:
+        return Buku.objects.dengan_ketersediaan(), BukuSerializer
+    if model is Anggota:
+        return Anggota.objects.dengan_total_peminjaman(), AnggotaSerializer
+    return Peminjaman.objects.all(), PeminjamanRingkasSerializer
+
+
+def sejak(since, limit):
+    """
+    Perubahan setelah `since` (maks. `limit` entri log). Setiap objek hanya
+    dikirim sekali dengan keadaannya saat ini, pada posisi entri terakhirnya.
+    `since` None atau sebelum batas pemadatan -> reset (tanpa hasil).
+    """
+    if since is None or since < _batas():
+        return {'seq': seq_terakhir(), 'reset': True, 'ada_lanjutan': False, 'results': []}
+
+    baris = list(
+        Perubahan.objects.filter(seq__gt=since).order_by('seq')
+        .values_list('seq', 'model', 'objek_id', 'aksi')[:limit + 1]
+    )
+    ada_lanjutan = len(baris) > limit
+    baris = baris[:limit]
+
+    terakhir = {}
+    for seq, model, objek_id, aksi in baris:
+        terakhir.pop((model, objek_id), None)
+        terakhir[model, objek_id] = (seq, aksi)
+
+    # Satu query per model untuk semua objek yang masih ada
+    data = {}
+    for model, nama in NAMA.items():
+        ids = [pk for (m, pk), (_, aksi) in terakhir.items() if m == nama and aksi not in (HAPUS, RESET)]
+        if ids:
+            queryset, serializer_class = _queryset(model)
+            data[nama] = {obj.pk: serializer_class(obj).data for obj in queryset.filter(pk__in=ids)}
+
+    results = []
+    for (model, objek_id), (seq, aksi) in terakhir.items():
+        objek = data.get(model, {}).get(objek_id)
+        if aksi in (BUAT, UBAH) and objek is None:
+            # Sudah terhapus (entri hapusnya ada di halaman berikutnya)
+            aksi = HAPUS
+        results.append({'seq': seq, 'model': model, 'id': objek_id, 'aksi': aksi, 'data': objek})
+
+    return {
+        'seq': baris[-1][0] if baris else since,
+        'reset': False,
+        'ada_lanjutan': ada_lanjutan,
+        'results': results,
+    }
+
+
+# =============================================================================
+# PEMADATAN
+# =============================================================================
+
+def padatkan(sebelum):
+    """
+    Buang entri yang ditulis sebelum `sebelum` (retensi) dan entri objek
+    yang sudah digantikan entri lebih baru. Mengembalikan jumlah yang dibuang.
+    """
+    with transaction.atomic():
+        dibuang = 0
+        batas = Perubahan.objects.filter(waktu__lt=sebelum).aggregate(seq=Max('seq'))['seq']
+        if batas is not None and batas > _batas():
+            dibuang += Perubahan.objects.filter(seq__lte=batas).delete()[0]
+            Penghitung.objects.update_or_create(nama=BATAS, defaults={'nilai': batas})
+
+        # Pembaca hanya memakai entri terakhir per objek, jadi yang lebih lama
+        # boleh dibuang tanpa memengaruhi hasil `since` mana pun
+        terbaru = (
+            Perubahan.objects.filter(objek_id__isnull=False).order_by()
+            .values('model', 'objek_id').annotate(seq_terbaru=Max('seq')).values('seq_terbaru')
+        )
+        dibuang += Perubahan.objects.filter(objek_id__isnull=False).exclude(seq__in=terbaru).delete()[0]
+    return dibuang
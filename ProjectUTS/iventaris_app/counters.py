@@ -0,0 +1,151 @@
+"""
+Penghitung dashboard yang dirawat inkremental.
+
+Setiap create/delete Buku & Anggota serta setiap perubahan status Peminjaman
+mengubah baris Penghitung di transaksi yang sama (lihat signals.py), sehingga
+dashboard cukup membaca beberapa baris kecil berapa pun jumlah datanya.
+Operasi massal yang melewati signal (queryset.update, bulk_create) harus
+memanggil `ubah()` sendiri atau dirapikan dengan `manage.py reconcile_counters`.
+
+Jumlah peminjaman terlambat bergantung pada tanggal, jadi tidak dirawat
+inkremental: `manage.py snapshot_terlambat` menghitungnya sekali sehari dan
+menyimpannya di tabel yang sama bersama tanggal snapshot-nya.
+
+Peminjaman yang dipindah ke arsip (lihat arsip.py) tetap dihitung di
+`peminjaman_selesai`; `peminjaman_arsip` mencatat berapa di antaranya yang
+sudah ada di tabel arsip.
+"""
+from datetime import date
+
+from asgiref.sync import sync_to_async
+from django.db import transaction
+from django.db.models import Case, Count, F, Q, Value, When
+
+from .models import Anggota, Buku, Peminjaman, PeminjamanArsip, Penghitung
+
+
+BUKU = 'buku'
+ANGGOTA = 'anggota'
+PEMINJAMAN_AKTIF = 'peminjaman_aktif'
+PEMINJAMAN_SELESAI = 'peminjaman_selesai'
+PEMINJAMAN_ARSIP = 'peminjaman_arsip'
+
+SEMUA = [BUKU, ANGGOTA, PEMINJAMAN_AKTIF, PEMINJAMAN_SELESAI, PEMINJAMAN_ARSIP]
+
+# Snapshot harian (lihat snapshot_terlambat), tanggal disimpan sebagai ordinal
+TERLAMBAT = 'peminjaman_terlambat'
+TERLAMBAT_TANGGAL = 'peminjaman_terlambat_tanggal'
+SNAPSHOT = [TERLAMBAT, TERLAMBAT_TANGGAL]
+
+# Nama penghitung untuk tiap status peminjaman
+PER_STATUS = {
+    'aktif': PEMINJAMAN_AKTIF,
+    'selesai': PEMINJAMAN_SELESAI,
+}
+
+
+def ubah(delta):
+    """
+    Tambahkan `delta` ({nama: selisih}) ke penghitung dalam satu UPDATE.
+    Baris yang belum ada dibuat dengan nilai dari hasil hitung ulang.
+    """
+    delta = {nama: d for nama, d in delta.items() if d}
+    if not delta:
+        return
+
+    selisih = Case(
+        *[When(nama=nama, then=Value(d)) for nama, d in delta.items()],
+        default=Value(0),
+    )
+    diubah = Penghitung.objects.filter(nama__in=delta).update(nilai=F('nilai') + selisih)
+    if diubah < len(delta):
+        rekonsiliasi()
+
+
+def _lengkap(nilai):
+    return all(nama in nilai for nama in SEMUA)
+
+
+def baca():
+    """Nilai semua penghitung (plus snapshot terlambat jika ada) dalam satu query"""
+    nilai = dict(Penghitung.objects.filter(nama__in=SEMUA + SNAPSHOT).values_list('nama', 'nilai'))
+    if not _lengkap(nilai):
+        nilai.update(rekonsiliasi()[0])
+    return nilai
+
+
+async def abaca():
+    """Versi async dari `baca()` untuk view ASGI"""
+    nilai = {
+        nama: n async for nama, n in
+        Penghitung.objects.filter(nama__in=SEMUA + SNAPSHOT).values_list('nama', 'nilai')
+    }
+    if not _lengkap(nilai):
+        nilai.update((await sync_to_async(rekonsiliasi)())[0])
+    return nilai
+
+
+def data_dashboard():
+    return _dashboard(baca())
+
+
+async def adata_dashboard():
+    return _dashboard(await abaca())
+
+
+def _dashboard(nilai):
+    tanggal = nilai.get(TERLAMBAT_TANGGAL)
+    return {
+        'total_buku': nilai[BUKU],
+        'total_anggota': nilai[ANGGOTA],
+        'total_dipinjam': nilai[PEMINJAMAN_AKTIF],
+        'total_selesai': nilai[PEMINJAMAN_SELESAI],
+        'buku_tersedia': nilai[BUKU] - nilai[PEMINJAMAN_AKTIF],
+        # None sampai snapshot_terlambat pernah dijalankan
+        'total_terlambat': nilai.get(TERLAMBAT),
+        'terlambat_per': date.fromordinal(tanggal) if tanggal else None,
+    }
+
+
+def hitung_ulang(using=None):
+    """Hitung nilai sebenarnya langsung dari tabel (mahal, untuk rekonsiliasi)"""
+    status = Peminjaman.objects.using(using).aggregate(
+        aktif=Count('pk', filter=Q(status_peminjaman='aktif')),
+        selesai=Count('pk', filter=Q(status_peminjaman='selesai')),
+    )
+    # Arsip hanya berisi peminjaman selesai
+    arsip = PeminjamanArsip.objects.using(using).count()
+    return {
+        BUKU: Buku.objects.using(using).count(),
+        ANGGOTA: Anggota.objects.using(using).count(),
+        PEMINJAMAN_AKTIF: status['aktif'],
+        PEMINJAMAN_SELESAI: status['selesai'] + arsip,
+        PEMINJAMAN_ARSIP: arsip,
+    }
+
+
+def rekonsiliasi(using=None):
+    """
+    Samakan penghitung dengan isi tabel (di database `using`, default primer).
+    Mengembalikan (nilai baru, {nama: selisih lama terhadap nilai baru}).
+    """
+    with transaction.atomic(using=using):
+        penghitung = Penghitung.objects.using(using)
+        lama = dict(penghitung.select_for_update().filter(nama__in=SEMUA).values_list('nama', 'nilai'))
+        baru = hitung_ulang(using=using)
+        for nama, nilai in baru.items():
+            penghitung.update_or_create(nama=nama, defaults={'nilai': nilai})
+    drift = {nama: lama.get(nama, 0) - nilai for nama, nilai in baru.items() if lama.get(nama) != nilai}
+    return baru, drift
+
+
+def snapshot_terlambat(tanggal):
+    """
+    Hitung peminjaman yang terlambat per `tanggal` (satu COUNT lewat index
+    peminjaman_terlambat_idx) dan simpan sebagai snapshot dashboard.
+    """
+    jumlah = Peminjaman.objects.terlambat(tanggal).order_by().count()
+    with transaction.atomic():
+        Penghitung.objects.update_or_create(nama=TERLAMBAT, defaults={'nilai': jumlah})
+        Penghitung.objects.update_or_create(nama=TERLAMBAT_TANGGAL, defaults={'nilai': tanggal.toordinal()})
+    return jumlah
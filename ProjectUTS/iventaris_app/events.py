@@ -0,0 +1,229 @@
+"""
+Stream Server-Sent Events (/api/stream/) untuk dashboard & peminjaman live.
+
+Hanya untuk server ASGI (iventaris/asgi.py). Setiap proses punya satu Hub:
+klien yang terhubung hanya memegang satu asyncio.Queue kecil, sedangkan satu
+tugas pemantau bersama membaca penghitung dashboard dan log perubahan
+(changes.py) lalu menyiarkan hasilnya ke semua antrian. Query per siklus
+tetap (penghitung + log, tanpa COUNT) berapa pun jumlah kliennya, dan pesan
+diformat sekali untuk semua klien. Heartbeat juga disiarkan pemantau, jadi
+koneksi yang diam tidak memegang timer sendiri.
+
+Pemantau dibangunkan signal setelah commit di proses yang sama, dan tetap
+memeriksa tiap SSE_INTERVAL_DETIK untuk penulisan dari proses lain (worker
+lain, perintah manage.py). Pemantau berhenti saat klien terakhir putus.
+
+Backpressure: antrian tiap klien dibatasi SSE_ANTRIAN pesan. Klien yang
+terlalu lambat tidak menahan klien lain: isi antriannya dibuang dan stream
+ditutup. EventSource menyambung ulang sendiri dengan header Last-Event-ID
+(seq log perubahan), menerima dashboard terkini, dan event peminjaman yang
+terlewat dikirim ulang dari log.
+"""
+import asyncio
+import contextvars
+import logging
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DatabaseError
+from rest_framework.renderers import JSONRenderer
+
+from . import changes, counters
+from .serializers import DashboardSerializer
+
+
+logger = logging.getLogger(__name__)
+
+DASHBOARD = 'dashboard'
+PEMINJAMAN = 'peminjaman'
+RESET = 'reset'
+
+# Jeda sambung ulang EventSource (milidetik)
+RETRY_MS = 3000
+# Entri log per baca (pemantau & kirim ulang Last-Event-ID)
+BATAS_LOG = 500
+
+PING = b': ping\n\n'
+
+
+def _setelan(nama, default):
+    return getattr(settings, nama, default)
+
+
+def pesan(event, data, id=None):
+    """Satu pesan SSE; data JSON selalu satu baris"""
+    awal = f'id: {id}\n' if id is not None else ''
+    return f'{awal}event: {event}\ndata: '.encode() + JSONRenderer().render(data) + b'\n\n'
+
+
+def pesan_peminjaman(hasil):
+    """Pesan untuk entri peminjaman dari `changes.sejak()` (buat = dipinjam, status selesai = dikembalikan)"""
+    return [
+        pesan(PEMINJAMAN, {'aksi': r['aksi'], 'id': r['id'], 'data': r['data']}, id=r['seq'])
+        for r in hasil['results'] if r['model'] == 'peminjaman'
+    ]
+
+
+class Pelanggan:
+    """Satu koneksi stream: antrian terbatas + penanda tertinggal"""
+    __slots__ = ('antrian', 'tertinggal')
+
+    def __init__(self, ukuran):
+        self.antrian = asyncio.Queue(ukuran)
+        self.tertinggal = False
+
+
+class Hub:
+    def __init__(self):
+        self._loop = None
+
+    def _siapkan(self):
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # Loop baru (proses baru atau test): mulai dari keadaan kosong
+            self._loop = loop
+            self.pelanggan = set()
+            self.siap = asyncio.Event()
+            self._bangun = asyncio.Event()
+            self._tugas = None
+
+    # -------------------------------------------------------------------------
+    # Pelanggan (hanya dari event loop)
+    # -------------------------------------------------------------------------
+
+    def berlangganan(self):
+        """Pelanggan baru, atau None jika sudah SSE_MAKS_KLIEN koneksi"""
+        self._siapkan()
+        if len(self.pelanggan) >= _setelan('SSE_MAKS_KLIEN', 10000):
+            return None
+        pelanggan = Pelanggan(_setelan('SSE_ANTRIAN', 64))
+        self.pelanggan.add(pelanggan)
+        if self._tugas is None:
+            # Pemantau (ulang) mulai dari posisi saat ini, bukan dari saat terakhir berhenti
+            self.seq = self.dashboard = self.pesan_dashboard = None
+            self.siap.clear()
+            # Context kosong: pemantau hidup lebih lama dari request pertama, jadi
+            # tidak boleh mewarisi pengukuran metrik maupun pin primer-nya
+            self._tugas = self._loop.create_task(self._pantau(), context=contextvars.Context())
+        return pelanggan
+
+    def berhenti(self, pelanggan):
+        self.pelanggan.discard(pelanggan)
+        if not self.pelanggan and self._tugas is not None:
+            self._bangun.set()
+
+    def siarkan(self, isi):
+        for pelanggan in self.pelanggan:
+            if pelanggan.tertinggal:
+                continue
+            try:
+                pelanggan.antrian.put_nowait(isi)
+            except asyncio.QueueFull:
+                # Terlalu lambat: buang antriannya, stream ditutup dan klien menyambung ulang
+                pelanggan.tertinggal = True
+                while not pelanggan.antrian.empty():
+                    pelanggan.antrian.get_nowait()
+                pelanggan.antrian.put_nowait(None)
+
+    def bangunkan(self):
+        """Periksa perubahan sekarang; aman dipanggil dari thread mana pun (signal setelah commit)"""
+        loop = self._loop
+        if loop is not None and self._tugas is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(self._bangun.set)
+
+    # -------------------------------------------------------------------------
+    # Pemantau
+    # -------------------------------------------------------------------------
+
+    async def _pantau(self):
+        ping = self._loop.time()
+        try:
+            while self.pelanggan:
+                try:
+                    for isi in await sync_to_async(self._periksa)():
+                        self.siarkan(isi)
+                except DatabaseError:
+                    logger.exception('Gagal membaca perubahan untuk stream SSE')
+                finally:
+                    self.siap.set()
+
+                if self._loop.time() - ping >= _setelan('SSE_HEARTBEAT_DETIK', 15):
+                    self.siarkan(PING)
+                    ping = self._loop.time()
+                try:
+                    await asyncio.wait_for(self._bangun.wait(), _setelan('SSE_INTERVAL_DETIK', 2))
+                except asyncio.TimeoutError:
+                    pass
+                self._bangun.clear()
+        finally:
+            self._tugas = None
+            self.siap.set()
+
+    def _periksa(self):
+        """Baca penghitung & log (di thread sync), kembalikan pesan yang perlu disiarkan"""
+        hasil = []
+        dashboard = DashboardSerializer(counters.data_dashboard()).data
+        if dashboard != self.dashboard:
+            self.pesan_dashboard = pesan(DASHBOARD, dashboard)
+            # Pembacaan pertama hanya menjadi nilai awal (dikirim saat klien terhubung)
+            if self.dashboard is not None:
+                hasil.append(self.pesan_dashboard)
+            self.dashboard = dashboard
+
+        if self.seq is None:
+            self.seq = changes.seq_terakhir()
+            return hasil
+        while True:
+            log = changes.sejak(self.seq, BATAS_LOG)
+            if log['reset']:
+                # Log dipadatkan melewati posisi pemantau
+                hasil.append(pesan(RESET, {}, id=log['seq']))
+            hasil += pesan_peminjaman(log)
+            self.seq = log['seq']
+            if not log['ada_lanjutan']:
+                return hasil
+
+
+hub = Hub()
+
+
+# =============================================================================
+# KONEKSI
+# =============================================================================
+
+def _kirim_ulang(last_event_id):
+    """Event peminjaman setelah Last-Event-ID, atau reset jika terlalu lama tertinggal"""
+    try:
+        since = int(last_event_id)
+    except ValueError:
+        since = None
+    log = changes.sejak(since, BATAS_LOG)
+    if log['reset'] or log['ada_lanjutan']:
+        return [pesan(RESET, {}, id=log['seq'])]
+    return pesan_peminjaman(log)
+
+
+async def pembuka(last_event_id=None):
+    """Pesan pertama untuk koneksi baru: retry, dashboard terkini, lalu event yang terlewat"""
+    await hub.siap.wait()
+    # id awal agar sambungan ulang tetap membawa Last-Event-ID walau belum ada event peminjaman
+    id = f'id: {hub.seq}\n' if hub.seq is not None else ''
+    awal = [f'retry: {RETRY_MS}\n{id}\n'.encode()]
+    if hub.pesan_dashboard is not None:
+        awal.append(hub.pesan_dashboard)
+    if last_event_id:
+        awal += await sync_to_async(_kirim_ulang)(last_event_id)
+    return b''.join(awal)
+
+
+async def alirkan(pelanggan, awal):
+    """Isi StreamingHttpResponse sampai klien putus atau tertinggal"""
+    try:
+        yield awal
+        while True:
+            isi = await pelanggan.antrian.get()
+            if isi is None:
+                return
+            yield isi
+    finally:
+        hub.berhenti(pelanggan)
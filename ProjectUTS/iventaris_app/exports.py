@@ -0,0 +1,104 @@
+"""
+Ekspor riwayat peminjaman sebagai CSV atau NDJSON yang di-stream.
+
+Data dibaca per chunk lewat `.iterator()` sehingga memori tetap datar berapa
+pun jumlah barisnya, dan header/baris pertama langsung dikirim ke klien.
+Ekspor membaca tabel peminjaman aktif dan arsipnya sekaligus: tiap queryset
+sudah urut (-tanggal_pinjam, -id), lalu digabung dengan heapq.merge.
+"""
+import csv
+import heapq
+import json
+from operator import attrgetter
+
+from django.http import StreamingHttpResponse
+from rest_framework.renderers import BaseRenderer
+
+
+CHUNK_SIZE = 2000
+
+KOLOM = [
+    'id', 'buku_id', 'judul_buku', 'penulis_buku', 'anggota_id', 'nama_anggota',
+    'email_anggota', 'tanggal_pinjam', 'tanggal_kembali', 'jatuh_tempo', 'status_peminjaman',
+]
+
+
+class CSVRenderer(BaseRenderer):
+    """
+    Hanya untuk content negotiation (?format=csv / Accept: text/csv);
+    isi ekspor ditulis langsung oleh StreamingHttpResponse. Respons error
+    tetap dikirim sebagai JSON.
+    """
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return json.dumps(data).encode()
+
+
+class NDJSONRenderer(CSVRenderer):
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+
+def _baris(querysets):
+    semua = heapq.merge(
+        *(qs.select_related('buku', 'anggota').iterator(chunk_size=CHUNK_SIZE) for qs in querysets),
+        key=attrgetter('tanggal_pinjam', 'pk'),
+        reverse=True,
+    )
+    for p in semua:
+        yield [
+            p.pk, p.buku_id, p.buku.judul, p.buku.penulis, p.anggota_id, p.anggota.nama,
+            p.anggota.email, p.tanggal_pinjam.isoformat(),
+            p.tanggal_kembali.isoformat() if p.tanggal_kembali else None,
+            p.jatuh_tempo.isoformat(),
+            p.status_peminjaman,
+        ]
+
+
+class _Echo:
+    """Objek mirip file untuk csv.writer yang langsung mengembalikan teksnya"""
+
+    def write(self, value):
+        return value
+
+
+def _per_chunk(teks):
+    """Gabungkan baris agar tidak satu write() per baris ke server"""
+    buffer = []
+    for t in teks:
+        buffer.append(t)
+        if len(buffer) >= 500:
+            yield ''.join(buffer)
+            buffer = []
+    if buffer:
+        yield ''.join(buffer)
+
+
+def stream_csv(querysets):
+    writer = csv.writer(_Echo())
+    # Header dikirim sebelum query dijalankan
+    yield writer.writerow(KOLOM)
+    yield from _per_chunk(writer.writerow(row) for row in _baris(querysets))
+
+
+def stream_ndjson(querysets):
+    yield from _per_chunk(
+        json.dumps(dict(zip(KOLOM, row)), ensure_ascii=False) + '\n' for row in _baris(querysets)
+    )
+
+
+def respons_ekspor(querysets, format, nama_file):
+    """
+    StreamingHttpResponse untuk `format` ('csv' atau 'ndjson').
+    `querysets` = daftar queryset peminjaman yang masing-masing sudah urut
+    (-tanggal_pinjam, -id).
+    """
+    if format == NDJSONRenderer.format:
+        response = StreamingHttpResponse(stream_ndjson(querysets), content_type='application/x-ndjson; charset=utf-8')
+    else:
+        response = StreamingHttpResponse(stream_csv(querysets), content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{nama_file}.{format}"'
+    return response
@@ -0,0 +1,358 @@
+"""
+Impor massal Buku, Anggota dan Peminjaman dari CSV / JSON / NDJSON.
+
+File dibaca sebagai stream, divalidasi per batch (relasi & duplikat dicek
+dengan satu query per batch), lalu ditulis dengan bulk_create/bulk_update di
+dalam satu transaksi per batch. Dipakai oleh `manage.py import_data`.
+"""
+import csv
+import json
+import re
+import time
+
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+
+from . import changes, counters, rollups, versions
+from .models import Anggota, Buku, BukuSedangDipinjam, Peminjaman, PeminjamanArsip, jatuh_tempo_default
+
+
+# Kolom yang bisa diimpor per model, dan kunci default untuk deteksi duplikat
+KONFIGURASI = {
+    'buku': (Buku, ['id', 'judul', 'penulis', 'tahun'], 'id'),
+    'anggota': (Anggota, ['id', 'nama', 'email'], 'email'),
+    'peminjaman': (
+        Peminjaman,
+        ['id', 'buku', 'anggota', 'tanggal_pinjam', 'tanggal_kembali', 'jatuh_tempo', 'status_peminjaman'],
+        'id',
+    ),
+}
+
+DUPLIKAT_ERROR = 'error'
+DUPLIKAT_SKIP = 'skip'
+DUPLIKAT_UPDATE = 'update'
+
+# Error yang disimpan di memori (untuk ringkasan); sisanya hanya dihitung,
+# atau dialirkan lewat `on_error` (mis. ke --errors-file)
+MAKS_ERROR = 100
+
+
+# =============================================================================
+# PEMBACA FILE (stream)
+# =============================================================================
+
+def baca_csv(f):
+    reader = csv.DictReader(f)
+    for row in reader:
+        yield reader.line_num, row
+
+
+def baca_ndjson(f):
+    for nomor, baris in enumerate(f, start=1):
+        if baris.strip():
+            yield nomor, json.loads(baris)
+
+
+_PEMISAH = re.compile(r'[\s,]*')
+
+
+def baca_json(f, ukuran=1 << 16):
+    """
+    Baca array JSON `[{...}, {...}]` satu objek demi satu objek tanpa memuat
+    seluruh file ke memori.
+    """
+    decoder = json.JSONDecoder()
+    buffer = f.read(ukuran).lstrip()
+    if not buffer.startswith('['):
+        raise ValueError('File JSON harus berisi array objek.')
+    pos, nomor = 1, 0
+
+    while True:
+        pos = _PEMISAH.match(buffer, pos).end()
+        if pos >= len(buffer):
+            lagi = f.read(ukuran)
+            if not lagi:
+                raise ValueError('File JSON berakhir sebelum penutup array.')
+            buffer, pos = buffer[pos:] + lagi, 0
+            continue
+        if buffer[pos] == ']':
+            return
+
+        try:
+            obj, akhir = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            lagi = f.read(ukuran)
+            if not lagi:
+                raise
+            buffer, pos = buffer[pos:] + lagi, 0
+            continue
+
+        nomor += 1
+        yield nomor, obj
+        pos = akhir
+        if pos > ukuran:
+            buffer, pos = buffer[pos:], 0
+
+
+PEMBACA = {'csv': baca_csv, 'ndjson': baca_ndjson, 'json': baca_json}
+
+
+def tebak_format(path):
+    for format in ('ndjson', 'jsonl', 'json', 'csv'):
+        if str(path).lower().endswith('.' + format):
+            return 'ndjson' if format == 'jsonl' else format
+    return 'csv'
+
+
+# =============================================================================
+# IMPORTER
+# =============================================================================
+
+class Importer:
+    """
+    Impor baris (dict) ke satu model.
+
+    on_duplicate:
+        error  - baris dengan kunci yang sudah ada dilaporkan sebagai error
+        skip   - baris dengan kunci yang sudah ada dilewati
+        update - baris dengan kunci yang sudah ada diperbarui (upsert)
+
+    Hanya `maks_error` error pertama yang disimpan di `errors`; setiap error
+    juga diteruskan ke `on_error(error)` begitu ditemukan.
+    """
+
+    def __init__(self, nama_model, on_duplicate=DUPLIKAT_ERROR, kunci=None,
+                 batch_size=5000, dry_run=False, on_error=None, maks_error=MAKS_ERROR):
+        self.model, self.kolom, kunci_default = KONFIGURASI[nama_model]
+        self.kunci = kunci or kunci_default
+        if self.kunci not in self.kolom:
+            raise ValueError(f"Kunci '{self.kunci}' bukan kolom {nama_model}.")
+        self.on_duplicate = on_duplicate
+        self.batch_size = batch_size
+        self.dry_run = dry_run
+        self.on_error = on_error
+        self.maks_error = maks_error
+
+        self.fields = {nama: self.model._meta.get_field(nama) for nama in self.kolom}
+        self.kunci_field = self.fields[self.kunci]
+        self.kunci_attname = self.kunci_field.attname
+        self.kolom_update = [f.attname for nama, f in self.fields.items() if nama != 'id']
+
+        # Buku yang punya peminjaman aktif dari file ini (batch sebelumnya)
+        self.buku_aktif = set()
+        self.statistik = {'dibaca': 0, 'dibuat': 0, 'diperbarui': 0, 'dilewati': 0, 'error': 0}
+        self.errors = []
+
+    def jalankan(self, baris, progress=None):
+        """
+        Impor semua `baris` ((nomor_baris, dict), ...). `progress(statistik, detik)`
+        dipanggil setiap selesai satu batch.
+        """
+        mulai = time.monotonic()
+        batch = []
+        for nomor, data in baris:
+            batch.append((nomor, data))
+            if len(batch) >= self.batch_size:
+                self._proses_batch(batch)
+                batch = []
+                if progress:
+                    progress(self.statistik, time.monotonic() - mulai)
+        if batch:
+            self._proses_batch(batch)
+            if progress:
+                progress(self.statistik, time.monotonic() - mulai)
+
+        # bulk_create/bulk_update melewati signal penghitung dashboard & versi
+        if not self.dry_run and (self.statistik['dibuat'] or self.statistik['diperbarui']):
+            counters.rekonsiliasi()
+            if self.model is Peminjaman:
+                rollups.bangun_ulang()
+            versions.naikkan(versions.PER_MODEL[self.model])
+            changes.reset(self.model)
+        return self.statistik
+
+    def _error(self, nomor, errors):
+        self.statistik['error'] += 1
+        error = {'baris': nomor, 'errors': errors}
+        if len(self.errors) < self.maks_error:
+            self.errors.append(error)
+        if self.on_error:
+            self.on_error(error)
+
+    # -------------------------------------------------------------------------
+
+    def _bersihkan(self, nomor, data):
+        """Konversi & validasi satu baris tanpa query ke database"""
+        if not isinstance(data, dict):
+            self._error(nomor, {'__all__': ['Baris harus berupa objek.']})
+            return None
+
+        nilai, errors = {}, {}
+        for nama, field in self.fields.items():
+            mentah = data.get(nama)
+            if mentah in (None, ''):
+                if nama in ('id', 'jatuh_tempo'):
+                    continue
+                if field.has_default():
+                    nilai[field.attname] = field.get_default()
+                    continue
+                mentah = None
+            try:
+                if field.is_relation:
+                    if mentah is None:
+                        raise ValidationError(field.error_messages['null'])
+                    nilai[field.attname] = field.target_field.to_python(mentah)
+                else:
+                    nilai[field.attname] = field.clean(mentah, None)
+            except ValidationError as e:
+                errors[nama] = e.messages
+
+        if errors:
+            self._error(nomor, errors)
+            return None
+        if self.model is Peminjaman and 'jatuh_tempo' not in nilai:
+            # bulk_create melewati save(): isi jatuh tempo default di sini
+            nilai['jatuh_tempo'] = jatuh_tempo_default(nilai['tanggal_pinjam'])
+        return nilai
+
+    def _proses_batch(self, batch):
+        self.statistik['dibaca'] += len(batch)
+        bersih = []
+        for nomor, data in batch:
+            nilai = self._bersihkan(nomor, data)
+            if nilai is not None:
+                bersih.append((nomor, nilai))
+
+        with transaction.atomic():
+            if self.model is Peminjaman:
+                bersih = self._cek_relasi(bersih)
+
+            # Duplikat di dalam file (baris terakhir menang untuk mode update)
+            per_kunci = {}
+            for nomor, nilai in bersih:
+                kunci = nilai.get(self.kunci_attname)
+                if kunci is not None and kunci in per_kunci:
+                    if self.on_duplicate == DUPLIKAT_UPDATE:
+                        per_kunci.pop(kunci)
+                    elif self.on_duplicate == DUPLIKAT_SKIP:
+                        self.statistik['dilewati'] += 1
+                        continue
+                    else:
+                        self._error(nomor, {self.kunci: ['Duplikat di dalam file.']})
+                        continue
+                per_kunci[kunci if kunci is not None else ('baris', nomor)] = (nomor, nilai)
+            bersih = list(per_kunci.values())
+
+            ada = self._kunci_yang_ada([n.get(self.kunci_attname) for _, n in bersih])
+            diarsipkan = self._id_diarsipkan([n.get('id') for _, n in bersih])
+            baru, lama = [], []
+            for nomor, nilai in bersih:
+                if nilai.get('id') in diarsipkan:
+                    # Sudah ada di tabel arsip: jangan dibuat lagi di tabel aktif,
+                    # dan arsip tidak diperbarui lewat impor
+                    if self.on_duplicate == DUPLIKAT_SKIP:
+                        self.statistik['dilewati'] += 1
+                    else:
+                        self._error(nomor, {'id': ['Peminjaman dengan id ini sudah diarsipkan.']})
+                    continue
+                pk_lama = ada.get(nilai.get(self.kunci_attname))
+                if pk_lama is None:
+                    baru.append((nomor, nilai))
+                elif self.on_duplicate == DUPLIKAT_UPDATE:
+                    nilai['id'] = pk_lama
+                    lama.append((nomor, nilai))
+                elif self.on_duplicate == DUPLIKAT_SKIP:
+                    self.statistik['dilewati'] += 1
+                else:
+                    self._error(nomor, {self.kunci: ['Data dengan kunci ini sudah ada.']})
+
+            if self.model is Peminjaman:
+                baru = self._cek_peminjaman_aktif(baru)
+
+            self._tulis(baru, lama)
+            if self.dry_run:
+                transaction.set_rollback(True)
+
+    def _kunci_yang_ada(self, kunci):
+        kunci = [k for k in kunci if k is not None]
+        if not kunci:
+            return {}
+        return dict(
+            self.model.objects.filter(**{f'{self.kunci_attname}__in': kunci})
+            .values_list(self.kunci_attname, 'pk')
+        )
+
+    def _id_diarsipkan(self, ids):
+        """Id peminjaman di batch ini yang sudah dipindah ke tabel arsip"""
+        ids = [i for i in ids if i is not None]
+        if self.model is not Peminjaman or not ids:
+            return set()
+        return set(PeminjamanArsip.objects.filter(pk__in=ids).values_list('pk', flat=True))
+
+    def _cek_relasi(self, bersih):
+        """Satu query per relasi untuk memastikan buku & anggota ada"""
+        buku = set(Buku.objects.filter(pk__in={n['buku_id'] for _, n in bersih}).values_list('pk', flat=True))
+        anggota = set(Anggota.objects.filter(pk__in={n['anggota_id'] for _, n in bersih}).values_list('pk', flat=True))
+        valid = []
+        for nomor, nilai in bersih:
+            errors = {}
+            if nilai['buku_id'] not in buku:
+                errors['buku'] = [f"Buku dengan id {nilai['buku_id']} tidak ditemukan."]
+            if nilai['anggota_id'] not in anggota:
+                errors['anggota'] = [f"Anggota dengan id {nilai['anggota_id']} tidak ditemukan."]
+            if errors:
+                self._error(nomor, errors)
+            else:
+                valid.append((nomor, nilai))
+        return valid
+
+    def _cek_peminjaman_aktif(self, baru):
+        """Peminjaman aktif baru tidak boleh bentrok dengan peminjaman aktif lain"""
+        aktif = {n['buku_id'] for _, n in baru if n['status_peminjaman'] == 'aktif'}
+        if not aktif:
+            return baru
+        self.buku_aktif |= set(
+            Peminjaman.objects.filter(buku_id__in=aktif, status_peminjaman='aktif')
+            .values_list('buku_id', flat=True)
+        )
+        valid = []
+        for nomor, nilai in baru:
+            if nilai['status_peminjaman'] == 'aktif':
+                if nilai['buku_id'] in self.buku_aktif:
+                    self._error(nomor, {'buku': [
+                        f"Buku dengan id {nilai['buku_id']} sedang dipinjam dan tidak tersedia."
+                    ]})
+                    continue
+                self.buku_aktif.add(nilai['buku_id'])
+            valid.append((nomor, nilai))
+        return valid
+
+    def _tulis(self, baru, lama):
+        try:
+            with transaction.atomic():
+                self.model.objects.bulk_create([self.model(**n) for _, n in baru])
+                self.model.objects.bulk_update(
+                    [self.model(**n) for _, n in lama], self.kolom_update, batch_size=self.batch_size
+                )
+        except IntegrityError:
+            # Ada bentrok yang tidak terlihat saat validasi (mis. penulis lain
+            # menulis bersamaan): ulangi per baris agar baris lain tetap masuk
+            self._tulis_per_baris(baru, lama)
+            return
+        self.statistik['dibuat'] += len(baru)
+        self.statistik['diperbarui'] += len(lama)
+
+    def _tulis_per_baris(self, baru, lama):
+        for jenis, daftar in (('dibuat', baru), ('diperbarui', lama)):
+            for nomor, nilai in daftar:
+                obj = self.model(**nilai)
+                try:
+                    with transaction.atomic():
+                        if jenis == 'dibuat':
+                            obj.save(force_insert=True)
+                        else:
+                            obj.save(force_update=True)
+                except (IntegrityError, BukuSedangDipinjam) as e:
+                    self._error(nomor, {'__all__': [str(e)]})
+                else:
+                    self.statistik[jenis] += 1
@@ -0,0 +1,41 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from iventaris_app import arsip
+
+
+class Command(BaseCommand):
+    help = (
+        'Pindahkan peminjaman selesai yang sudah lama ke tabel arsip agar tabel peminjaman tetap kecil '
+        '(jalankan berkala, mis. lewat cron)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hari',
+            type=int,
+            default=getattr(settings, 'ARSIP_SETELAH_HARI', 365),
+            help='Arsipkan peminjaman yang selesai lebih dari N hari lalu (default: ARSIP_SETELAH_HARI)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=arsip.UKURAN_BATCH,
+            help=f'Jumlah baris per transaksi (default: {arsip.UKURAN_BATCH})',
+        )
+
+    def handle(self, *args, **options):
+        if options['hari'] < 0 or options['batch_size'] < 1:
+            raise CommandError('--hari tidak boleh negatif dan --batch-size minimal 1.')
+        sebelum = timezone.localdate() - timedelta(days=options['hari'])
+
+        def progress(jumlah):
+            self.stdout.write(f'  {jumlah} peminjaman dipindahkan...')
+
+        total = arsip.arsipkan(sebelum, ukuran_batch=options['batch_size'], progress=progress)
+        self.stdout.write(self.style.SUCCESS(
+            f'{total} peminjaman yang selesai sebelum {sebelum.isoformat()} dipindahkan ke arsip.'
+        ))
@@ -0,0 +1,69 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from iventaris_app import benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark in-process semua endpoint API & template di database uji berisi '
+        'perpustakaan sintetis: p50/p99, jumlah query, puncak memori, dibandingkan dengan baseline'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--buku', type=int, default=1000, help='Jumlah buku sintetis (default: 1000)')
+        parser.add_argument('--anggota', type=int, default=500, help='Jumlah anggota sintetis (default: 500)')
+        parser.add_argument('--peminjaman', type=int, default=10000, help='Jumlah peminjaman sintetis (default: 10000)')
+        parser.add_argument('--seed', type=int, default=0, help='Seed data sintetis (default: 0)')
+        parser.add_argument('--ulangan', type=int, default=20, help='Ulangan per skenario (default: 20)')
+        parser.add_argument('--pemanasan', type=int, default=2, help='Ulangan pemanasan yang tidak diukur (default: 2)')
+        parser.add_argument('--only', action='append', help='Hanya skenario yang cocok pola glob ini (bisa berulang)')
+        parser.add_argument('--skip', action='append', help='Lewati skenario yang cocok pola glob ini (bisa berulang)')
+        parser.add_argument('--output', help='Simpan hasil sebagai JSON ke file ini')
+        parser.add_argument('--baseline', help='File JSON hasil sebelumnya untuk dibandingkan')
+        parser.add_argument(
+            '--toleransi', type=float, default=0.2,
+            help='Kenaikan relatif yang masih diterima sebelum dianggap regresi (default: 0.2)',
+        )
+        parser.add_argument(
+            '--database-sekarang', action='store_true',
+            help='Ukur database yang sedang dipakai tanpa seeding (skenario tulis tetap di-rollback)',
+        )
+
+    def handle(self, *args, **options):
+        if options['ulangan'] < 1:
+            raise CommandError('--ulangan harus lebih dari 0.')
+        baseline = benchmark.muat(options['baseline']) if options['baseline'] else None
+
+        if options['database_sekarang']:
+            skala = None
+        else:
+            skala = {k: options[k] for k in ('buku', 'anggota', 'peminjaman', 'seed')}
+        with benchmark.database_benchmark(skala, progress=self.stdout.write):
+            try:
+                skenario = benchmark.pilih(benchmark.daftar_skenario(), options['only'], options['skip'])
+            except ValueError as e:
+                raise CommandError(str(e))
+            hasil = benchmark.Benchmark(options['ulangan'], options['pemanasan']).jalankan(
+                skenario, progress=self.tampilkan
+            )
+
+        data = {'meta': benchmark.metadata(skala or 'database sekarang', options['ulangan']), 'hasil': hasil}
+        if options['output']:
+            benchmark.simpan(options['output'], data)
+            self.stdout.write(f"Hasil disimpan ke {options['output']}")
+
+        if baseline:
+            regresi = benchmark.bandingkan(hasil, baseline['hasil'], toleransi=options['toleransi'])
+            for nama, metrik, lama, baru in regresi:
+                self.stdout.write(self.style.ERROR(f'REGRESI {nama} {metrik}: {lama} -> {baru}'))
+            if regresi:
+                raise CommandError(f'{len(regresi)} regresi dibanding {options["baseline"]}.')
+            self.stdout.write(self.style.SUCCESS('Tidak ada regresi dibanding baseline.'))
+
+    def tampilkan(self, nama, metrik):
+        gaya = self.style.SUCCESS if metrik['status'] < 400 else self.style.ERROR
+        self.stdout.write(
+            f"{nama:<32} {gaya(str(metrik['status']))} "
+            f"p50 {metrik['p50_ms']:>9.2f} ms  p99 {metrik['p99_ms']:>9.2f} ms  "
+            f"{metrik['queries']:>4} query  {metrik['peak_kb']:>9.1f} KB"
+        )
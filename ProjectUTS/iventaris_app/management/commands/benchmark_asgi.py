@@ -0,0 +1,64 @@
+import fnmatch
+
+from django.core.management.base import BaseCommand, CommandError
+
+from iventaris_app import benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        'Uji beban endpoint baca: view DRF lewat handler WSGI (thread) dibanding view async '
+        'lewat handler ASGI pada konkurensi tinggi (request/detik, p50/p99)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--buku', type=int, default=1000, help='Jumlah buku sintetis (default: 1000)')
+        parser.add_argument('--anggota', type=int, default=500, help='Jumlah anggota sintetis (default: 500)')
+        parser.add_argument('--peminjaman', type=int, default=10000, help='Jumlah peminjaman sintetis (default: 10000)')
+        parser.add_argument('--seed', type=int, default=0, help='Seed data sintetis (default: 0)')
+        parser.add_argument('--konkurensi', type=int, default=64, help='Request bersamaan (default: 64)')
+        parser.add_argument('--jumlah', type=int, default=1000, help='Request per endpoint per handler (default: 1000)')
+        parser.add_argument('--only', action='append', help='Hanya endpoint yang cocok pola glob ini (bisa berulang)')
+        parser.add_argument('--output', help='Simpan hasil sebagai JSON ke file ini')
+        parser.add_argument(
+            '--database-sekarang', action='store_true',
+            help='Ukur database yang sedang dipakai tanpa seeding',
+        )
+
+    def handle(self, *args, **options):
+        if options['konkurensi'] < 1 or options['jumlah'] < 1:
+            raise CommandError('--konkurensi dan --jumlah harus lebih dari 0.')
+        konkurensi, jumlah = options['konkurensi'], options['jumlah']
+
+        if options['database_sekarang']:
+            skala = None
+        else:
+            skala = {k: options[k] for k in ('buku', 'anggota', 'peminjaman', 'seed')}
+        hasil = {}
+        with benchmark.database_benchmark(skala, progress=self.stdout.write):
+            try:
+                pasangan = benchmark.pasangan_async()
+            except ValueError as e:
+                raise CommandError(str(e))
+            if options['only']:
+                pasangan = [p for p in pasangan if any(fnmatch.fnmatch(p[0], pola) for pola in options['only'])]
+            for nama, url_wsgi, url_asgi in pasangan:
+                hasil[nama] = {
+                    'wsgi': benchmark.beban_wsgi(url_wsgi, konkurensi, jumlah),
+                    'asgi': benchmark.beban_asgi(url_asgi, konkurensi, jumlah),
+                }
+                self.tampilkan(nama, hasil[nama])
+
+        if options['output']:
+            meta = dict(benchmark.metadata(skala or 'database sekarang', jumlah), konkurensi=konkurensi)
+            benchmark.simpan(options['output'], {'meta': meta, 'hasil': hasil})
+            self.stdout.write(f"Hasil disimpan ke {options['output']}")
+
+    def tampilkan(self, nama, hasil):
+        for handler in ('wsgi', 'asgi'):
+            m = hasil[handler]
+            gaya = self.style.ERROR if m['gagal'] else self.style.SUCCESS
+            self.stdout.write(
+                f"{nama:<20} {handler}  {m['rps']:>8.1f} req/s  "
+                f"p50 {m['p50_ms']:>9.2f} ms  p99 {m['p99_ms']:>9.2f} ms  {gaya(str(m['gagal']) + ' gagal')}"
+            )
@@ -0,0 +1,29 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from iventaris_app import changes
+
+
+class Command(BaseCommand):
+    help = (
+        'Padatkan log perubahan (/api/changes/): buang entri yang lebih tua dari masa retensi '
+        'dan entri yang sudah digantikan entri lebih baru (jalankan berkala, mis. lewat cron)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hari',
+            type=int,
+            default=getattr(settings, 'PERUBAHAN_RETENSI_HARI', 7),
+            help='Simpan entri N hari terakhir (default: PERUBAHAN_RETENSI_HARI)',
+        )
+
+    def handle(self, *args, **options):
+        if options['hari'] < 0:
+            raise CommandError('--hari tidak boleh negatif.')
+        sebelum = timezone.now() - timedelta(days=options['hari'])
+        jumlah = changes.padatkan(sebelum)
+        self.stdout.write(self.style.SUCCESS(f'{jumlah} entri log perubahan dibuang.'))
@@ -0,0 +1,94 @@
+import json
+from contextlib import ExitStack
+
+from django.core.management.base import BaseCommand, CommandError
+
+from iventaris_app.importer import (
+    DUPLIKAT_ERROR, DUPLIKAT_SKIP, DUPLIKAT_UPDATE, KONFIGURASI, PEMBACA, Importer, tebak_format,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Impor massal Buku, Anggota atau Peminjaman dari file CSV/JSON/NDJSON '
+        '(stream, validasi per batch, bulk_create per transaksi)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('model', choices=sorted(KONFIGURASI), help='Model tujuan impor')
+        parser.add_argument('path', help='File sumber (.csv, .json, .ndjson/.jsonl)')
+        parser.add_argument(
+            '--format', choices=sorted(PEMBACA),
+            help='Format file (default: ditebak dari ekstensi)',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=5000,
+            help='Jumlah baris per batch/transaksi (default: 5000)',
+        )
+        parser.add_argument(
+            '--on-duplicate', choices=[DUPLIKAT_ERROR, DUPLIKAT_SKIP, DUPLIKAT_UPDATE], default=DUPLIKAT_ERROR,
+            help='Perlakuan baris yang kuncinya sudah ada: error (default), skip, atau update (upsert)',
+        )
+        parser.add_argument(
+            '--key',
+            help='Kolom kunci untuk deteksi duplikat (default: id; email untuk anggota)',
+        )
+        parser.add_argument('--dry-run', action='store_true', help='Validasi saja, semua batch di-rollback')
+        parser.add_argument('--errors-file', help='Tulis semua baris yang gagal ke file NDJSON ini')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size harus lebih dari 0.')
+        format = options['format'] or tebak_format(options['path'])
+
+        with ExitStack() as stack:
+            on_error = None
+            if options['errors_file']:
+                # Dialirkan per error agar file besar yang banyak salahnya tidak menumpuk di memori
+                try:
+                    file_error = stack.enter_context(open(options['errors_file'], 'w', encoding='utf-8'))
+                except OSError as e:
+                    raise CommandError(f'Gagal membuka {options["errors_file"]}: {e}')
+
+                def on_error(error):
+                    file_error.write(json.dumps(error, ensure_ascii=False) + '\n')
+
+            try:
+                importer = Importer(
+                    options['model'],
+                    on_duplicate=options['on_duplicate'],
+                    kunci=options['key'],
+                    batch_size=options['batch_size'],
+                    dry_run=options['dry_run'],
+                    on_error=on_error,
+                    maks_error=10,
+                )
+            except ValueError as e:
+                raise CommandError(str(e))
+
+            try:
+                with open(options['path'], newline='', encoding='utf-8') as f:
+                    statistik = importer.jalankan(PEMBACA[format](f), progress=self.tampilkan_progress)
+            except (OSError, ValueError) as e:
+                raise CommandError(f'Gagal membaca {options["path"]}: {e}')
+
+        self.stderr.write('')
+        for error in importer.errors:
+            self.stdout.write(self.style.WARNING(f"Baris {error['baris']}: {error['errors']}"))
+        if statistik['error'] > len(importer.errors):
+            self.stdout.write(self.style.WARNING(f"... dan {statistik['error'] - len(importer.errors)} error lainnya"))
+
+        awalan = '[dry-run] ' if options['dry_run'] else ''
+        self.stdout.write(self.style.SUCCESS(
+            f"{awalan}{statistik['dibaca']} baris dibaca: {statistik['dibuat']} dibuat, "
+            f"{statistik['diperbarui']} diperbarui, {statistik['dilewati']} dilewati, "
+            f"{statistik['error']} error"
+        ))
+
+    def tampilkan_progress(self, statistik, detik):
+        laju = statistik['dibaca'] / detik if detik else 0
+        self.stderr.write(
+            f"\r{statistik['dibaca']} baris ({laju:,.0f} baris/detik, {statistik['error']} error)",
+            ending='',
+        )
+        self.stderr.flush()
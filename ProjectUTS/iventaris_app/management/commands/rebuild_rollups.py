@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+
+from iventaris_app import rollups
+
+
+class Command(BaseCommand):
+    help = 'Bangun ulang tabel rekap analitik sirkulasi dari tabel Peminjaman'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database',
+            default=DEFAULT_DB_ALIAS,
+            help='Alias database yang tabel rekapnya dibangun ulang (default: "default")',
+        )
+
+    def handle(self, *args, **options):
+        jumlah = rollups.bangun_ulang(using=options['database'])
+        for model, n in jumlah.items():
+            self.stdout.write(self.style.SUCCESS(f'{model._meta.db_table}: {n} baris'))
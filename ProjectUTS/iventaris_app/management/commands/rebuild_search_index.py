@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from iventaris_app.search import KOLOM_INDEKS, bangun_ulang, tabel_fts
+
+
+class Command(BaseCommand):
+    help = 'Bangun ulang indeks pencarian full-text (FTS5) untuk Buku dan Anggota'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database',
+            default=DEFAULT_DB_ALIAS,
+            help='Alias database yang indeksnya dibangun ulang (default: "default")',
+        )
+
+    def handle(self, *args, **options):
+        using = options['database']
+        if connections[using].vendor != 'sqlite':
+            raise CommandError('Indeks FTS5 hanya tersedia untuk database SQLite.')
+
+        for model in KOLOM_INDEKS:
+            jumlah = bangun_ulang(model, using=using)
+            self.stdout.write(self.style.SUCCESS(
+                f'{tabel_fts(model)}: {jumlah} baris diindeks ulang'
+            ))
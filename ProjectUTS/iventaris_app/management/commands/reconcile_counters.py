@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from iventaris_app import counters
+
+
+class Command(BaseCommand):
+    help = 'Samakan penghitung dashboard dengan isi tabel (memperbaiki drift dari operasi massal)'
+
+    def handle(self, *args, **options):
+        nilai, drift = counters.rekonsiliasi()
+
+        if not drift:
+            self.stdout.write(self.style.SUCCESS('Penghitung sudah sesuai, tidak ada drift.'))
+        for nama, selisih in drift.items():
+            self.stdout.write(self.style.WARNING(
+                f'{nama}: diperbaiki menjadi {nilai[nama]} (selisih {selisih:+d})'
+            ))
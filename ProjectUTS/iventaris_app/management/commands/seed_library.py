@@ -0,0 +1,46 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+from iventaris_app.seeder import buat_perpustakaan
+
+
+class Command(BaseCommand):
+    help = 'Isi database dengan perpustakaan sintetis (bulk insert) untuk uji skala'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--buku', type=int, default=1000, help='Jumlah buku (default: 1000)')
+        parser.add_argument('--anggota', type=int, default=500, help='Jumlah anggota (default: 500)')
+        parser.add_argument('--peminjaman', type=int, default=10000, help='Jumlah peminjaman (default: 10000)')
+        parser.add_argument('--seed', type=int, default=0, help='Seed random agar data bisa diulang (default: 0)')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Baris per bulk insert (default: 5000)')
+        parser.add_argument(
+            '--database', default=DEFAULT_DB_ALIAS,
+            help='Alias database yang diisi (default: "default")',
+        )
+
+    def handle(self, *args, **options):
+        mulai = time.monotonic()
+
+        def progress(tahap, jumlah):
+            self.stdout.write(f'{tahap}: {jumlah} baris ({time.monotonic() - mulai:.1f} detik)')
+
+        try:
+            jumlah = buat_perpustakaan(
+                buku=options['buku'],
+                anggota=options['anggota'],
+                peminjaman=options['peminjaman'],
+                seed=options['seed'],
+                batch_size=options['batch_size'],
+                using=options['database'],
+                progress=progress,
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        total = sum(jumlah.values())
+        detik = time.monotonic() - mulai
+        self.stdout.write(self.style.SUCCESS(
+            f'{total} baris dibuat dalam {detik:.1f} detik ({total / detik:,.0f} baris/detik)'
+        ))
@@ -0,0 +1,30 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from iventaris_app import counters
+
+
+class Command(BaseCommand):
+    help = (
+        'Hitung jumlah peminjaman yang lewat jatuh tempo dan simpan sebagai snapshot dashboard '
+        '(jalankan harian, mis. lewat cron setelah tengah malam)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tanggal', help='Tanggal snapshot YYYY-MM-DD (default: hari ini)')
+
+    def handle(self, *args, **options):
+        if options['tanggal']:
+            try:
+                tanggal = date.fromisoformat(options['tanggal'])
+            except ValueError:
+                raise CommandError('--tanggal harus berformat YYYY-MM-DD.')
+        else:
+            tanggal = timezone.localdate()
+
+        jumlah = counters.snapshot_terlambat(tanggal)
+        self.stdout.write(self.style.SUCCESS(
+            f'{jumlah} peminjaman terlambat per {tanggal.isoformat()}.'
+        ))
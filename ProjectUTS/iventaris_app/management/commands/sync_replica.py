@@ -0,0 +1,63 @@
+import os
+import sqlite3
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class Command(BaseCommand):
+    help = (
+        'Salin database SQLite primer ke replika lokal (backup API SQLite). '
+        'Dengan --interval, sinkronisasi diulang terus secara berkala.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database', default='replica',
+            help='Alias replika tujuan (default: "replica")',
+        )
+        parser.add_argument(
+            '--interval', type=float, default=0,
+            help='Ulangi setiap N detik (default: sekali saja)',
+        )
+        parser.add_argument(
+            '--pages', type=int, default=1024,
+            help='Halaman yang disalin per langkah backup; primer tetap bisa ditulis di sela langkah (default: 1024)',
+        )
+
+    def handle(self, *args, **options):
+        alias = options['database']
+        if alias not in connections:
+            raise CommandError(f'Alias database "{alias}" tidak ada di DATABASES.')
+        for nama in (DEFAULT_DB_ALIAS, alias):
+            if connections[nama].vendor != 'sqlite':
+                raise CommandError('sync_replica hanya untuk database SQLite.')
+
+        tujuan = str(connections[alias].settings_dict['NAME'])
+        while True:
+            mulai = time.monotonic()
+            ukuran = self.salin(tujuan, options['pages'])
+            self.stdout.write(self.style.SUCCESS(
+                f'{tujuan}: {ukuran / 1024:,.0f} KB disalin dalam {time.monotonic() - mulai:.2f} detik'
+            ))
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
+
+    def salin(self, tujuan, pages):
+        """
+        Backup ke file sementara lalu os.replace ke lokasi replika, sehingga
+        pembaca replika tidak pernah melihat salinan setengah jadi. Koneksi
+        yang dibuka ulang (setiap request, CONN_MAX_AGE=0) memakai salinan baru.
+        """
+        sementara = f'{tujuan}.tmp'
+        sumber = connections[DEFAULT_DB_ALIAS]
+        sumber.ensure_connection()
+        salinan = sqlite3.connect(sementara)
+        try:
+            sumber.connection.backup(salinan, pages=pages)
+        finally:
+            salinan.close()
+        os.replace(sementara, tujuan)
+        return os.path.getsize(tujuan)
@@ -0,0 +1,271 @@
+"""
+Metrik per endpoint dalam format teks Prometheus (lihat /api/metrics/).
+
+MetrikMiddleware mengukur setiap request (WSGI maupun ASGI): latensi, jumlah
+& durasi query database (lewat execute wrapper di setiap koneksi) dan ukuran
+respons, lalu mengelompokkannya per nama URL dan method. Selama request
+berjalan angka dikumpulkan di objek milik request itu sendiri; registry hanya
+dikunci sekali per request saat hasilnya digabung, sehingga aman dipakai
+banyak thread dan cukup ringan untuk selalu aktif.
+
+Registry ada per proses: setiap worker (gunicorn, dsb.) melaporkan
+angkanya sendiri.
+"""
+import contextvars
+import threading
+import time
+from bisect import bisect_left
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+BUCKET_DURASI = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKET_QUERY = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250, 1000)
+BUCKET_UKURAN = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+# Label untuk request yang tidak cocok dengan URL mana pun (mencegah label
+# tak terbatas dari path acak)
+TANPA_ROUTE = '<unmatched>'
+
+
+class Histogram:
+    __slots__ = ('bucket', 'jumlah', 'total', 'banyak')
+
+    def __init__(self, bucket):
+        self.bucket = bucket
+        self.jumlah = [0] * (len(bucket) + 1)  # slot terakhir = +Inf
+        self.total = 0.0
+        self.banyak = 0
+
+    def catat(self, nilai):
+        self.jumlah[bisect_left(self.bucket, nilai)] += 1
+        self.total += nilai
+        self.banyak += 1
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.request = {}         # (route, method, status) -> jumlah
+            self.durasi = {}          # (route, method) -> Histogram
+            self.query = {}           # (route, method) -> Histogram jumlah query
+            self.durasi_query = {}    # (route, method) -> total detik
+            self.ukuran = {}          # (route, method) -> Histogram byte
+
+    def catat(self, route, method, status, durasi, jumlah_query, durasi_query, ukuran):
+        kunci = (route, method)
+        with self._lock:
+            kunci_status = (route, method, str(status))
+            self.request[kunci_status] = self.request.get(kunci_status, 0) + 1
+            if kunci not in self.durasi:
+                self.durasi[kunci] = Histogram(BUCKET_DURASI)
+                self.query[kunci] = Histogram(BUCKET_QUERY)
+                self.ukuran[kunci] = Histogram(BUCKET_UKURAN)
+                self.durasi_query[kunci] = 0.0
+            self.durasi[kunci].catat(durasi)
+            self.query[kunci].catat(jumlah_query)
+            self.durasi_query[kunci] += durasi_query
+            self.ukuran[kunci].catat(ukuran)
+
+    def render(self):
+        """Seluruh metrik dalam format teks Prometheus 0.0.4"""
+        with self._lock:
+            request = dict(self.request)
+            durasi = {k: _salin(h) for k, h in self.durasi.items()}
+            query = {k: _salin(h) for k, h in self.query.items()}
+            ukuran = {k: _salin(h) for k, h in self.ukuran.items()}
+            durasi_query = dict(self.durasi_query)
+
+        baris = []
+        baris += _header('iventaris_http_requests_total', 'counter', 'Jumlah request per route, method dan status')
+        for (route, method, status), nilai in sorted(request.items()):
+            baris.append(f'iventaris_http_requests_total{_label(route=route, method=method, status=status)} {nilai}')
+
+        baris += _render_histogram(
+            'iventaris_http_request_duration_seconds', 'Latensi request (detik)', durasi)
+        baris += _render_histogram(
+            'iventaris_db_queries_per_request', 'Jumlah query database per request', query)
+
+        baris += _header('iventaris_db_query_duration_seconds_total', 'counter', 'Total waktu query database (detik)')
+        for (route, method), nilai in sorted(durasi_query.items()):
+            baris.append(
+                f'iventaris_db_query_duration_seconds_total{_label(route=route, method=method)} {_angka(nilai)}'
+            )
+
+        baris += _render_histogram(
+            'iventaris_http_response_size_bytes', 'Ukuran body respons (byte)', ukuran)
+        return '\n'.join(baris) + '\n'
+
+
+def _salin(histogram):
+    salinan = Histogram(histogram.bucket)
+    salinan.jumlah = list(histogram.jumlah)
+    salinan.total, salinan.banyak = histogram.total, histogram.banyak
+    return salinan
+
+
+def _header(nama, jenis, bantuan):
+    return [f'# HELP {nama} {bantuan}', f'# TYPE {nama} {jenis}']
+
+
+def _render_histogram(nama, bantuan, data):
+    baris = _header(nama, 'histogram', bantuan)
+    for (route, method), h in sorted(data.items()):
+        kumulatif = 0
+        for batas, jumlah in zip(list(h.bucket) + ['+Inf'], h.jumlah):
+            kumulatif += jumlah
+            le = batas if batas == '+Inf' else _angka(batas)
+            baris.append(f'{nama}_bucket{_label(route=route, method=method, le=le)} {kumulatif}')
+        baris.append(f'{nama}_sum{_label(route=route, method=method)} {_angka(h.total)}')
+        baris.append(f'{nama}_count{_label(route=route, method=method)} {h.banyak}')
+    return baris
+
+
+def _angka(nilai):
+    return repr(float(nilai)) if isinstance(nilai, float) else str(nilai)
+
+
+def _label(**label):
+    isi = ','.join(
+        '%s="%s"' % (k, str(v).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n'))
+        for k, v in label.items()
+    )
+    return '{' + isi + '}'
+
+
+registry = Registry()
+
+
+# =============================================================================
+# MIDDLEWARE
+# =============================================================================
+
+# Pengukuran request yang sedang berjalan. Contextvar ikut terbawa ke thread
+# sync_to_async, sehingga query ORM async pada view ASGI juga tercatat.
+_aktif = contextvars.ContextVar('pengukuran_metrik', default=None)
+
+
+class _Pengukuran:
+    """Angka satu request; hanya diakses oleh konteks yang menjalankannya"""
+    __slots__ = ('mulai', 'jumlah_query', 'durasi_query')
+
+    def __init__(self):
+        self.mulai = time.perf_counter()
+        self.jumlah_query = 0
+        self.durasi_query = 0.0
+
+
+def _pencatat_query(execute, sql, params, many, context):
+    ukur = _aktif.get()
+    if ukur is None:
+        return execute(sql, params, many, context)
+    mulai = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        ukur.durasi_query += time.perf_counter() - mulai
+        ukur.jumlah_query += 1
+
+
+@receiver(connection_created)
+def pasang_pencatat_query(sender, connection, **kwargs):
+    """Execute wrapper permanen di setiap koneksi, di thread mana pun dibuat"""
+    if _pencatat_query not in connection.execute_wrappers:
+        # Paling depan: wrapper sementara (connection.execute_wrapper) di-pop dari belakang
+        connection.execute_wrappers.insert(0, _pencatat_query)
+
+
+def _route(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match and match.view_name else TANPA_ROUTE
+
+
+class MetrikMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+        # Koneksi yang sudah terbuka sebelum middleware dimuat
+        for koneksi in connections.all(initialized_only=True):
+            pasang_pencatat_query(None, koneksi)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        ukur = _Pengukuran()
+        token = _aktif.set(ukur)
+        try:
+            response = self.get_response(request)
+        finally:
+            _aktif.reset(token)
+        return self._selesai(request, response, ukur)
+
+    async def __acall__(self, request):
+        ukur = _Pengukuran()
+        token = _aktif.set(ukur)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _aktif.reset(token)
+        return self._selesai(request, response, ukur)
+
+    def _selesai(self, request, response, ukur):
+        if not response.streaming:
+            self._catat(request, response, ukur, len(response.content))
+        elif response.is_async:
+            # Query & isi respons stream baru terjadi saat dikirim ke klien
+            response.streaming_content = self._astream(request, response, ukur, aiter(response.streaming_content))
+        else:
+            response.streaming_content = self._stream(request, response, ukur, iter(response.streaming_content))
+        return response
+
+    def _stream(self, request, response, ukur, isi):
+        ukuran = 0
+        try:
+            while True:
+                # Pengukuran hanya aktif saat potongan berikutnya dibuat,
+                # bukan selama generator menunggu di yield
+                token = _aktif.set(ukur)
+                try:
+                    potongan = next(isi, None)
+                finally:
+                    _aktif.reset(token)
+                if potongan is None:
+                    break
+                ukuran += len(potongan)
+                yield potongan
+        finally:
+            self._catat(request, response, ukur, ukuran)
+
+    async def _astream(self, request, response, ukur, isi):
+        ukuran = 0
+        try:
+            while True:
+                token = _aktif.set(ukur)
+                try:
+                    potongan = await anext(isi, None)
+                finally:
+                    _aktif.reset(token)
+                if potongan is None:
+                    break
+                ukuran += len(potongan)
+                yield potongan
+        finally:
+            self._catat(request, response, ukur, ukuran)
+
+    def _catat(self, request, response, ukur, ukuran):
+        registry.catat(
+            _route(request), request.method, response.status_code,
+            time.perf_counter() - ukur.mulai, ukur.jumlah_query, ukur.durasi_query, ukuran,
+        )
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-17 23:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('iventaris_app', '0002_peminjaman_status_peminjaman'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='peminjaman',
+            index=models.Index(fields=['-tanggal_pinjam', '-id'], name='peminjaman_tgl_id_idx'),
+        ),
+    ]
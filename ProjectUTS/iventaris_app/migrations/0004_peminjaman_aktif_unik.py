@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-17 23:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('iventaris_app', '0003_peminjaman_tgl_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='peminjaman',
+            constraint=models.UniqueConstraint(condition=models.Q(('status_peminjaman', 'aktif')), fields=('buku',), name='peminjaman_aktif_unik'),
+        ),
+    ]
@@ -0,0 +1,75 @@
+from django.db import migrations
+
+
+# Indeks FTS5 "external content": teks tidak disimpan dua kali, tabel FTS hanya
+# menyimpan inverted index atas kolom tabel aslinya. Trigger menjaga indeks tetap
+# sinkron untuk setiap INSERT/UPDATE/DELETE, termasuk bulk_create dan
+# queryset.update()/delete() yang tidak mengirim signal Django.
+INDEKS = [
+    # (tabel asli, kolom yang diindeks, bobot bm25 per kolom)
+    ('iventaris_app_buku', ['judul', 'penulis', 'tahun'], [10.0, 5.0, 1.0]),
+    ('iventaris_app_anggota', ['nama', 'email'], [10.0, 2.0]),
+]
+
+
+def sql_buat(tabel, kolom, bobot):
+    fts = f'{tabel}_fts'
+    daftar = ', '.join(kolom)
+    baru = ', '.join(f'new.{k}' for k in kolom)
+    lama = ', '.join(f'old.{k}' for k in kolom)
+    return [
+        f"""CREATE VIRTUAL TABLE {fts} USING fts5(
+            {daftar},
+            content='{tabel}', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+        )""",
+        f"""CREATE TRIGGER {fts}_ai AFTER INSERT ON {tabel} BEGIN
+            INSERT INTO {fts}(rowid, {daftar}) VALUES (new.id, {baru});
+        END""",
+        f"""CREATE TRIGGER {fts}_ad AFTER DELETE ON {tabel} BEGIN
+            INSERT INTO {fts}({fts}, rowid, {daftar}) VALUES ('delete', old.id, {lama});
+        END""",
+        f"""CREATE TRIGGER {fts}_au AFTER UPDATE ON {tabel} BEGIN
+            INSERT INTO {fts}({fts}, rowid, {daftar}) VALUES ('delete', old.id, {lama});
+            INSERT INTO {fts}(rowid, {daftar}) VALUES (new.id, {baru});
+        END""",
+        f"INSERT INTO {fts}({fts}, rank) VALUES ('rank', 'bm25({', '.join(map(str, bobot))})')",
+        f"INSERT INTO {fts}({fts}) VALUES ('rebuild')",
+    ]
+
+
+def sql_hapus(tabel):
+    fts = f'{tabel}_fts'
+    return [
+        f'DROP TRIGGER IF EXISTS {fts}_ai',
+        f'DROP TRIGGER IF EXISTS {fts}_ad',
+        f'DROP TRIGGER IF EXISTS {fts}_au',
+        f'DROP TABLE IF EXISTS {fts}',
+    ]
+
+
+def buat_indeks(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for tabel, kolom, bobot in INDEKS:
+        for sql in sql_buat(tabel, kolom, bobot):
+            schema_editor.execute(sql)
+
+
+def hapus_indeks(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for tabel, _, _ in INDEKS:
+        for sql in sql_hapus(tabel):
+            schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('iventaris_app', '0004_peminjaman_aktif_unik'),
+    ]
+
+    operations = [
+        migrations.RunPython(buat_indeks, hapus_indeks),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.8 on 2026-10-17 23:35
+
+from django.db import migrations, models
+
+
+def isi_penghitung(apps, schema_editor):
+    Buku = apps.get_model('iventaris_app', 'Buku')
+    Anggota = apps.get_model('iventaris_app', 'Anggota')
+    Peminjaman = apps.get_model('iventaris_app', 'Peminjaman')
+    Penghitung = apps.get_model('iventaris_app', 'Penghitung')
+    db = schema_editor.connection.alias
+
+    nilai = {
+        'buku': Buku.objects.using(db).count(),
+        'anggota': Anggota.objects.using(db).count(),
+        'peminjaman_aktif': Peminjaman.objects.using(db).filter(status_peminjaman='aktif').count(),
+        'peminjaman_selesai': Peminjaman.objects.using(db).filter(status_peminjaman='selesai').count(),
+    }
+    Penghitung.objects.using(db).bulk_create(
+        [Penghitung(nama=nama, nilai=jumlah) for nama, jumlah in nilai.items()]
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('iventaris_app', '0005_indeks_pencarian_fts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Penghitung',
+            fields=[
+                ('nama', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('nilai', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(isi_penghitung, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+import time
+
+from django.db import migrations
+
+
+def isi_versi(apps, schema_editor):
+    Penghitung = apps.get_model('iventaris_app', 'Penghitung')
+    db = schema_editor.connection.alias
+    # Versi awal = waktu migrasi (mikrodetik), lihat iventaris_app/versions.py
+    sekarang = time.time_ns() // 1000
+    Penghitung.objects.using(db).bulk_create(
+        [Penghitung(nama=f'versi.{nama}', nilai=sekarang) for nama in ('buku', 'anggota', 'peminjaman')],
+        ignore_conflicts=True,
+    )
+
+
+def hapus_versi(apps, schema_editor):
+    Penghitung = apps.get_model('iventaris_app', 'Penghitung')
+    Penghitung.objects.using(schema_editor.connection.alias).filter(nama__startswith='versi.').delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('iventaris_app', '0006_penghitung'),
+    ]
+
+    operations = [
+        migrations.RunPython(isi_versi, hapus_versi),
+    ]
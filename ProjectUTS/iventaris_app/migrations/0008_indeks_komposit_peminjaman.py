@@ -0,0 +1,29 @@
+# Generated by Django 5.2.8 on 2026-10-17 23:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('iventaris_app', '0007_versi_model'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='peminjaman',
+            index=models.Index(fields=['buku', 'status_peminjaman'], name='peminjaman_buku_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='peminjaman',
+            index=models.Index(fields=['anggota', '-tanggal_pinjam', '-id'], name='peminjaman_anggota_tgl_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='peminjaman',
+            index=models.Index(fields=['status_peminjaman', '-tanggal_pinjam', '-id'], name='peminjaman_status_tgl_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='peminjaman',
+            index=models.Index(fields=['buku', '-tanggal_pinjam', '-id'], name='peminjaman_buku_tgl_idx'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.8 on 2026-10-18 09:12
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def isi_jatuh_tempo(apps, schema_editor):
+    # Satu UPDATE per tanggal pinjam (memakai index tanggal), bukan per baris
+    Peminjaman = apps.get_model('iventaris_app', 'Peminjaman')
+    db = schema_editor.connection.alias
+    lama = timedelta(days=getattr(settings, 'LAMA_PINJAM_HARI', 14))
+    tanggal = Peminjaman.objects.using(db).order_by().values_list('tanggal_pinjam', flat=True).distinct()
+    for tgl in list(tanggal):
+        Peminjaman.objects.using(db).filter(tanggal_pinjam=tgl).update(jatuh_tempo=tgl + lama)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('iventaris_app', '0008_indeks_komposit_peminjaman'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='peminjaman',
+            name='jatuh_tempo',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.RunPython(isi_jatuh_tempo, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='peminjaman',
+            name='jatuh_tempo',
+            field=models.DateField(blank=True),
+        ),
+        migrations.AddIndex(
+            model_name='peminjaman',
+            index=models.Index(fields=['status_peminjaman', 'jatuh_tempo', 'id'], name='peminjaman_terlambat_idx'),
+        ),
+    ]
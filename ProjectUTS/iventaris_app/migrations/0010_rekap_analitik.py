@@ -0,0 +1,75 @@
+# Generated by Django 5.2.8 on 2026-10-18 00:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def isi_rekap(apps, schema_editor):
+    Peminjaman = apps.get_model('iventaris_app', 'Peminjaman')
+    RekapHarian = apps.get_model('iventaris_app', 'RekapHarian')
+    RekapBukuHarian = apps.get_model('iventaris_app', 'RekapBukuHarian')
+    RekapAnggotaHarian = apps.get_model('iventaris_app', 'RekapAnggotaHarian')
+    db = schema_editor.connection.alias
+    semua = Peminjaman.objects.using(db).order_by()
+
+    harian = {
+        tgl: RekapHarian(tanggal=tgl, dipinjam=n)
+        for tgl, n in semua.values_list('tanggal_pinjam').annotate(n=Count('pk'))
+    }
+    kembali = semua.filter(status_peminjaman='selesai', tanggal_kembali__isnull=False)
+    for tgl, n in kembali.values_list('tanggal_kembali').annotate(n=Count('pk')):
+        harian.setdefault(tgl, RekapHarian(tanggal=tgl)).dikembalikan = n
+    RekapHarian.objects.using(db).bulk_create(harian.values(), batch_size=1000)
+
+    RekapBukuHarian.objects.using(db).bulk_create((
+        RekapBukuHarian(tanggal=tgl, buku_id=buku, dipinjam=n)
+        for tgl, buku, n in semua.values_list('tanggal_pinjam', 'buku').annotate(n=Count('pk')).iterator()
+    ), batch_size=1000)
+    RekapAnggotaHarian.objects.using(db).bulk_create((
+        RekapAnggotaHarian(tanggal=tgl, anggota_id=anggota, dipinjam=n)
+        for tgl, anggota, n in semua.values_list('tanggal_pinjam', 'anggota').annotate(n=Count('pk')).iterator()
+    ), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('iventaris_app', '0009_peminjaman_jatuh_tempo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RekapHarian',
+            fields=[
+                ('tanggal', models.DateField(primary_key=True, serialize=False)),
+                ('dipinjam', models.IntegerField(default=0)),
+                ('dikembalikan', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='RekapAnggotaHarian',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tanggal', models.DateField()),
+                ('dipinjam', models.IntegerField(default=0)),
+                ('anggota', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='iventaris_app.anggota')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('tanggal', 'anggota'), name='rekap_anggota_harian_unik')],
+            },
+        ),
+        migrations.CreateModel(
+            name='RekapBukuHarian',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tanggal', models.DateField()),
+                ('dipinjam', models.IntegerField(default=0)),
+                ('buku', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='iventaris_app.buku')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('tanggal', 'buku'), name='rekap_buku_harian_unik')],
+            },
+        ),
+        migrations.RunPython(isi_rekap, migrations.RunPython.noop),
+    ]
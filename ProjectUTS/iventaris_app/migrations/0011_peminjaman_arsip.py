@@ -0,0 +1,42 @@
+# Generated by Django 5.2.8 on 2026-10-18 00:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def isi_penghitung(apps, schema_editor):
+    # Tabel arsip baru dibuat, jadi penghitungnya mulai dari nol
+    Penghitung = apps.get_model('iventaris_app', 'Penghitung')
+    Penghitung.objects.using(schema_editor.connection.alias).get_or_create(nama='peminjaman_arsip')
+
+
+def hapus_penghitung(apps, schema_editor):
+    Penghitung = apps.get_model('iventaris_app', 'Penghitung')
+    Penghitung.objects.using(schema_editor.connection.alias).filter(nama='peminjaman_arsip').delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('iventaris_app', '0010_rekap_analitik'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PeminjamanArsip',
+            fields=[
+                ('tanggal_pinjam', models.DateField()),
+                ('tanggal_kembali', models.DateField(blank=True, null=True)),
+                ('jatuh_tempo', models.DateField(blank=True)),
+                ('status_peminjaman', models.CharField(choices=[('aktif', 'Aktif (Sedang Dipinjam)'), ('selesai', 'Selesai (Sudah Dikembalikan)')], default='aktif', max_length=10)),
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('anggota', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='iventaris_app.anggota')),
+                ('buku', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='iventaris_app.buku')),
+            ],
+            options={
+                'verbose_name_plural': 'peminjaman arsip',
+                'indexes': [models.Index(fields=['anggota', '-tanggal_pinjam', '-id'], name='arsip_anggota_tgl_idx'), models.Index(fields=['-tanggal_pinjam', '-id'], name='arsip_tgl_id_idx'), models.Index(fields=['buku', '-tanggal_pinjam', '-id'], name='arsip_buku_tgl_idx')],
+            },
+        ),
+        migrations.RunPython(isi_penghitung, hapus_penghitung),
+    ]
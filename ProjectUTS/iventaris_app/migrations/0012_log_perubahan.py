@@ -0,0 +1,28 @@
+# Generated by Django 5.2.8 on 2026-10-18 00:28
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('iventaris_app', '0011_peminjaman_arsip'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Perubahan',
+            fields=[
+                ('seq', models.BigAutoField(primary_key=True, serialize=False)),
+                ('model', models.CharField(max_length=20)),
+                ('objek_id', models.BigIntegerField(blank=True, null=True)),
+                ('aksi', models.CharField(choices=[('buat', 'Dibuat'), ('ubah', 'Diubah'), ('hapus', 'Dihapus'), ('reset', 'Reset')], max_length=5)),
+                ('waktu', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name_plural': 'perubahan',
+                'indexes': [models.Index(fields=['waktu'], name='perubahan_waktu_idx'), models.Index(fields=['model', 'objek_id', 'seq'], name='perubahan_objek_idx')],
+            },
+        ),
+    ]
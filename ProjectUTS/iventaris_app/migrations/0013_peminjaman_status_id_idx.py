@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-18 00:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('iventaris_app', '0012_log_perubahan'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='peminjaman',
+            index=models.Index(fields=['status_peminjaman', 'id'], name='peminjaman_status_id_idx'),
+        ),
+    ]
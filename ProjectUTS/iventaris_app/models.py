@@ -1,19 +1,124 @@
-from django.db import models   
+from datetime import timedelta
 
-class Buku(models.Model):
+from django.conf import settings
+from django.db import IntegrityError, models, router, transaction
+from django.db.models import Count, Exists, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+
+class BukuSedangDipinjam(Exception):
+    """Buku sudah punya peminjaman aktif (melanggar constraint peminjaman_aktif_unik)"""
+
+    def __init__(self, buku):
+        self.buku = buku
+        super().__init__(f"Buku '{buku.judul}' sedang dipinjam.")
+
+
+def jatuh_tempo_default(tanggal_pinjam):
+    """Jatuh tempo menurut kebijakan lama pinjam (settings.LAMA_PINJAM_HARI)"""
+    return tanggal_pinjam + timedelta(days=getattr(settings, 'LAMA_PINJAM_HARI', 14))
+
+
+class BukuQuerySet(models.QuerySet):
+    def dengan_ketersediaan(self):
+        """Anotasi `sudah_dipinjam` agar ketersediaan tidak dicek per baris"""
+        return self.annotate(
+            sudah_dipinjam=Exists(
+                Peminjaman.objects.filter(
+                    buku=OuterRef('pk'),
+                    status_peminjaman='aktif'
+                )
+            )
+        )
+
+
+def total_peminjaman(anggota):
+    """
+    Jumlah peminjaman anggota `anggota` (OuterRef) di tabel aktif dan arsip.
+    Subquery berkorelasi (bukan JOIN + GROUP BY) supaya urutan baris luar
+    tetap dibaca langsung dari tabel tanpa sort sementara.
+    """
+    def jumlah(model):
+        return Coalesce(Subquery(
+            model.objects.filter(anggota=anggota).order_by()
+            .values('anggota').annotate(jumlah=Count('pk')).values('jumlah')
+        ), 0)
+    return jumlah(Peminjaman) + jumlah(PeminjamanArsip)
+
+
+class AnggotaQuerySet(models.QuerySet):
+    def dengan_total_peminjaman(self):
+        """Anotasi `total_peminjaman` agar jumlah pinjaman tidak dihitung per baris"""
+        return self.annotate(total_peminjaman=total_peminjaman(OuterRef('pk')))
+
+
+class PeminjamanQuerySet(models.QuerySet):
+    def dengan_detail(self, buku=True, anggota=True):
+        """
+        Join buku & anggota sekaligus, plus anotasi yang dibutuhkan
+        serializer bersarang, sehingga satu list = satu query. Relasi yang
+        tidak ditampilkan (lihat ?expand=) tidak perlu di-join.
+        """
+        queryset = self
+        if buku:
+            queryset = queryset.select_related('buku').annotate(
+                buku_sudah_dipinjam=Exists(
+                    Peminjaman.objects.filter(
+                        buku=OuterRef('buku_id'),
+                        status_peminjaman='aktif'
+                    )
+                ),
+            )
+        if anggota:
+            queryset = queryset.select_related('anggota').annotate(
+                anggota_total_peminjaman=total_peminjaman(OuterRef('anggota_id')),
+            )
+        return queryset
+
+    def terlambat(self, tanggal):
+        """
+        Peminjaman aktif yang jatuh temponya sebelum `tanggal`, urut jatuh
+        tempo terlama: range scan pada index peminjaman_terlambat_idx.
+        """
+        return self.filter(status_peminjaman='aktif', jatuh_tempo__lt=tanggal).order_by('jatuh_tempo', 'id')
+
+
+class SimpanAtomik(models.Model):
+    """
+    Base model yang menyimpan dalam satu transaksi, sehingga perubahan turunan
+    yang ditulis receiver post_save (mis. penghitung dashboard) ikut commit
+    atau rollback bersama baris utamanya.
+    """
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        using = kwargs.get('using') or router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using):
+            super().save(*args, **kwargs)
+
+
+class Buku(SimpanAtomik):
     judul = models.CharField(max_length=120)
     penulis = models.CharField(max_length=100)
     tahun = models.IntegerField()
 
-class Anggota(models.Model):
+    objects = BukuQuerySet.as_manager()
+
+class Anggota(SimpanAtomik):
     nama = models.CharField(max_length=100)
     email = models.EmailField()
 
+    objects = AnggotaQuerySet.as_manager()
+
     def __str__(self):
         return self.nama
 
 
-class Peminjaman(models.Model):
+class DataPeminjaman(models.Model):
+    """Kolom peminjaman, dipakai bersama tabel aktif (Peminjaman) dan arsip"""
     STATUS_CHOICES = [
         ('aktif', 'Aktif (Sedang Dipinjam)'),
         ('selesai', 'Selesai (Sudah Dikembalikan)'),
@@ -22,17 +127,207 @@ class Peminjaman(models.Model):
     anggota = models.ForeignKey(Anggota, on_delete=models.CASCADE)
     tanggal_pinjam = models.DateField()
     tanggal_kembali = models.DateField(blank=True, null=True)
+    # Kosong = diisi otomatis dari tanggal_pinjam saat disimpan (jatuh_tempo_default)
+    jatuh_tempo = models.DateField(blank=True)
     status_peminjaman = models.CharField(
         max_length=10,
         choices=STATUS_CHOICES,
         default='aktif'
     )
 
+    objects = PeminjamanQuerySet.as_manager()
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Nilai tersimpan yang menentukan tabel rekap (lihat rollups.py)
+        instance._rekap_tersimpan = instance.nilai_rekap()
+        return instance
+
+    KOLOM_REKAP = ('tanggal_pinjam', 'buku_id', 'anggota_id', 'status_peminjaman', 'tanggal_kembali')
+
+    def nilai_rekap(self):
+        """Nilai KOLOM_REKAP, atau None jika ada yang tidak dimuat (deferred)"""
+        if any(k not in self.__dict__ for k in self.KOLOM_REKAP):
+            return None
+        return tuple(self.__dict__[k] for k in self.KOLOM_REKAP)
+
+    @property
+    def kunci_tampilan(self):
+        """
+        Kunci cache fragmen baris di halaman daftar: semua kolom yang tampil,
+        sehingga kunci berubah setiap kali peminjaman ini berubah (termasuk
+        lewat update massal yang melewati signal).
+        """
+        return ':'.join(str(v) for v in (
+            self.pk, self.buku_id, self.anggota_id, self.tanggal_pinjam,
+            self.tanggal_kembali, self.jatuh_tempo, self.status_peminjaman,
+        ))
+
     def __str__(self):
         return f"{self.buku.judul} - {self.anggota.nama}"
 
 
+class Peminjaman(SimpanAtomik, DataPeminjaman):
+    """Peminjaman aktif & yang baru selesai (tabel "panas"); lihat PeminjamanArsip"""
 
+    class Meta:
+        indexes = [
+            # Urutan cursor pagination daftar peminjaman
+            models.Index(fields=['-tanggal_pinjam', '-id'], name='peminjaman_tgl_id_idx'),
+            # Status peminjaman per buku (ketersediaan, filter ?buku=&status=)
+            models.Index(fields=['buku', 'status_peminjaman'], name='peminjaman_buku_status_idx'),
+            # Daftar terurut per anggota (riwayat) / per status / per buku,
+            # tanpa sort tambahan karena urutannya sama dengan cursor
+            models.Index(fields=['anggota', '-tanggal_pinjam', '-id'], name='peminjaman_anggota_tgl_idx'),
+            models.Index(fields=['status_peminjaman', '-tanggal_pinjam', '-id'], name='peminjaman_status_tgl_idx'),
+            models.Index(fields=['buku', '-tanggal_pinjam', '-id'], name='peminjaman_buku_tgl_idx'),
+            # Peminjaman terlambat (aktif & lewat jatuh tempo), urut jatuh tempo
+            models.Index(fields=['status_peminjaman', 'jatuh_tempo', 'id'], name='peminjaman_terlambat_idx'),
+            # Batch pengarsipan: keyset per id di antara peminjaman selesai (arsip.py)
+            models.Index(fields=['status_peminjaman', 'id'], name='peminjaman_status_id_idx'),
+        ]
+        constraints = [
+            # Satu buku hanya boleh punya satu peminjaman aktif. Partial index ini
+            # juga dipakai untuk cek ketersediaan (buku_id + status 'aktif').
+            models.UniqueConstraint(
+                fields=['buku'],
+                condition=Q(status_peminjaman='aktif'),
+                name='peminjaman_aktif_unik',
+            ),
+        ]
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Status yang tersimpan di database, untuk menghitung perpindahan status
+        instance._status_tersimpan = instance.__dict__.get('status_peminjaman')
+        return instance
 
-# Create your models here.
\ No newline at end of file
+    def save(self, *args, **kwargs):
+        """
+        Pelanggaran constraint peminjaman_aktif_unik diubah menjadi
+        BukuSedangDipinjam agar pemanggil bisa memberi pesan yang jelas.
+        IntegrityError lain (pk ganda, NOT NULL, receiver post_save)
+        diteruskan apa adanya.
+        """
+        if self.jatuh_tempo is None and self.tanggal_pinjam is not None:
+            self.jatuh_tempo = jatuh_tempo_default(self.tanggal_pinjam)
+        try:
+            super().save(*args, **kwargs)
+        except IntegrityError as e:
+            if self.status_peminjaman == 'aktif' and self._melanggar_aktif_unik(e):
+                raise BukuSedangDipinjam(self.buku) from e
+            raise
+
+    def _melanggar_aktif_unik(self, error):
+        # PostgreSQL menyebut nama constraint, SQLite hanya kolom partial index-nya
+        pesan = str(error)
+        return 'peminjaman_aktif_unik' in pesan or f'{self._meta.db_table}.buku_id' in pesan
+
+
+class PeminjamanArsip(DataPeminjaman):
+    """
+    Peminjaman selesai yang sudah lama, dipindahkan dari Peminjaman oleh
+    `manage.py archive_loans` (lihat arsip.py) agar tabel panas tetap kecil.
+    Id asli dipertahankan, jadi id unik di kedua tabel.
+    """
+    id = models.BigIntegerField(primary_key=True)
+
+    class Meta:
+        verbose_name_plural = 'peminjaman arsip'
+        indexes = [
+            # Riwayat anggota & ekspor, urutan sama dengan tabel panas
+            models.Index(fields=['anggota', '-tanggal_pinjam', '-id'], name='arsip_anggota_tgl_idx'),
+            models.Index(fields=['-tanggal_pinjam', '-id'], name='arsip_tgl_id_idx'),
+            models.Index(fields=['buku', '-tanggal_pinjam', '-id'], name='arsip_buku_tgl_idx'),
+        ]
+
+
+class Penghitung(models.Model):
+    """
+    Nilai agregat yang dirawat inkremental oleh signal (lihat counters.py),
+    supaya dashboard tidak perlu COUNT(*) atas seluruh tabel.
+    """
+    nama = models.CharField(max_length=50, primary_key=True)
+    nilai = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.nama} = {self.nilai}"
+
+
+
+# =============================================================================
+# REKAP ANALITIK (lihat rollups.py)
+# =============================================================================
+
+class RekapHarian(models.Model):
+    """Jumlah peminjaman (per tanggal pinjam) dan pengembalian (per tanggal kembali) per hari"""
+    tanggal = models.DateField(primary_key=True)
+    dipinjam = models.IntegerField(default=0)
+    dikembalikan = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.tanggal}: {self.dipinjam} dipinjam, {self.dikembalikan} dikembalikan"
+
+
+class RekapBukuHarian(models.Model):
+    """Jumlah peminjaman per buku per hari"""
+    tanggal = models.DateField()
+    # Tanpa FK constraint & cascade: baris rekap tidak ikut dikumpulkan saat
+    # buku dihapus, sumbangannya sudah dikurangi lewat peminjaman yang terhapus
+    buku = models.ForeignKey(Buku, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    dipinjam = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            # Kunci upsert sekaligus index range tanggal
+            models.UniqueConstraint(fields=['tanggal', 'buku'], name='rekap_buku_harian_unik'),
+        ]
+
+
+class RekapAnggotaHarian(models.Model):
+    """Jumlah peminjaman per anggota per hari"""
+    tanggal = models.DateField()
+    anggota = models.ForeignKey(Anggota, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    dipinjam = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['tanggal', 'anggota'], name='rekap_anggota_harian_unik'),
+        ]
+
+
+# =============================================================================
+# LOG PERUBAHAN (lihat changes.py)
+# =============================================================================
+
+class Perubahan(models.Model):
+    """Satu entri log perubahan append-only untuk sinkronisasi inkremental klien"""
+    AKSI_CHOICES = [
+        ('buat', 'Dibuat'),
+        ('ubah', 'Diubah'),
+        ('hapus', 'Dihapus'),
+        # Perubahan massal yang tidak dicatat per objek: muat ulang seluruh model
+        ('reset', 'Reset'),
+    ]
+    # AUTOINCREMENT: seq tidak pernah dipakai ulang walau baris lama dihapus
+    seq = models.BigAutoField(primary_key=True)
+    model = models.CharField(max_length=20)
+    objek_id = models.BigIntegerField(blank=True, null=True)
+    aksi = models.CharField(max_length=5, choices=AKSI_CHOICES)
+    waktu = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name_plural = 'perubahan'
+        indexes = [
+            # Pemadatan: retensi per waktu & entri lama yang sudah digantikan
+            models.Index(fields=['waktu'], name='perubahan_waktu_idx'),
+            models.Index(fields=['model', 'objek_id', 'seq'], name='perubahan_objek_idx'),
+        ]
+
+    def __str__(self):
+        return f"#{self.seq} {self.aksi} {self.model} {self.objek_id or ''}".rstrip()
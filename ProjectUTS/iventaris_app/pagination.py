@@ -0,0 +1,210 @@
+import json
+from operator import attrgetter
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, CursorPagination
+
+from .search import PERINGKAT
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Cursor pagination dengan keyset komposit.
+
+    CursorPagination bawaan DRF hanya menyimpan posisi kolom pertama dan
+    memakai OFFSET untuk baris yang nilainya kembar. Di sini posisi berisi
+    nilai semua kolom `ordering` (kolom terakhir harus unik, mis. `id`),
+    sehingga setiap halaman cukup satu range scan pada index yang sama,
+    berapa pun dalamnya halaman tersebut.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset = self._siapkan(queryset, request, view)
+        if queryset is None:
+            return None
+        return self._halaman(list(queryset))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """Versi async untuk view ASGI (lihat async_views.py)"""
+        queryset = self._siapkan(queryset, request, view)
+        if queryset is None:
+            return None
+        return self._halaman([obj async for obj in queryset])
+
+    def paginate_querysets(self, querysets, request, view=None):
+        """
+        Satu halaman dari gabungan beberapa queryset dengan urutan yang sama
+        (mis. tabel peminjaman aktif + arsip). Tiap queryset cukup mengambil
+        page_size + 1 baris dari posisi cursor; hasilnya digabung di Python.
+        """
+        siap = [self._siapkan(qs, request, view) for qs in querysets]
+        if siap[0] is None:
+            return None
+        return self._halaman(self._gabung([obj for qs in siap for obj in qs]))
+
+    async def apaginate_querysets(self, querysets, request, view=None):
+        """Versi async dari `paginate_querysets`"""
+        siap = [self._siapkan(qs, request, view) for qs in querysets]
+        if siap[0] is None:
+            return None
+        return self._halaman(self._gabung([obj for qs in siap async for obj in qs]))
+
+    def _gabung(self, results):
+        """Urutkan hasil gabungan sesuai ordering halaman ini, lalu potong"""
+        reverse = self.cursor.reverse if self.cursor else False
+        ordering = _balik_ordering(self.ordering) if reverse else self.ordering
+        # Sort stabil per kolom, dari kolom terakhir ke kolom pertama
+        for order in reversed(ordering):
+            results.sort(key=attrgetter(order.lstrip('-')), reverse=order.startswith('-'))
+        return results[:self.page_size + 1]
+
+    def _siapkan(self, queryset, request, view):
+        """Queryset halaman ini (page_size + 1 baris untuk mendeteksi halaman berikutnya)"""
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        reverse = self.cursor.reverse if self.cursor else False
+        position = self.cursor.position if self.cursor else None
+
+        ordering = _balik_ordering(self.ordering) if reverse else self.ordering
+        if position is not None:
+            position = self._nilai_posisi(queryset, position)
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self.keyset_filter(ordering, position))
+        return queryset[:self.page_size + 1]
+
+    def _halaman(self, results):
+        reverse = self.cursor.reverse if self.cursor else False
+        position = self.cursor.position if self.cursor else None
+        ada_lanjutan = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        if reverse:
+            self.page.reverse()
+
+        if reverse:
+            self.has_next = position is not None
+            self.has_previous = ada_lanjutan
+        else:
+            self.has_next = ada_lanjutan
+            self.has_previous = position is not None
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        # Hasil pencarian full-text dipaging berdasarkan relevansi lebih dulu
+        if PERINGKAT in queryset.query.annotations:
+            return (PERINGKAT,) + ordering
+        return ordering
+
+    def _nilai_posisi(self, queryset, position):
+        """
+        Ubah nilai posisi (string dari cursor) ke tipe kolom ordering-nya.
+        Cursor bisa diubah klien, jadi nilai yang tidak valid -> 404.
+        """
+        if len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        nilai = []
+        try:
+            for order, v in zip(self.ordering, position):
+                nama = order.lstrip('-')
+                if nama in queryset.query.annotations:
+                    field = queryset.query.annotations[nama].output_field
+                else:
+                    field = queryset.model._meta.get_field(nama)
+                v = field.to_python(v)
+                if v is None:
+                    raise ValueError(nama)
+                nilai.append(v)
+        except (FieldDoesNotExist, TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        return nilai
+
+    def keyset_filter(self, ordering, position):
+        """
+        Bangun kondisi "setelah posisi" untuk ordering komposit:
+        (a < va) OR (a = va AND b < vb) ... ditambah batas a <= va di depan
+        agar SQLite bisa memulai range scan langsung dari posisi cursor.
+        """
+        fields = [o.lstrip('-') for o in ordering]
+        if len(position) != len(fields):
+            raise NotFound(self.invalid_cursor_message)
+
+        kondisi = Q()
+        for i, order in enumerate(ordering):
+            lookup = 'lt' if order.startswith('-') else 'gt'
+            sama = {fields[j]: position[j] for j in range(i)}
+            kondisi |= Q(**sama, **{f'{fields[i]}__{lookup}': position[i]})
+
+        lookup_awal = 'lte' if ordering[0].startswith('-') else 'gte'
+        return Q(**{f'{fields[0]}__{lookup_awal}': position[0]}) & kondisi
+
+    def decode_cursor(self, request):
+        cursor = super().decode_cursor(request)
+        if cursor is None or cursor.position is None:
+            return cursor
+        try:
+            position = json.loads(cursor.position)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list):
+            raise NotFound(self.invalid_cursor_message)
+        return Cursor(offset=0, reverse=cursor.reverse, position=position)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        position = self._get_position_from_instance(self.page[-1], self.ordering) if self.page else None
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=position))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        position = self._get_position_from_instance(self.page[0], self.ordering) if self.page else None
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=position))
+
+    def _get_position_from_instance(self, instance, ordering):
+        nilai = []
+        for order in ordering:
+            field_name = order.lstrip('-')
+            if isinstance(instance, dict):
+                attr = instance[field_name]
+            else:
+                attr = getattr(instance, field_name)
+            nilai.append(str(attr))
+        return json.dumps(nilai, separators=(',', ':'))
+
+
+def _balik_ordering(ordering):
+    return tuple(o[1:] if o.startswith('-') else '-' + o for o in ordering)
+
+
+class BukuPagination(KeysetPagination):
+    ordering = ('id',)
+
+
+class AnggotaPagination(KeysetPagination):
+    ordering = ('id',)
+
+
+class PeminjamanPagination(KeysetPagination):
+    ordering = ('-tanggal_pinjam', '-id')
+
+
+class TerlambatPagination(KeysetPagination):
+    """Urutan index peminjaman_terlambat_idx: jatuh tempo terlama lebih dulu"""
+    ordering = ('jatuh_tempo', 'id')
@@ -0,0 +1,53 @@
+"""
+Daftar refresh token yang sudah dicabut, berdasarkan jti.
+
+Pengganti app token_blacklist simplejwt (yang menambah query di setiap
+refresh dan tabelnya terus membesar). Setiap jti yang dicabut disimpan di
+cache `keamanan` (tidak pernah menggusur entri yang masih berlaku, lihat
+cache_backends.py) dengan umur sama dengan sisa umur tokennya, jadi
+pengecekan cukup satu lookup kunci dan entri hilang sendiri begitu token
+kedaluwarsa. Dengan beberapa worker, cache ini harus bersama (REDIS_URL).
+"""
+import time
+
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken as _RefreshToken
+
+from .cache_backends import keamanan
+
+
+def _kunci(jti):
+    return f'jwt:dicabut:{jti}'
+
+
+def cabut(jti, exp):
+    """
+    Cabut token `jti` sampai waktu `exp` (epoch detik). Mengembalikan False
+    jika token sudah dicabut sebelumnya, termasuk oleh request lain yang
+    berjalan bersamaan (cache.add atomik).
+    """
+    sisa = int(exp - time.time()) + 1
+    if sisa <= 0:
+        # Token sudah kedaluwarsa, tidak perlu disimpan
+        return True
+    return keamanan().add(_kunci(jti), 1, timeout=sisa)
+
+
+def dicabut(jti):
+    return keamanan().get(_kunci(jti)) is not None
+
+
+class RefreshToken(_RefreshToken):
+    """RefreshToken yang ditolak setelah dicabut (mis. setelah rotasi)"""
+
+    def verify(self, *args, **kwargs):
+        super().verify(*args, **kwargs)
+        if dicabut(self.payload[api_settings.JTI_CLAIM]):
+            raise TokenError(_('Token is blacklisted'))
+
+    def blacklist(self):
+        # Dipanggil TokenRefreshSerializer saat BLACKLIST_AFTER_ROTATION
+        if not cabut(self.payload[api_settings.JTI_CLAIM], self.payload['exp']):
+            raise TokenError(_('Token is blacklisted'))
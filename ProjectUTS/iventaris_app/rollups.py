@@ -0,0 +1,180 @@
+"""
+Tabel rekap (rollup) untuk analitik sirkulasi.
+
+Setiap peminjaman menyumbang +1 `dipinjam` pada tanggal pinjamnya di tiga
+tabel rekap harian (total, per buku, per anggota), ditambah +1
+`dikembalikan` pada tanggal kembalinya jika sudah selesai. Signal menghitung
+selisih sumbangan sebelum dan sesudah setiap penulisan, lalu menerapkannya
+dengan satu upsert per tabel (lihat signals.py). Laporan cukup membaca baris
+rekap pada rentang tanggal yang diminta, berapa pun panjang riwayatnya.
+Operasi yang melewati signal (impor, seeder, queryset.update) dirapikan
+dengan `bangun_ulang()` / `manage.py rebuild_rollups`.
+"""
+from collections import defaultdict
+from datetime import date, timedelta
+
+from django.db import connections, router, transaction
+from django.db.models import Count, Sum
+
+from .models import Peminjaman, PeminjamanArsip, RekapAnggotaHarian, RekapBukuHarian, RekapHarian
+
+
+# Kolom kunci tiap tabel rekap (harus sama dengan unique constraint-nya)
+KUNCI = {
+    RekapHarian: ('tanggal',),
+    RekapBukuHarian: ('tanggal', 'buku_id'),
+    RekapAnggotaHarian: ('tanggal', 'anggota_id'),
+}
+
+# Baris per statement upsert (batas variabel SQLite)
+UKURAN_BATCH = 200
+
+
+def sumbangan(nilai):
+    """
+    Sumbangan satu peminjaman ke tabel rekap.
+    `nilai` = Peminjaman.nilai_rekap(); None berarti tidak ada (baru/terhapus).
+    """
+    if nilai is None:
+        return {}
+    tanggal_pinjam, buku_id, anggota_id, status, tanggal_kembali = nilai
+    hasil = {
+        (RekapHarian, (tanggal_pinjam,), 'dipinjam'): 1,
+        (RekapBukuHarian, (tanggal_pinjam, buku_id), 'dipinjam'): 1,
+        (RekapAnggotaHarian, (tanggal_pinjam, anggota_id), 'dipinjam'): 1,
+    }
+    if status == 'selesai' and tanggal_kembali is not None:
+        hasil[(RekapHarian, (tanggal_kembali,), 'dikembalikan')] = 1
+    return hasil
+
+
+def terapkan(perubahan, using=None):
+    """
+    Terapkan `perubahan` ([(nilai_lama, nilai_baru), ...]) ke tabel rekap.
+    Sumbangan yang tidak berubah saling meniadakan, sisanya ditulis dengan
+    satu upsert per tabel berapa pun jumlah peminjamannya.
+    """
+    delta = defaultdict(int)
+    for lama, baru in perubahan:
+        for k, n in sumbangan(lama).items():
+            delta[k] -= n
+        for k, n in sumbangan(baru).items():
+            delta[k] += n
+
+    per_tabel = defaultdict(lambda: defaultdict(dict))
+    for (model, kunci, kolom), n in delta.items():
+        if n:
+            per_tabel[model][kunci][kolom] = n
+    using = using or router.db_for_write(Peminjaman)
+    for model, baris in per_tabel.items():
+        _upsert(model, baris, using)
+
+
+def _upsert(model, baris, using):
+    """INSERT ... ON CONFLICT DO UPDATE yang menambahkan, bukan menimpa, nilainya"""
+    tabel = model._meta.db_table
+    kunci = KUNCI[model]
+    nilai = [f.attname for f in model._meta.concrete_fields if f.attname not in kunci and not f.primary_key]
+    kolom = list(kunci) + nilai
+    ops = connections[using].ops
+    q = ops.quote_name
+    sql = (
+        f'INSERT INTO {q(tabel)} ({", ".join(q(k) for k in kolom)}) VALUES {{}} '
+        f'ON CONFLICT ({", ".join(q(k) for k in kunci)}) DO UPDATE SET '
+        + ', '.join(f'{q(n)} = {q(tabel)}.{q(n)} + excluded.{q(n)}' for n in nilai)
+    )
+    placeholder = '(' + ', '.join(['%s'] * len(kolom)) + ')'
+
+    daftar = list(baris.items())
+    with connections[using].cursor() as cursor:
+        for i in range(0, len(daftar), UKURAN_BATCH):
+            batch = daftar[i:i + UKURAN_BATCH]
+            params = []
+            for k, n in batch:
+                params.extend(ops.adapt_datefield_value(v) if isinstance(v, date) else v for v in k)
+                params.extend(n.get(kolom_nilai, 0) for kolom_nilai in nilai)
+            cursor.execute(sql.format(', '.join([placeholder] * len(batch))), params)
+
+
+def bangun_ulang(using=None):
+    """
+    Isi ulang semua tabel rekap dari tabel Peminjaman dan arsipnya (mahal,
+    untuk rekonsiliasi). Hasil agregasi kedua tabel dijumlahkan per kunci.
+    """
+    using = using or router.db_for_write(Peminjaman)
+    dipinjam, dikembalikan = defaultdict(int), defaultdict(int)
+    per_buku, per_anggota = defaultdict(int), defaultdict(int)
+    for model in (Peminjaman, PeminjamanArsip):
+        semua = model.objects.using(using).order_by()
+        for tgl, n in semua.values_list('tanggal_pinjam').annotate(n=Count('pk')):
+            dipinjam[tgl] += n
+        kembali = semua.filter(status_peminjaman='selesai', tanggal_kembali__isnull=False)
+        for tgl, n in kembali.values_list('tanggal_kembali').annotate(n=Count('pk')):
+            dikembalikan[tgl] += n
+        for tgl, buku, n in semua.values_list('tanggal_pinjam', 'buku').annotate(n=Count('pk')).iterator():
+            per_buku[tgl, buku] += n
+        for tgl, anggota, n in semua.values_list('tanggal_pinjam', 'anggota').annotate(n=Count('pk')).iterator():
+            per_anggota[tgl, anggota] += n
+
+    with transaction.atomic(using=using):
+        for model in KUNCI:
+            model.objects.using(using).all().delete()
+        RekapHarian.objects.using(using).bulk_create((
+            RekapHarian(tanggal=tgl, dipinjam=dipinjam.get(tgl, 0), dikembalikan=dikembalikan.get(tgl, 0))
+            for tgl in dipinjam.keys() | dikembalikan.keys()
+        ), batch_size=1000)
+        RekapBukuHarian.objects.using(using).bulk_create((
+            RekapBukuHarian(tanggal=tgl, buku_id=buku, dipinjam=n) for (tgl, buku), n in per_buku.items()
+        ), batch_size=1000)
+        RekapAnggotaHarian.objects.using(using).bulk_create((
+            RekapAnggotaHarian(tanggal=tgl, anggota_id=anggota, dipinjam=n)
+            for (tgl, anggota), n in per_anggota.items()
+        ), batch_size=1000)
+    return {model: model.objects.using(using).count() for model in KUNCI}
+
+
+# =============================================================================
+# LAPORAN (hanya membaca baris pada rentang tanggal)
+# =============================================================================
+
+def _bulan_berikutnya(tanggal):
+    return (tanggal.replace(day=1) + timedelta(days=32)).replace(day=1)
+
+
+def per_periode(dari, sampai, per='hari'):
+    """Jumlah dipinjam & dikembalikan per hari/bulan, termasuk periode yang kosong"""
+    nilai = {
+        r.tanggal: r for r in RekapHarian.objects.filter(tanggal__range=(dari, sampai)).order_by('tanggal')
+    }
+    hasil, tanggal = [], dari
+    while tanggal <= sampai:
+        akhir = min(sampai, tanggal if per == 'hari' else _bulan_berikutnya(tanggal) - timedelta(days=1))
+        baris = {'periode': tanggal if per == 'hari' else tanggal.replace(day=1), 'dipinjam': 0, 'dikembalikan': 0}
+        while tanggal <= akhir:
+            r = nilai.get(tanggal)
+            if r is not None:
+                baris['dipinjam'] += r.dipinjam
+                baris['dikembalikan'] += r.dikembalikan
+            tanggal += timedelta(days=1)
+        hasil.append(baris)
+    return hasil
+
+
+def buku_terpopuler(dari, sampai, limit=10):
+    return list(
+        RekapBukuHarian.objects.filter(tanggal__range=(dari, sampai))
+        .values('buku_id', 'buku__judul', 'buku__penulis')
+        .annotate(total=Sum('dipinjam'))
+        .filter(total__gt=0)
+        .order_by('-total', 'buku_id')[:limit]
+    )
+
+
+def anggota_teraktif(dari, sampai, limit=10):
+    return list(
+        RekapAnggotaHarian.objects.filter(tanggal__range=(dari, sampai))
+        .values('anggota_id', 'anggota__nama')
+        .annotate(total=Sum('dipinjam'))
+        .filter(total__gt=0)
+        .order_by('-total', 'anggota_id')[:limit]
+    )
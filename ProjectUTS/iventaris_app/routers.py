@@ -0,0 +1,90 @@
+"""
+Routing baca/tulis ke database primer dan replika.
+
+Semua penulisan ke `default` (primer). Query baca dikirim ke salah satu
+alias di settings.DATABASE_REPLICAS, kecuali:
+- request dengan method yang mengubah data (POST/PUT/PATCH/DELETE),
+- request yang sudah menulis (dipin ke primer sampai request selesai),
+- di dalam transaksi yang terbuka di primer, atau di dalam `primer()`,
+sehingga validasi & read-your-writes selalu melihat data terbaru.
+Tanpa DATABASE_REPLICAS semua query tetap ke `default`.
+"""
+import contextvars
+import random
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+METHOD_AMAN = ('GET', 'HEAD', 'OPTIONS')
+
+_pin_primer = contextvars.ContextVar('pin_primer', default=False)
+
+
+def replika():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+def pin_primer():
+    """Sisa request/konteks ini membaca dari primer"""
+    _pin_primer.set(True)
+
+
+@contextmanager
+def primer():
+    """Paksa semua query baca di dalam blok ini ke primer"""
+    token = _pin_primer.set(True)
+    try:
+        yield
+    finally:
+        _pin_primer.reset(token)
+
+
+class ReplikaRouter:
+    def db_for_read(self, model, **hints):
+        alias = replika()
+        if not alias or _pin_primer.get() or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return random.choice(alias)
+
+    def db_for_write(self, model, **hints):
+        pin_primer()
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Primer dan replika berisi data yang sama
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replika adalah salinan primer (lihat `manage.py sync_replica`)
+        return db == DEFAULT_DB_ALIAS
+
+
+class PrimerMiddleware:
+    """Atur pin primer per request: request yang mengubah data langsung dipin"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        token = _pin_primer.set(request.method not in METHOD_AMAN)
+        try:
+            return self.get_response(request)
+        finally:
+            _pin_primer.reset(token)
+
+    async def __acall__(self, request):
+        token = _pin_primer.set(request.method not in METHOD_AMAN)
+        try:
+            return await self.get_response(request)
+        finally:
+            _pin_primer.reset(token)
@@ -0,0 +1,76 @@
+"""
+Pencarian full-text untuk Buku dan Anggota.
+
+Di SQLite pencarian memakai indeks FTS5 (lihat migrasi 0005_indeks_pencarian_fts)
+yang disinkronkan oleh trigger database. Backend lain kembali ke icontains.
+"""
+import re
+from functools import reduce
+from operator import or_
+
+from django.db import connections
+from django.db.models import FloatField, Q
+from django.db.models.expressions import RawSQL
+
+from .models import Anggota, Buku
+
+
+# Kolom yang diindeks per model (harus sama dengan migrasi FTS)
+KOLOM_INDEKS = {
+    Buku: ['judul', 'penulis', 'tahun'],
+    Anggota: ['nama', 'email'],
+}
+
+# Nama anotasi skor bm25; makin kecil makin relevan
+PERINGKAT = 'peringkat'
+
+
+def tabel_fts(model):
+    return f'{model._meta.db_table}_fts'
+
+
+def buat_query_fts(teks):
+    """
+    Ubah input pengguna menjadi query FTS5 yang aman: setiap kata dikutip
+    (operator FTS5 tidak ikut dieksekusi) dan diberi `*` untuk prefix matching.
+    Semua kata harus cocok (AND).
+    """
+    kata = re.findall(r'\w+', teks)
+    return ' '.join(f'"{k}"*' for k in kata)
+
+
+def cari(queryset, teks):
+    """
+    Filter `queryset` dengan pencarian full-text dan anotasi `peringkat`
+    (bm25). Urutkan dengan `.order_by('peringkat')` untuk hasil paling relevan.
+
+    Tabel FTS di-join sekali lewat rowid, jadi MATCH hanya dijalankan satu
+    kali per query; `peringkat` dibaca dari kolom rank baris yang di-join
+    (juga di filter keyset halaman berikutnya), bukan subquery per baris.
+    """
+    model = queryset.model
+    if connections[queryset.db].vendor != 'sqlite':
+        kondisi = reduce(or_, (Q(**{f'{k}__icontains': teks}) for k in KOLOM_INDEKS[model]))
+        return queryset.filter(kondisi).annotate(**{PERINGKAT: RawSQL('0', [], output_field=FloatField())})
+
+    query = buat_query_fts(teks)
+    if not query:
+        return queryset.none()
+
+    fts = tabel_fts(model)
+    tabel = model._meta.db_table
+    return queryset.extra(
+        tables=[fts],
+        where=[f'"{fts}" MATCH %s', f'"{fts}".rowid = "{tabel}"."id"'],
+        params=[query],
+    ).annotate(**{PERINGKAT: RawSQL(f'"{fts}".rank', [], output_field=FloatField())})
+
+
+def bangun_ulang(model, using='default'):
+    """Bangun ulang indeks FTS dari isi tabel asli"""
+    fts = tabel_fts(model)
+    with connections[using].cursor() as cursor:
+        cursor.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+        cursor.execute(f"INSERT INTO {fts}({fts}) VALUES ('optimize')")
+        cursor.execute(f'SELECT count(*) FROM {fts}')
+        return cursor.fetchone()[0]
@@ -0,0 +1,128 @@
+"""
+Seeder perpustakaan sintetis untuk benchmark dan uji skala.
+
+Data dibuat deterministik dari `seed` dan ditulis dengan bulk_create per
+batch, sehingga 1 juta peminjaman bisa dimuat dalam hitungan menit. Setiap
+buku punya maksimal satu peminjaman aktif (peminjaman terakhirnya), sesuai
+constraint peminjaman_aktif_unik.
+"""
+import random
+from datetime import date, timedelta
+
+from django.db import connections, router, transaction
+
+from . import changes, counters, rollups, versions
+from .models import Anggota, Buku, Peminjaman, jatuh_tempo_default
+
+
+KATA_JUDUL = [
+    'Laskar', 'Pelangi', 'Bumi', 'Manusia', 'Senja', 'Hujan', 'Negeri', 'Lima',
+    'Menara', 'Cantik', 'Luka', 'Ronggeng', 'Dukuh', 'Paruk', 'Ayat', 'Cinta',
+    'Perahu', 'Kertas', 'Rumah', 'Kaca', 'Gadis', 'Pantai', 'Anak', 'Semua',
+    'Bangsa', 'Jejak', 'Langkah', 'Sang', 'Pemimpi', 'Malam', 'Sunyi', 'Laut',
+]
+NAMA_DEPAN = ['Andi', 'Budi', 'Citra', 'Dewi', 'Eka', 'Fajar', 'Gita', 'Hadi', 'Indah', 'Joko',
+              'Kartika', 'Lestari', 'Made', 'Nur', 'Putri', 'Rizky', 'Sari', 'Tono', 'Wahyu', 'Yuni']
+NAMA_BELAKANG = ['Saputra', 'Wijaya', 'Santoso', 'Lestari', 'Hidayat', 'Pratama', 'Kusuma',
+                 'Siregar', 'Nasution', 'Wibowo', 'Halim', 'Gunawan', 'Rahman', 'Susanto']
+
+TANGGAL_AWAL = date(2015, 1, 1)
+RENTANG_HARI = 3650
+
+
+def _tulis_per_batch(model, objek, batch_size, using):
+    batch = []
+    for obj in objek:
+        batch.append(obj)
+        if len(batch) >= batch_size:
+            model.objects.using(using).bulk_create(batch)
+            batch = []
+    if batch:
+        model.objects.using(using).bulk_create(batch)
+
+
+def _buku(jumlah, rng):
+    for i in range(jumlah):
+        judul = ' '.join(rng.sample(KATA_JUDUL, rng.randint(2, 4)))
+        penulis = f'{rng.choice(NAMA_DEPAN)} {rng.choice(NAMA_BELAKANG)}'
+        yield Buku(judul=f'{judul} {i}', penulis=penulis, tahun=rng.randint(1950, 2025))
+
+
+def _anggota(jumlah, rng):
+    for i in range(jumlah):
+        depan, belakang = rng.choice(NAMA_DEPAN), rng.choice(NAMA_BELAKANG)
+        yield Anggota(nama=f'{depan} {belakang}', email=f'{depan}.{belakang}.{i}@mail.com'.lower())
+
+
+def _peminjaman(jumlah, buku_ids, anggota_ids, rng, rasio_aktif):
+    """
+    Bagi `jumlah` peminjaman ke semua buku. Peminjaman satu buku berurutan
+    waktunya; hanya yang terakhir yang mungkin masih aktif.
+    """
+    sisa = jumlah
+    for posisi, buku_id in enumerate(buku_ids):
+        buku_tersisa = len(buku_ids) - posisi
+        rata_rata = sisa / buku_tersisa
+        banyak = min(sisa, max(0, round(rng.uniform(0, 2 * rata_rata)))) if buku_tersisa > 1 else sisa
+        sisa -= banyak
+
+        hari = rng.randint(0, 30)
+        for ke in range(banyak):
+            tanggal_pinjam = TANGGAL_AWAL + timedelta(days=hari)
+            lama = rng.randint(1, 21)
+            aktif = ke == banyak - 1 and rng.random() < rasio_aktif
+            yield Peminjaman(
+                buku_id=buku_id,
+                anggota_id=rng.choice(anggota_ids),
+                tanggal_pinjam=tanggal_pinjam,
+                tanggal_kembali=None if aktif else tanggal_pinjam + timedelta(days=lama),
+                jatuh_tempo=jatuh_tempo_default(tanggal_pinjam),
+                status_peminjaman='aktif' if aktif else 'selesai',
+            )
+            hari = min(RENTANG_HARI, hari + lama + rng.randint(0, 10))
+
+
+def buat_perpustakaan(buku=1000, anggota=500, peminjaman=10000, seed=0,
+                      batch_size=5000, rasio_aktif=0.3, using=None, progress=None):
+    """
+    Isi database dengan perpustakaan sintetis. `progress(tahap, jumlah)`
+    dipanggil setelah setiap tahap selesai. Mengembalikan jumlah per model.
+    """
+    using = using or router.db_for_write(Peminjaman)
+    rng = random.Random(seed)
+
+    with transaction.atomic(using=using):
+        id_buku_awal = Buku.objects.using(using).order_by('-pk').values_list('pk', flat=True).first() or 0
+        id_anggota_awal = Anggota.objects.using(using).order_by('-pk').values_list('pk', flat=True).first() or 0
+
+        _tulis_per_batch(Buku, _buku(buku, rng), batch_size, using)
+        if progress:
+            progress('buku', buku)
+        _tulis_per_batch(Anggota, _anggota(anggota, rng), batch_size, using)
+        if progress:
+            progress('anggota', anggota)
+
+        buku_ids = list(Buku.objects.using(using).filter(pk__gt=id_buku_awal).values_list('pk', flat=True))
+        anggota_ids = list(Anggota.objects.using(using).filter(pk__gt=id_anggota_awal).values_list('pk', flat=True))
+        if peminjaman and (not buku_ids or not anggota_ids):
+            raise ValueError('Peminjaman butuh minimal satu buku dan satu anggota.')
+        if peminjaman:
+            _tulis_per_batch(
+                Peminjaman, _peminjaman(peminjaman, buku_ids, anggota_ids, rng, rasio_aktif), batch_size, using
+            )
+        if progress:
+            progress('peminjaman', peminjaman)
+
+        # bulk_create melewati signal penghitung & versi
+        counters.rekonsiliasi(using=using)
+        rollups.bangun_ulang(using=using)
+        versions.naikkan(versions.BUKU, versions.ANGGOTA, versions.PEMINJAMAN, using=using)
+        for model in (Buku, Anggota, Peminjaman):
+            changes.reset(model, using=using)
+
+    # Statistik planner SQLite agar rencana query sama dengan database besar sungguhan
+    if connections[using].vendor == 'sqlite':
+        with connections[using].cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    return {'buku': buku, 'anggota': anggota, 'peminjaman': peminjaman}
@@ -1,9 +1,68 @@
+from datetime import timedelta
+
 from rest_framework import serializers
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
 from django.contrib.auth.models import User
-from .models import Peminjaman, Buku, Anggota
+from django.utils import timezone
+from .models import Peminjaman, PeminjamanArsip, Buku, Anggota, BukuSedangDipinjam
+from .revocation import RefreshToken
+
+
+def daftar_param(params, nama):
+    """'a, b' -> {'a', 'b'}; None jika parameter tidak dikirim"""
+    if nama not in params:
+        return None
+    return {n.strip() for n in params.get(nama).split(',') if n.strip()}
+
+
+class FieldDimintaMixin:
+    """
+    Sparse fieldset lewat query param pada GET:
+    - ?fields=id,judul hanya mengirim field tersebut,
+    - ?expand=buku,anggota memilih relasi bersarang di `ekspansi`.
+    Tanpa kedua parameter semua field (termasuk relasi bersarang) dikirim
+    seperti biasa. Hanya berlaku untuk serializer paling luar; field yang
+    tidak diminta tidak dibangun sama sekali.
+    """
+    # Nama di ?expand= -> nama field bersarang
+    ekspansi = {}
+
+    @classmethod
+    def field_diminta(cls, params):
+        """Nama field yang dikirim untuk query param `params`"""
+        semua = set(cls.Meta.fields) if hasattr(cls, 'Meta') else set(cls._declared_fields)
+        fields = daftar_param(params, 'fields')
+        expand = daftar_param(params, 'expand')
+        diminta = semua if fields is None else fields & semua
+        for nama, field in cls.ekspansi.items():
+            if expand is not None:
+                tampil = nama in expand or field in expand
+            else:
+                tampil = fields is None or field in fields
+            diminta = diminta | {field} if tampil else diminta - {field}
+        return diminta
+
+    def _diminta(self):
+        request = self.context.get('request')
+        if request is None or request.method not in ('GET', 'HEAD') or self.root not in (self, self.parent):
+            return None
+        return self.field_diminta(getattr(request, 'query_params', request.GET))
 
+    def get_field_names(self, declared_fields, info):
+        # ModelSerializer: field yang tidak diminta tidak ikut dibangun
+        names = super().get_field_names(declared_fields, info)
+        diminta = self._diminta()
+        return names if diminta is None else [n for n in names if n in diminta]
 
-class UserSerializer(serializers.ModelSerializer):
+    def get_fields(self):
+        fields = super().get_fields()
+        diminta = self._diminta()
+        if diminta is None:
+            return fields
+        return {nama: field for nama, field in fields.items() if nama in diminta}
+
+
+class UserSerializer(FieldDimintaMixin, serializers.ModelSerializer):
     """Serializer untuk model User Django"""
     password = serializers.CharField(write_only=True, min_length=6)
     
@@ -23,7 +82,7 @@ class UserSerializer(serializers.ModelSerializer):
         return user
 
 
-class BukuSerializer(serializers.ModelSerializer):
+class BukuSerializer(FieldDimintaMixin, serializers.ModelSerializer):
     """Serializer untuk model Buku"""
     is_available = serializers.SerializerMethodField()
     
@@ -33,10 +92,13 @@ class BukuSerializer(serializers.ModelSerializer):
     
     def get_is_available(self, obj):
         """Cek apakah buku tersedia (tidak sedang dipinjam)"""
+        # Pakai anotasi dari queryset (Buku.objects.dengan_ketersediaan) bila ada
+        if hasattr(obj, 'sudah_dipinjam'):
+            return not obj.sudah_dipinjam
         return not Peminjaman.objects.filter(buku=obj, status_peminjaman='aktif').exists()
 
 
-class AnggotaSerializer(serializers.ModelSerializer):
+class AnggotaSerializer(FieldDimintaMixin, serializers.ModelSerializer):
     """Serializer untuk model Anggota"""
     total_peminjaman = serializers.SerializerMethodField()
     
@@ -46,13 +108,18 @@ class AnggotaSerializer(serializers.ModelSerializer):
     
     def get_total_peminjaman(self, obj):
         """Hitung total peminjaman oleh anggota ini"""
-        return Peminjaman.objects.filter(anggota=obj).count()
+        # Pakai anotasi dari queryset (Anggota.objects.dengan_total_peminjaman) bila ada
+        if hasattr(obj, 'total_peminjaman'):
+            return obj.total_peminjaman
+        # Termasuk peminjaman yang sudah dipindah ke arsip
+        return Peminjaman.objects.filter(anggota=obj).count() + PeminjamanArsip.objects.filter(anggota=obj).count()
 
 
-class PeminjamanSerializer(serializers.ModelSerializer):
+class PeminjamanSerializer(FieldDimintaMixin, serializers.ModelSerializer):
     """Serializer untuk model Peminjaman"""
     buku_detail = BukuSerializer(source='buku', read_only=True)
     anggota_detail = AnggotaSerializer(source='anggota', read_only=True)
+    ekspansi = {'buku': 'buku_detail', 'anggota': 'anggota_detail'}
     buku = serializers.PrimaryKeyRelatedField(queryset=Buku.objects.all())
     anggota = serializers.PrimaryKeyRelatedField(queryset=Anggota.objects.all())
     
@@ -60,23 +127,55 @@ class PeminjamanSerializer(serializers.ModelSerializer):
         model = Peminjaman
         fields = [
             'id', 'buku', 'buku_detail', 'anggota', 'anggota_detail',
-            'tanggal_pinjam', 'tanggal_kembali', 'status_peminjaman'
+            'tanggal_pinjam', 'tanggal_kembali', 'jatuh_tempo', 'status_peminjaman'
         ]
         read_only_fields = ['id']
     
-    def validate(self, data):
-        """Validasi untuk memastikan buku tidak sedang dipinjam"""
-        buku = data.get('buku')
-        instance = self.instance
-        
-        # Jika create (bukan update) atau buku berubah
-        if (not instance or instance.buku != buku):
-            if Peminjaman.objects.filter(buku=buku, status_peminjaman='aktif').exists():
-                raise serializers.ValidationError({
-                    'buku': f"Buku '{buku.judul}' sedang dipinjam oleh anggota lain."
-                })
-        
-        return data
+    def to_representation(self, instance):
+        # Teruskan anotasi Peminjaman.objects.dengan_detail() ke objek relasi
+        # supaya BukuSerializer & AnggotaSerializer tidak query per baris
+        if hasattr(instance, 'buku_sudah_dipinjam'):
+            instance.buku.sudah_dipinjam = instance.buku_sudah_dipinjam
+        if hasattr(instance, 'anggota_total_peminjaman'):
+            instance.anggota.total_peminjaman = instance.anggota_total_peminjaman
+        return super().to_representation(instance)
+    
+    def create(self, validated_data):
+        try:
+            return super().create(validated_data)
+        except BukuSedangDipinjam as e:
+            raise self.buku_sedang_dipinjam(e.buku)
+    
+    def update(self, instance, validated_data):
+        try:
+            instance = super().update(instance, validated_data)
+        except BukuSedangDipinjam as e:
+            raise self.buku_sedang_dipinjam(e.buku)
+        # Anotasi dari queryset sudah basi setelah update, hitung ulang saat serialisasi
+        for attr in ('buku_sudah_dipinjam', 'anggota_total_peminjaman'):
+            instance.__dict__.pop(attr, None)
+        return instance
+    
+    def buku_sedang_dipinjam(self, buku):
+        """
+        Ketersediaan buku dijaga constraint peminjaman_aktif_unik di database,
+        jadi tidak perlu query exists() sebelum menyimpan.
+        """
+        return serializers.ValidationError({
+            'buku': f"Buku '{buku.judul}' sedang dipinjam oleh anggota lain."
+        })
+
+
+class PeminjamanRingkasSerializer(PeminjamanSerializer):
+    """Peminjaman tanpa relasi bersarang (log perubahan: klien menggabungkan sendiri)"""
+    buku_detail = None
+    anggota_detail = None
+    ekspansi = {}
+    
+    class Meta(PeminjamanSerializer.Meta):
+        fields = [
+            'id', 'buku', 'anggota', 'tanggal_pinjam', 'tanggal_kembali', 'jatuh_tempo', 'status_peminjaman'
+        ]
 
 
 class PeminjamanCreateSerializer(serializers.ModelSerializer):
@@ -84,25 +183,146 @@ class PeminjamanCreateSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Peminjaman
-        fields = ['buku', 'anggota', 'tanggal_pinjam', 'tanggal_kembali']
-    
-    def validate_buku(self, value):
-        """Validasi buku tidak sedang dipinjam"""
-        if Peminjaman.objects.filter(buku=value, status_peminjaman='aktif').exists():
-            raise serializers.ValidationError(
-                f"Buku '{value.judul}' sedang dipinjam dan tidak tersedia."
-            )
-        return value
+        fields = ['buku', 'anggota', 'tanggal_pinjam', 'tanggal_kembali', 'jatuh_tempo']
+        # Cek "buku sedang dipinjam" diserahkan ke constraint peminjaman_aktif_unik,
+        # jangan biarkan DRF menambah UniqueValidator (query exists() tambahan)
+        extra_kwargs = {'buku': {'validators': []}}
     
     def create(self, validated_data):
         validated_data['status_peminjaman'] = 'aktif'
-        return super().create(validated_data)
+        try:
+            return super().create(validated_data)
+        except BukuSedangDipinjam as e:
+            raise serializers.ValidationError({
+                'buku': [f"Buku '{e.buku.judul}' sedang dipinjam dan tidak tersedia."]
+            })
+
+
+class PinjamMassalItemSerializer(serializers.Serializer):
+    """
+    Satu baris pinjam massal. Buku & anggota sengaja berupa ID biasa:
+    keberadaannya dicek sekaligus untuk satu batch di bulk.py.
+    """
+    buku = serializers.IntegerField()
+    anggota = serializers.IntegerField()
+    tanggal_pinjam = serializers.DateField()
+    tanggal_kembali = serializers.DateField(required=False, allow_null=True)
+    jatuh_tempo = serializers.DateField(required=False, allow_null=True)
+
+
+class PinjamMassalSerializer(serializers.Serializer):
+    """Serializer untuk request pinjam massal"""
+    items = serializers.ListField(
+        child=serializers.DictField(),
+        allow_empty=False,
+        max_length=1000,
+    )
+
+
+class KembalikanMassalSerializer(serializers.Serializer):
+    """Serializer untuk request kembalikan massal"""
+    ids = serializers.ListField(
+        child=serializers.IntegerField(),
+        allow_empty=False,
+        max_length=1000,
+    )
 
 
-class DashboardSerializer(serializers.Serializer):
+class DashboardSerializer(FieldDimintaMixin, serializers.Serializer):
     """Serializer untuk data dashboard"""
     total_buku = serializers.IntegerField()
     total_anggota = serializers.IntegerField()
     total_dipinjam = serializers.IntegerField()
     total_selesai = serializers.IntegerField()
-    buku_tersedia = serializers.IntegerField()
\ No newline at end of file
+    buku_tersedia = serializers.IntegerField()
+    total_terlambat = serializers.IntegerField(allow_null=True)
+    terlambat_per = serializers.DateField(allow_null=True)
+
+
+class RentangAnalitikSerializer(serializers.Serializer):
+    """Query param laporan analitik; default 30 hari terakhir"""
+    MAKS_HARI = 3660
+
+    dari = serializers.DateField(required=False)
+    sampai = serializers.DateField(required=False)
+    per = serializers.ChoiceField(choices=['hari', 'bulan'], default='hari')
+    limit = serializers.IntegerField(default=10, min_value=1, max_value=100)
+
+    def validate(self, data):
+        data['sampai'] = data.get('sampai') or timezone.localdate()
+        data['dari'] = data.get('dari') or data['sampai'] - timedelta(days=29)
+        if data['dari'] > data['sampai']:
+            raise serializers.ValidationError({'dari': 'Tanggal awal harus sebelum tanggal akhir.'})
+        # Laporan sebanding dengan panjang rentang, jadi rentangnya dibatasi
+        if (data['sampai'] - data['dari']).days >= self.MAKS_HARI:
+            raise serializers.ValidationError({'dari': f'Rentang maksimal {self.MAKS_HARI} hari.'})
+        return data
+
+
+class PeminjamanPeriodeSerializer(serializers.Serializer):
+    periode = serializers.DateField()
+    dipinjam = serializers.IntegerField()
+    dikembalikan = serializers.IntegerField()
+
+
+class BukuTerpopulerSerializer(serializers.Serializer):
+    buku = serializers.IntegerField(source='buku_id')
+    judul = serializers.CharField(source='buku__judul')
+    penulis = serializers.CharField(source='buku__penulis')
+    total_dipinjam = serializers.IntegerField(source='total')
+
+
+class AnggotaTeraktifSerializer(serializers.Serializer):
+    anggota = serializers.IntegerField(source='anggota_id')
+    nama = serializers.CharField(source='anggota__nama')
+    total_dipinjam = serializers.IntegerField(source='total')
+
+
+class AnalitikPeminjamanSerializer(serializers.Serializer):
+    """Serializer untuk laporan peminjaman per periode"""
+    dari = serializers.DateField()
+    sampai = serializers.DateField()
+    per = serializers.CharField()
+    results = PeminjamanPeriodeSerializer(many=True)
+
+
+class AnalitikBukuSerializer(serializers.Serializer):
+    """Serializer untuk laporan buku terpopuler"""
+    dari = serializers.DateField()
+    sampai = serializers.DateField()
+    results = BukuTerpopulerSerializer(many=True)
+
+
+class AnalitikAnggotaSerializer(serializers.Serializer):
+    """Serializer untuk laporan anggota teraktif"""
+    dari = serializers.DateField()
+    sampai = serializers.DateField()
+    results = AnggotaTeraktifSerializer(many=True)
+
+
+class ParamPerubahanSerializer(serializers.Serializer):
+    """Query param log perubahan; tanpa `since` klien harus memuat ulang semua daftar"""
+    since = serializers.IntegerField(required=False, min_value=0)
+    limit = serializers.IntegerField(default=500, min_value=1, max_value=1000)
+
+
+class PerubahanSerializer(serializers.Serializer):
+    seq = serializers.IntegerField()
+    model = serializers.ChoiceField(choices=['buku', 'anggota', 'peminjaman'])
+    id = serializers.IntegerField(allow_null=True)
+    aksi = serializers.ChoiceField(choices=['buat', 'ubah', 'hapus', 'reset'])
+    # Bentuk sama dengan item daftar modelnya; null untuk hapus & reset
+    data = serializers.JSONField(allow_null=True)
+
+
+class DaftarPerubahanSerializer(serializers.Serializer):
+    """Serializer untuk respons log perubahan"""
+    seq = serializers.IntegerField()
+    reset = serializers.BooleanField()
+    ada_lanjutan = serializers.BooleanField()
+    results = PerubahanSerializer(many=True)
+
+
+class RefreshTokenSerializer(TokenRefreshSerializer):
+    """Refresh token dengan rotasi: token lama langsung dicabut (lihat revocation.py)"""
+    token_class = RefreshToken
@@ -0,0 +1,238 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+from django.dispatch import Signal, receiver
+
+from . import authentication, changes, counters, events, rollups, versions
+from .models import Anggota, Buku, Peminjaman, PeminjamanArsip
+
+
+# Dikirim oleh operasi massal (bulk.py) yang melewati post_save per objek.
+# Argumen: dibuat (peminjaman aktif baru), dikembalikan (aktif -> selesai).
+peminjaman_massal = Signal()
+
+
+# =============================================================================
+# PENGHITUNG DASHBOARD
+# =============================================================================
+
+@receiver(post_save, sender=Buku)
+def buku_disimpan(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.ubah({counters.BUKU: 1})
+
+
+@receiver(post_delete, sender=Buku)
+def buku_dihapus(sender, instance, **kwargs):
+    counters.ubah({counters.BUKU: -1})
+
+
+@receiver(post_save, sender=Anggota)
+def anggota_disimpan(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.ubah({counters.ANGGOTA: 1})
+
+
+@receiver(post_delete, sender=Anggota)
+def anggota_dihapus(sender, instance, **kwargs):
+    counters.ubah({counters.ANGGOTA: -1})
+
+
+@receiver(post_save, sender=Peminjaman)
+def peminjaman_disimpan(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    lama = None if created else getattr(instance, '_status_tersimpan', None)
+    baru = instance.status_peminjaman
+    if created or (lama is not None and lama != baru):
+        delta = {counters.PER_STATUS[baru]: 1}
+        if lama is not None:
+            delta[counters.PER_STATUS[lama]] = -1
+        counters.ubah(delta)
+    instance._status_tersimpan = baru
+
+
+@receiver(post_delete, sender=Peminjaman)
+def peminjaman_dihapus(sender, instance, **kwargs):
+    status = getattr(instance, '_status_tersimpan', None) or instance.status_peminjaman
+    counters.ubah({counters.PER_STATUS[status]: -1})
+
+
+@receiver(post_delete, sender=PeminjamanArsip)
+def peminjaman_arsip_dihapus(sender, instance, **kwargs):
+    # Mis. ikut terhapus bersama buku/anggotanya (CASCADE)
+    counters.ubah({counters.PEMINJAMAN_SELESAI: -1, counters.PEMINJAMAN_ARSIP: -1})
+
+
+@receiver(peminjaman_massal, sender=Peminjaman)
+def peminjaman_massal_diproses(sender, dibuat, dikembalikan, **kwargs):
+    counters.ubah({
+        counters.PEMINJAMAN_AKTIF: len(dibuat) - len(dikembalikan),
+        counters.PEMINJAMAN_SELESAI: len(dikembalikan),
+    })
+
+
+# =============================================================================
+# REKAP ANALITIK
+# =============================================================================
+
+@receiver(pre_save, sender=Peminjaman)
+def peminjaman_akan_disimpan(sender, instance, raw=False, using=None, **kwargs):
+    # Objek yang tidak dimuat lengkap dari database (mis. update per baris
+    # di importer): ambil nilai lamanya agar selisih rekap tetap benar
+    if raw or instance.pk is None or getattr(instance, '_rekap_tersimpan', None) is not None:
+        return
+    lama = Peminjaman.objects.using(using).filter(pk=instance.pk).values_list(*Peminjaman.KOLOM_REKAP).first()
+    instance._rekap_tersimpan = lama
+
+
+@receiver(post_save, sender=Peminjaman)
+def rekap_peminjaman_disimpan(sender, instance, created, raw=False, using=None, **kwargs):
+    if raw:
+        return
+    lama = None if created else getattr(instance, '_rekap_tersimpan', None)
+    baru = instance.nilai_rekap()
+    rollups.terapkan([(lama, baru)], using=using)
+    instance._rekap_tersimpan = baru
+
+
+@receiver(post_delete, sender=Peminjaman)
+@receiver(post_delete, sender=PeminjamanArsip)
+def rekap_peminjaman_dihapus(sender, instance, using=None, **kwargs):
+    lama = getattr(instance, '_rekap_tersimpan', None) or instance.nilai_rekap()
+    rollups.terapkan([(lama, None)], using=using)
+
+
+@receiver(peminjaman_massal, sender=Peminjaman)
+def rekap_peminjaman_massal(sender, dibuat, dikembalikan, **kwargs):
+    perubahan = [(None, p.nilai_rekap()) for p in dibuat]
+    perubahan += [(p._rekap_tersimpan, p.nilai_rekap()) for p in dikembalikan]
+    rollups.terapkan(perubahan)
+    for p in dibuat + dikembalikan:
+        p._rekap_tersimpan = p.nilai_rekap()
+
+
+# =============================================================================
+# LOG PERUBAHAN (change feed)
+# =============================================================================
+
+@receiver(post_save, sender=Buku)
+@receiver(post_save, sender=Anggota)
+def objek_disimpan(sender, instance, created, raw=False, using=None, **kwargs):
+    if not raw:
+        changes.catat([(sender, instance.pk, changes.BUAT if created else changes.UBAH)], using=using)
+
+
+@receiver(post_delete, sender=Buku)
+@receiver(post_delete, sender=Anggota)
+def objek_dihapus(sender, instance, using=None, **kwargs):
+    changes.catat([(sender, instance.pk, changes.HAPUS)], using=using)
+
+
+@receiver(pre_save, sender=Peminjaman)
+def log_peminjaman_akan_disimpan(sender, instance, raw=False, **kwargs):
+    # Dipanggil setelah peminjaman_akan_disimpan, jadi _rekap_tersimpan berisi nilai lama
+    lama = getattr(instance, '_rekap_tersimpan', None)
+    instance._relasi_tersimpan = (lama[1], lama[2]) if lama else None
+
+
+@receiver(post_save, sender=Peminjaman)
+def log_peminjaman_disimpan(sender, instance, created, raw=False, using=None, **kwargs):
+    if raw:
+        return
+    relasi_lama = None if created else getattr(instance, '_relasi_tersimpan', None)
+    aksi = changes.BUAT if created else changes.UBAH
+    changes.catat(changes.entri_peminjaman(instance, aksi, relasi_lama), using=using)
+
+
+@receiver(post_delete, sender=Peminjaman)
+def log_peminjaman_dihapus(sender, instance, using=None, **kwargs):
+    changes.catat(changes.entri_peminjaman(instance, changes.HAPUS), using=using)
+
+
+@receiver(post_delete, sender=PeminjamanArsip)
+def log_peminjaman_arsip_dihapus(sender, instance, using=None, **kwargs):
+    # Tidak ada di daftar peminjaman, tapi masih dihitung di total_peminjaman anggota
+    changes.catat([(Anggota, instance.anggota_id, changes.UBAH)], using=using)
+
+
+@receiver(peminjaman_massal, sender=Peminjaman)
+def log_peminjaman_massal(sender, dibuat, dikembalikan, **kwargs):
+    entri = []
+    for p in dibuat:
+        entri += changes.entri_peminjaman(p, changes.BUAT)
+    for p in dikembalikan:
+        entri += changes.entri_peminjaman(p, changes.UBAH)
+    changes.catat(entri)
+
+
+# =============================================================================
+# VERSI MODEL (ETag)
+# =============================================================================
+
+@receiver(post_save, sender=Buku)
+@receiver(post_save, sender=Anggota)
+@receiver(post_save, sender=Peminjaman)
+@receiver(post_delete, sender=Buku)
+@receiver(post_delete, sender=Anggota)
+@receiver(post_delete, sender=Peminjaman)
+@receiver(post_delete, sender=PeminjamanArsip)
+def model_berubah(sender, **kwargs):
+    versions.naikkan(versions.PER_MODEL[sender])
+
+
+@receiver(peminjaman_massal, sender=Peminjaman)
+def versi_peminjaman_massal(sender, **kwargs):
+    versions.naikkan(versions.PEMINJAMAN)
+
+
+# =============================================================================
+# STREAM SSE
+# =============================================================================
+
+@receiver(post_save, sender=Buku)
+@receiver(post_save, sender=Anggota)
+@receiver(post_save, sender=Peminjaman)
+@receiver(post_delete, sender=Buku)
+@receiver(post_delete, sender=Anggota)
+@receiver(post_delete, sender=Peminjaman)
+@receiver(peminjaman_massal, sender=Peminjaman)
+def siarkan_perubahan(sender, using=None, **kwargs):
+    # Setelah commit agar pemantau stream membaca data yang sudah tersimpan
+    transaction.on_commit(events.hub.bangunkan, using=using)
+
+
+# =============================================================================
+# CACHE USER (autentikasi JWT)
+# =============================================================================
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_berubah(sender, instance, **kwargs):
+    authentication.invalidasi_user(instance.pk)
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+@receiver(m2m_changed, sender=User.user_permissions.through)
+def relasi_user_berubah(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        authentication.invalidasi_user(instance.pk)
+    elif pk_set:
+        for pk in pk_set:
+            authentication.invalidasi_user(pk)
+    else:
+        # clear() dari sisi grup/permission: user yang terdampak tidak diketahui
+        authentication.invalidasi_semua()
+
+
+@receiver(m2m_changed, sender=Group.permissions.through)
+@receiver(post_delete, sender=Group)
+def grup_berubah(sender, action='post_delete', **kwargs):
+    if action.startswith('post_'):
+        authentication.invalidasi_semua()
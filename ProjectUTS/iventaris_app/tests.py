@@ -1,3 +1,1775 @@
-from django.test import TestCase
+import asyncio
+import contextvars
+import json
+import os
+import sqlite3
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from datetime import date, timedelta
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connection, connections
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.contrib.auth.models import Group, Permission
+from rest_framework.pagination import Cursor
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from . import (
+    arsip, authentication, changes, counters, events, metrics, revocation, rollups, routers, throttling, versions,
+)
+from .benchmark import bandingkan
+from .cache_backends import CacheTanpaGusur, keamanan
+from .management.commands.sync_replica import Command as SyncReplica
+from .importer import Importer
+from .models import (
+    Anggota, Buku, BukuSedangDipinjam, Peminjaman, PeminjamanArsip, Penghitung, Perubahan, RekapAnggotaHarian,
+    RekapBukuHarian, RekapHarian,
+)
+from .pagination import KeysetPagination
+from .seeder import buat_perpustakaan
+from .serializers import AnggotaSerializer, BukuSerializer
+
+
+def buat_data_peminjaman(jumlah, anggota=None):
+    """Buat `jumlah` buku beserta peminjamannya (setengah aktif, setengah selesai)"""
+    if anggota is None:
+        anggota = Anggota.objects.create(nama='Budi', email=f'budi{Anggota.objects.count()}@mail.com')
+    for i in range(jumlah):
+        buku = Buku.objects.create(judul=f'Buku {i}', penulis='Penulis', tahun=2020)
+        Peminjaman.objects.create(
+            buku=buku,
+            anggota=anggota,
+            tanggal_pinjam=date(2025, 1, 1 + i % 28),
+            status_peminjaman='aktif' if i % 2 == 0 else 'selesai',
+        )
+    return anggota
+
+
+class PeminjamanQueryCountTest(APITestCase):
+    """Jumlah query list API harus tetap, tidak bertambah per baris"""
+
+    def test_list_peminjaman_jumlah_query_tetap(self):
+        buat_data_peminjaman(3)
+        with self.assertNumQueries(2):  # versi (ETag) + data
+            self.client.get(reverse('peminjaman-list'))
+
+        buat_data_peminjaman(12)
+        with self.assertNumQueries(2):  # versi (ETag) + data
+            response = self.client.get(reverse('peminjaman-list'))
+        self.assertEqual(len(response.data['results']), 15)
+
+    def test_riwayat_anggota_jumlah_query_tetap(self):
+        anggota = buat_data_peminjaman(3)
+        url = reverse('anggota-riwayat', args=[anggota.pk])
+        with self.assertNumQueries(3):  # anggota + tabel aktif + arsip
+            self.client.get(url)
+
+        buat_data_peminjaman(12, anggota=anggota)
+        with self.assertNumQueries(3):
+            response = self.client.get(url)
+        self.assertEqual(len(response.data['results']), 15)
+        self.assertEqual(response.data['results'][0]['anggota_detail']['total_peminjaman'], 15)
+
+    def test_list_buku_dan_anggota_jumlah_query_tetap(self):
+        buat_data_peminjaman(10)
+        with self.assertNumQueries(2):  # versi (ETag) + data
+            response = self.client.get(reverse('buku-list'))
+        tersedia = [b['is_available'] for b in response.data['results']]
+        self.assertEqual(tersedia.count(True), 5)
+
+        with self.assertNumQueries(2):  # versi (ETag) + data
+            response = self.client.get(reverse('anggota-list'))
+        self.assertEqual(response.data['results'][0]['total_peminjaman'], 10)
+
+    def test_detail_bersarang_sesuai_data(self):
+        buat_data_peminjaman(2)
+        response = self.client.get(reverse('peminjaman-list'), {'status': 'aktif'})
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertFalse(response.data['results'][0]['buku_detail']['is_available'])
+        self.assertEqual(response.data['results'][0]['anggota_detail']['total_peminjaman'], 2)
+
+
+class KeysetPaginationTest(APITestCase):
+    """Cursor keyset harus menelusuri semua data tanpa duplikat, maju maupun mundur"""
+
+    def telusuri(self, url, params, arah='next'):
+        ids = []
+        response = self.client.get(url, params)
+        while True:
+            ids.extend(item['id'] for item in response.data['results'])
+            if not response.data[arah]:
+                return ids, response
+            response = self.client.get(response.data[arah])
+
+    def test_cursor_peminjaman_dengan_tanggal_kembar(self):
+        # 28 tanggal berbeda untuk 45 peminjaman -> banyak tanggal kembar
+        buat_data_peminjaman(45)
+        ids, terakhir = self.telusuri(reverse('peminjaman-list'), {'page_size': 7})
+
+        urutan = list(
+            Peminjaman.objects.order_by('-tanggal_pinjam', '-id').values_list('id', flat=True)
+        )
+        self.assertEqual(ids, urutan)
+
+        # Mundur dari halaman terakhir kembali ke awal
+        mundur, _ = self.telusuri(terakhir.data['previous'], {}, arah='previous')
+        self.assertEqual(sorted(mundur), sorted(urutan[:-len(terakhir.data['results'])]))
+
+    def test_cursor_halaman_dalam_tetap_satu_query(self):
+        buat_data_peminjaman(30)
+        response = self.client.get(reverse('buku-list'), {'page_size': 5})
+        for _ in range(4):
+            response = self.client.get(response.data['next'])
+        with self.assertNumQueries(2):  # versi (ETag) + data
+            self.client.get(response.data['next'])
+
+    def test_riwayat_mendukung_cursor(self):
+        anggota = buat_data_peminjaman(12)
+        ids, _ = self.telusuri(reverse('anggota-riwayat', args=[anggota.pk]), {'page_size': 5})
+        self.assertEqual(len(ids), 12)
+        self.assertEqual(len(set(ids)), 12)
+
+    def test_cursor_rusak_404(self):
+        response = self.client.get(reverse('buku-list'), {'cursor': 'bukan-cursor'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_cursor_dengan_posisi_diubah_404(self):
+        anggota = buat_data_peminjaman(2)
+        pagination = KeysetPagination()
+        kasus = [
+            (reverse('peminjaman-list'), ['abc', 'x']),
+            (reverse('buku-list'), ['x']),
+            (reverse('buku-list'), [None]),
+            (reverse('buku-list'), ['1', '2']),
+            (reverse('anggota-riwayat', args=[anggota.pk]), ['2024-13-01', '1']),
+            (reverse('peminjaman-overdue'), [['2025-01-01'], '1']),
+        ]
+        for url, posisi in kasus:
+            pagination.base_url = 'http://testserver' + url
+            cursor = pagination.encode_cursor(Cursor(offset=0, reverse=False, position=json.dumps(posisi)))
+            response = self.client.get(cursor)
+            self.assertEqual(response.status_code, 404, (url, posisi))
+            self.assertEqual(response.data, {'detail': 'Invalid cursor'})
+
+
+class PeminjamanAktifUnikTest(APITestCase):
+    """Satu buku hanya boleh punya satu peminjaman aktif, dijaga constraint database"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='petugas', password='rahasia123')
+        self.client.force_authenticate(self.user)
+        self.anggota = Anggota.objects.create(nama='Sari', email='sari@mail.com')
+        self.buku = Buku.objects.create(judul='Laskar Pelangi', penulis='Andrea Hirata', tahun=2005)
+
+    def pinjam(self):
+        return self.client.post(reverse('peminjaman-list'), {
+            'buku': self.buku.pk,
+            'anggota': self.anggota.pk,
+            'tanggal_pinjam': '2025-02-01',
+        })
+
+    def test_pinjam_buku_yang_sedang_dipinjam_ditolak(self):
+        self.assertEqual(self.pinjam().status_code, 201)
+        response = self.pinjam()
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("sedang dipinjam dan tidak tersedia", response.data['buku'][0])
+        self.assertEqual(Peminjaman.objects.filter(buku=self.buku).count(), 1)
+
+    def test_pinjam_lagi_setelah_dikembalikan(self):
+        self.pinjam()
+        Peminjaman.objects.update(status_peminjaman='selesai')
+        self.assertEqual(self.pinjam().status_code, 201)
+
+    def test_tidak_ada_query_exists_sebelum_insert(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.pinjam()
+        self.assertFalse([q for q in ctx.captured_queries if 'EXISTS' in q['sql'].upper()])
+
+    def test_update_ke_aktif_saat_buku_dipinjam_ditolak(self):
+        self.pinjam()
+        lama = Peminjaman.objects.create(
+            buku=self.buku, anggota=self.anggota,
+            tanggal_pinjam=date(2024, 1, 1), status_peminjaman='selesai',
+        )
+        response = self.client.patch(
+            reverse('peminjaman-detail', args=[lama.pk]), {'status_peminjaman': 'aktif'}
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('sedang dipinjam oleh anggota lain', response.data['buku'])
+
+    def test_integrity_error_lain_tidak_diubah(self):
+        self.pinjam()
+        lama = Peminjaman.objects.get()
+        buku_lain = Buku.objects.create(judul='Bumi Manusia', penulis='Pramoedya', tahun=1980)
+
+        # pk ganda
+        ganda = Peminjaman(pk=lama.pk, buku=buku_lain, anggota=self.anggota, tanggal_pinjam=date(2025, 2, 2))
+        with self.assertRaises(IntegrityError):
+            ganda.save(force_insert=True)
+
+        # Error dari receiver post_save (rekap harian)
+        with mock.patch.object(rollups, 'terapkan', side_effect=IntegrityError('rekap gagal')), \
+                self.assertRaisesMessage(IntegrityError, 'rekap gagal'):
+            Peminjaman.objects.create(buku=buku_lain, anggota=self.anggota, tanggal_pinjam=date(2025, 2, 2))
+        self.assertFalse(Peminjaman.objects.filter(buku=buku_lain).exists())
+
+    def test_form_template_memberi_pesan_error(self):
+        self.pinjam()
+        response = self.client.post(reverse('pinjam-buku', args=[self.buku.pk]), {
+            'anggota': self.anggota.pk,
+            'tanggal_pinjam': '2025-02-02',
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'sedang dipinjam oleh anggota lain')
+
+    def test_filter_available(self):
+        self.pinjam()
+        Buku.objects.create(judul='Bumi Manusia', penulis='Pramoedya', tahun=1980)
+        tersedia = self.client.get(reverse('buku-list'), {'available': 'true'}).data['results']
+        dipinjam = self.client.get(reverse('buku-list'), {'available': 'false'}).data['results']
+        self.assertEqual([b['judul'] for b in tersedia], ['Bumi Manusia'])
+        self.assertEqual([b['judul'] for b in dipinjam], ['Laskar Pelangi'])
+
+
+class PencarianFullTextTest(APITestCase):
+    """Pencarian ?search= dan ?q= memakai indeks FTS5 yang sinkron dengan tabel"""
+
+    def setUp(self):
+        self.python = Buku.objects.create(judul='Belajar Python', penulis='Budi Raharjo', tahun=2019)
+        self.django = Buku.objects.create(judul='Django untuk Pemula', penulis='Python Society', tahun=2021)
+        Buku.objects.create(judul='Bumi Manusia', penulis='Pramoedya', tahun=1980)
+
+    def cari_buku(self, teks):
+        response = self.client.get(reverse('buku-list'), {'search': teks})
+        return [b['judul'] for b in response.data['results']]
+
+    def test_prefix_dan_peringkat(self):
+        # Judul berbobot lebih tinggi dari penulis
+        self.assertEqual(self.cari_buku('pyth'), ['Belajar Python', 'Django untuk Pemula'])
+        self.assertEqual(self.cari_buku('bel pyt'), ['Belajar Python'])
+
+    def test_indeks_sinkron_saat_update_dan_delete(self):
+        self.python.judul = 'Belajar Golang'
+        self.python.save()
+        self.assertEqual(self.cari_buku('golang'), ['Belajar Golang'])
+        self.assertEqual(self.cari_buku('python'), ['Django untuk Pemula'])
+
+        self.django.delete()
+        self.assertEqual(self.cari_buku('python'), [])
+
+    def test_karakter_operator_fts_aman(self):
+        self.assertEqual(self.cari_buku('"python" OR'), [])
+        self.assertEqual(self.cari_buku('python*'), ['Belajar Python', 'Django untuk Pemula'])
+        self.assertEqual(self.cari_buku('***'), [])
+
+    def test_cari_anggota_dan_template(self):
+        Anggota.objects.create(nama='Siti Aminah', email='siti@kampus.ac.id')
+        response = self.client.get(reverse('anggota-list'), {'search': 'kampus'})
+        self.assertEqual([a['nama'] for a in response.data['results']], ['Siti Aminah'])
+
+        response = self.client.get(reverse('daftar-buku'), {'q': '198'})
+        self.assertEqual([b.judul for b in response.context['buku_list']], ['Bumi Manusia'])
+
+    def test_cursor_mengikuti_peringkat(self):
+        for i in range(6):
+            Buku.objects.create(judul=f'Python Jilid {i}', penulis='Anonim', tahun=2000)
+        response = self.client.get(reverse('buku-list'), {'search': 'python', 'page_size': 3})
+        judul = [b['judul'] for b in response.data['results']]
+        while response.data['next']:
+            response = self.client.get(response.data['next'])
+            judul += [b['judul'] for b in response.data['results']]
+        self.assertEqual(len(judul), 8)
+        self.assertEqual(len(set(judul)), 8)
+        self.assertEqual(judul[-1], 'Django untuk Pemula')
+
+    def test_match_fts_sekali_per_query(self):
+        for i in range(6):
+            Buku.objects.create(judul=f'Python Jilid {i}', penulis='Anonim', tahun=2000)
+        Anggota.objects.create(nama='Siti Aminah', email='siti@kampus.ac.id')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('buku-list'), {'search': 'python', 'page_size': 3})
+            self.client.get(response.data['next'])
+            self.client.get(reverse('daftar-buku'), {'q': 'python'})
+            self.client.get(reverse('anggota-list'), {'search': 'kampus'})
+
+        dicek = 0
+        for query in queries:
+            if '_fts' not in query['sql']:
+                continue
+            dicek += 1
+            with connection.cursor() as cursor:
+                cursor.execute('EXPLAIN QUERY PLAN ' + query['sql'])
+                rencana = [baris[-1] for baris in cursor.fetchall()]
+            # Satu scan indeks FTS (MATCH), lalu baris tabel asli dicari per rowid
+            self.assertEqual(len([l for l in rencana if '_fts' in l]), 1, rencana)
+            self.assertTrue(any(l.startswith('SCAN ') and 'VIRTUAL TABLE' in l for l in rencana), rencana)
+            self.assertTrue(any('USING INTEGER PRIMARY KEY' in l for l in rencana), rencana)
+        # Halaman pertama & kedua API, count + halaman template, anggota
+        self.assertEqual(dicek, 5)
+
+    def test_command_rebuild(self):
+        out = StringIO()
+        call_command('rebuild_search_index', stdout=out)
+        self.assertIn('iventaris_app_buku_fts: 3 baris', out.getvalue())
+        self.assertEqual(self.cari_buku('bumi'), ['Bumi Manusia'])
+
+
+class PenghitungDashboardTest(APITestCase):
+    """Penghitung dashboard dirawat inkremental dan bisa direkonsiliasi"""
+
+    def dashboard(self):
+        return self.client.get(reverse('api-dashboard')).data
+
+    def test_dashboard_satu_query(self):
+        buat_data_peminjaman(6)
+        with self.assertNumQueries(1):
+            data = self.dashboard()
+        self.assertEqual(data, {
+            'total_buku': 6,
+            'total_anggota': 1,
+            'total_dipinjam': 3,
+            'total_selesai': 3,
+            'buku_tersedia': 3,
+            'total_terlambat': None,
+            'terlambat_per': None,
+        })
+
+    def test_pinjam_kembali_dan_hapus(self):
+        anggota = buat_data_peminjaman(2)
+        aktif = Peminjaman.objects.get(status_peminjaman='aktif')
+        aktif.status_peminjaman = 'selesai'
+        aktif.save()
+        self.assertEqual(self.dashboard()['total_dipinjam'], 0)
+        self.assertEqual(self.dashboard()['total_selesai'], 2)
+
+        # Menghapus anggota ikut menghapus (cascade) semua peminjamannya
+        anggota.delete()
+        data = self.dashboard()
+        self.assertEqual((data['total_anggota'], data['total_selesai']), (0, 0))
+        self.assertEqual(data['total_buku'], 2)
+
+    def test_transaksi_gagal_tidak_mengubah_penghitung(self):
+        buat_data_peminjaman(1)
+        buku = Buku.objects.get()
+        with self.assertRaises(BukuSedangDipinjam):
+            Peminjaman.objects.create(
+                buku=buku, anggota=Anggota.objects.get(), tanggal_pinjam=date(2025, 3, 1)
+            )
+        self.assertEqual(self.dashboard()['total_dipinjam'], 1)
+
+    def test_rekonsiliasi_drift(self):
+        buat_data_peminjaman(4)
+        # queryset.update() melewati signal, penghitung jadi drift
+        Peminjaman.objects.update(status_peminjaman='selesai')
+        self.assertEqual(self.dashboard()['total_dipinjam'], 2)
+
+        out = StringIO()
+        call_command('reconcile_counters', stdout=out)
+        self.assertIn('peminjaman_aktif: diperbaiki menjadi 0 (selisih +2)', out.getvalue())
+        self.assertEqual(self.dashboard()['total_dipinjam'], 0)
+        self.assertEqual(self.dashboard()['total_selesai'], 4)
+
+
+class PeminjamanMassalTest(APITestCase):
+    """Pinjam & kembalikan massal: satu transaksi, hasil per item"""
+
+    def setUp(self):
+        self.client.force_authenticate(User.objects.create_user(username='petugas', password='rahasia123'))
+        self.anggota = Anggota.objects.create(nama='Sari', email='sari@mail.com')
+        self.buku = [
+            Buku.objects.create(judul=f'Buku {i}', penulis='Penulis', tahun=2020) for i in range(5)
+        ]
+
+    def pinjam_massal(self, buku_ids):
+        return self.client.post(reverse('peminjaman-pinjam-massal'), {'items': [
+            {'buku': pk, 'anggota': self.anggota.pk, 'tanggal_pinjam': '2025-06-01'} for pk in buku_ids
+        ]}, format='json')
+
+    def test_pinjam_massal_hasil_per_item(self):
+        Peminjaman.objects.create(buku=self.buku[0], anggota=self.anggota, tanggal_pinjam=date(2025, 5, 1))
+        ids = [b.pk for b in self.buku]
+        response = self.pinjam_massal(ids + [ids[1], 9999])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['berhasil'], response.data['gagal']), (4, 3))
+        status = [item['status'] for item in response.data['results']]
+        self.assertEqual(status, [400, 201, 201, 201, 201, 400, 400])
+        self.assertIn('sedang dipinjam dan tidak tersedia', response.data['results'][0]['errors']['buku'][0])
+        self.assertIn('9999', response.data['results'][6]['errors']['buku'][0])
+        self.assertFalse(response.data['results'][1]['data']['buku_detail']['is_available'])
+        self.assertEqual(Peminjaman.objects.filter(status_peminjaman='aktif').count(), 5)
+        self.assertEqual(self.client.get(reverse('api-dashboard')).data['total_dipinjam'], 5)
+
+    def test_jumlah_query_tidak_tergantung_jumlah_item(self):
+        with CaptureQueriesContext(connection) as sedikit:
+            self.pinjam_massal([self.buku[0].pk])
+        lagi = [Buku.objects.create(judul=f'Lagi {i}', penulis='P', tahun=2021).pk for i in range(20)]
+        with CaptureQueriesContext(connection) as banyak:
+            self.pinjam_massal(lagi)
+        self.assertEqual(len(sedikit), len(banyak))
+
+    def test_kembalikan_massal(self):
+        self.pinjam_massal([b.pk for b in self.buku[:3]])
+        ids = list(Peminjaman.objects.order_by('pk').values_list('pk', flat=True))
+        response = self.client.post(
+            reverse('peminjaman-kembalikan-massal'), {'ids': ids + [ids[0], 9999]}, format='json'
+        )
+        self.assertEqual([item['status'] for item in response.data['results']], [200, 200, 200, 400, 404])
+        self.assertEqual(response.data['results'][0]['message'], "Buku 'Buku 0' berhasil dikembalikan!")
+        self.assertTrue(response.data['results'][0]['data']['buku_detail']['is_available'])
+        self.assertFalse(Peminjaman.objects.filter(status_peminjaman='aktif').exists())
+
+        dashboard = self.client.get(reverse('api-dashboard')).data
+        self.assertEqual((dashboard['total_dipinjam'], dashboard['total_selesai']), (0, 3))
+
+    def test_butuh_login_dan_batas_ukuran(self):
+        response = self.client.post(reverse('peminjaman-kembalikan-massal'), {'ids': list(range(1001))}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.client.force_authenticate(None)
+        response = self.client.post(reverse('peminjaman-kembalikan-massal'), {'ids': [1]}, format='json')
+        self.assertEqual(response.status_code, 401)
+
+
+class EksporPeminjamanTest(APITestCase):
+    """Ekspor CSV/NDJSON di-stream dan mengikuti filter daftar peminjaman"""
+
+    def isi(self, response):
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_export_csv_dengan_filter(self):
+        buat_data_peminjaman(6)
+        response = self.client.get(reverse('peminjaman-export'), {'status': 'aktif'})
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        baris = self.isi(response).strip().splitlines()
+        self.assertEqual(baris[0].split(',')[:3], ['id', 'buku_id', 'judul_buku'])
+        self.assertEqual(len(baris), 4)
+        self.assertTrue(all(b.endswith(',aktif') for b in baris[1:]))
+
+    def test_export_ndjson(self):
+        buat_data_peminjaman(3)
+        response = self.client.get(reverse('peminjaman-export'), {'format': 'ndjson'})
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson; charset=utf-8')
+        data = [json.loads(b) for b in self.isi(response).splitlines()]
+        self.assertEqual(len(data), 3)
+        self.assertEqual(data[0]['nama_anggota'], 'Budi')
+
+    def test_export_riwayat_anggota(self):
+        anggota = buat_data_peminjaman(4)
+        buat_data_peminjaman(2)
+        response = self.client.get(reverse('anggota-riwayat-export', args=[anggota.pk]))
+        self.assertEqual(len(self.isi(response).strip().splitlines()), 5)
+        self.assertIn(f'riwayat-anggota-{anggota.pk}.csv', response['Content-Disposition'])
+
+        response = self.client.get(reverse('anggota-riwayat-export', args=[9999]))
+        self.assertEqual(response.status_code, 404)
+
+
+class ImportDataTest(TestCase):
+    """manage.py import_data: stream, validasi per batch, dedup/upsert"""
+
+    def tulis(self, nama, isi):
+        folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, folder)
+        path = os.path.join(folder, nama)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(isi)
+        return path
+
+    def impor(self, *args, **options):
+        out = StringIO()
+        call_command('import_data', *args, stdout=out, stderr=StringIO(), **options)
+        return out.getvalue()
+
+    def test_impor_buku_csv_dengan_error_per_baris(self):
+        path = self.tulis('buku.csv', (
+            'judul,penulis,tahun\n'
+            'Laskar Pelangi,Andrea Hirata,2005\n'
+            'Tanpa Tahun,Anonim,\n'
+            'Bumi Manusia,Pramoedya,1980\n'
+        ))
+        out = self.impor('buku', path, batch_size=2)
+        self.assertIn('3 baris dibaca: 2 dibuat, 0 diperbarui, 0 dilewati, 1 error', out)
+        self.assertIn('Baris 3', out)
+        self.assertEqual(Buku.objects.count(), 2)
+        self.assertEqual(self.client.get(reverse('api-dashboard')).data['total_buku'], 2)
+        # Baris hasil bulk_create ikut masuk indeks pencarian
+        response = self.client.get(reverse('buku-list'), {'search': 'lask'})
+        self.assertEqual(len(response.data['results']), 1)
+
+    def test_error_dibatasi_di_memori_dan_dialirkan_ke_file(self):
+        path = self.tulis('buku.csv', 'judul,penulis,tahun\n' + 'Judul,Penulis,bukan-angka\n' * 25)
+        file_error = path + '.gagal.ndjson'
+        out = self.impor('buku', path, batch_size=4, errors_file=file_error)
+        self.assertIn('25 error', out)
+        self.assertEqual(out.count('Baris '), 10)
+        self.assertIn('... dan 15 error lainnya', out)
+        with open(file_error, encoding='utf-8') as f:
+            self.assertEqual([json.loads(baris)['baris'] for baris in f], list(range(2, 27)))
+
+        importer = Importer('buku', maks_error=3)
+        statistik = importer.jalankan((i, {'judul': 'Judul', 'penulis': 'P', 'tahun': 'x'}) for i in range(1000))
+        self.assertEqual((statistik['error'], len(importer.errors)), (1000, 3))
+
+    def test_impor_anggota_json_upsert_berdasarkan_email(self):
+        Anggota.objects.create(nama='Nama Lama', email='sari@mail.com')
+        path = self.tulis('anggota.json', json.dumps([
+            {'nama': 'Sari Baru', 'email': 'sari@mail.com'},
+            {'nama': 'Budi', 'email': 'budi@mail.com'},
+            {'nama': 'Email Salah', 'email': 'bukan-email'},
+        ]))
+        out = self.impor('anggota', path, on_duplicate='update')
+        self.assertIn('1 dibuat, 1 diperbarui, 0 dilewati, 1 error', out)
+        self.assertEqual(Anggota.objects.get(email='sari@mail.com').nama, 'Sari Baru')
+
+        out = self.impor('anggota', path, on_duplicate='skip')
+        self.assertIn('0 dibuat, 0 diperbarui, 2 dilewati, 1 error', out)
+
+    def test_impor_peminjaman_ndjson_menjaga_aturan_aktif(self):
+        buku = Buku.objects.create(judul='A', penulis='B', tahun=2000)
+        anggota = Anggota.objects.create(nama='C', email='c@mail.com')
+        baris = [
+            {'buku': buku.pk, 'anggota': anggota.pk, 'tanggal_pinjam': '2024-01-01',
+             'tanggal_kembali': '2024-01-05', 'status_peminjaman': 'selesai'},
+            {'buku': buku.pk, 'anggota': anggota.pk, 'tanggal_pinjam': '2024-02-01'},
+            {'buku': buku.pk, 'anggota': anggota.pk, 'tanggal_pinjam': '2024-03-01'},
+            {'buku': 999, 'anggota': anggota.pk, 'tanggal_pinjam': '2024-03-01'},
+        ]
+        path = self.tulis('peminjaman.ndjson', '\n'.join(json.dumps(b) for b in baris))
+        out = self.impor('peminjaman', path)
+        self.assertIn('2 dibuat, 0 diperbarui, 0 dilewati, 2 error', out)
+        self.assertIn('sedang dipinjam', out)
+        self.assertEqual(Peminjaman.objects.filter(status_peminjaman='aktif').count(), 1)
+        # Kolom jatuh_tempo kosong diisi dari kebijakan lama pinjam
+        self.assertEqual(Peminjaman.objects.get(status_peminjaman='aktif').jatuh_tempo, date(2024, 2, 15))
+        dashboard = self.client.get(reverse('api-dashboard')).data
+        self.assertEqual((dashboard['total_dipinjam'], dashboard['total_selesai']), (1, 1))
+
+    def test_dry_run_tidak_menulis(self):
+        path = self.tulis('buku.csv', 'judul,penulis,tahun\nA,B,2000\n')
+        out = self.impor('buku', path, dry_run=True)
+        self.assertIn('[dry-run] 1 baris dibaca: 1 dibuat', out)
+        self.assertFalse(Buku.objects.exists())
+
+
+class ConditionalGetTest(APITestCase):
+    """ETag/Last-Modified dari versi model, 304 tanpa menjalankan queryset"""
+
+    def setUp(self):
+        self.buku = Buku.objects.create(judul='Laskar Pelangi', penulis='Andrea Hirata', tahun=2005)
+        self.anggota = Anggota.objects.create(nama='Sari', email='sari@mail.com')
+
+    def test_304_hanya_membaca_versi(self):
+        for url in [reverse('buku-list'), reverse('buku-detail', args=[self.buku.pk]),
+                    reverse('peminjaman-list'), reverse('api-dashboard')]:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertIn('no-cache', response['Cache-Control'])
+            with self.assertNumQueries(1):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+            self.assertEqual(response.status_code, 304, url)
+            self.assertEqual(response.content, b'')
+
+    def test_penulisan_mengubah_etag_model_terkait(self):
+        url_buku = reverse('buku-list')
+        url_anggota = reverse('anggota-list')
+        etag_buku = self.client.get(url_buku)['ETag']
+        etag_anggota = self.client.get(url_anggota)['ETag']
+
+        # Peminjaman baru mengubah is_available buku & total_peminjaman anggota
+        Peminjaman.objects.create(buku=self.buku, anggota=self.anggota, tanggal_pinjam=date(2024, 1, 1))
+        response = self.client.get(url_buku, HTTP_IF_NONE_MATCH=etag_buku)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.data['results'][0]['is_available'])
+        self.assertEqual(self.client.get(url_anggota, HTTP_IF_NONE_MATCH=etag_anggota).status_code, 200)
+
+        # Buku baru tidak mengubah daftar anggota
+        etag_anggota = self.client.get(url_anggota)['ETag']
+        Buku.objects.create(judul='Bumi Manusia', penulis='Pramoedya', tahun=1980)
+        self.assertEqual(self.client.get(url_anggota, HTTP_IF_NONE_MATCH=etag_anggota).status_code, 304)
+
+    def test_etag_berbeda_per_query_dan_last_modified(self):
+        semua = self.client.get(reverse('buku-list'))
+        tersedia = self.client.get(reverse('buku-list'), {'available': 'true'})
+        self.assertNotEqual(semua['ETag'], tersedia['ETag'])
+        response = self.client.get(reverse('buku-list'), HTTP_IF_MODIFIED_SINCE=semua['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN khusus SQLite')
+class RencanaQueryPeminjamanTest(APITestCase):
+    """
+    Query panas yang menyentuh Peminjaman harus memakai index: tidak boleh
+    ada SCAN tabel tanpa index atau sort sementara (USE TEMP B-TREE).
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.anggota = buat_data_peminjaman(30)
+        buat_data_peminjaman(10)
+        cls.buku = Buku.objects.first()
+
+    def rencana(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+            return [baris[-1] for baris in cursor.fetchall()]
+
+    def assertRencanaMemakaiIndex(self, url, params=None, boleh_scan=()):
+        """
+        Jalankan `url`, lalu EXPLAIN setiap query SELECT yang dieksekusi.
+        `boleh_scan` = tabel yang memang dibaca berurutan (mis. daftar buku per id).
+        """
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200, url)
+
+        dicek = 0
+        for query in queries:
+            if not query['sql'].startswith('SELECT') or Peminjaman._meta.db_table not in query['sql']:
+                continue
+            dicek += 1
+            for langkah in self.rencana(query['sql']):
+                pesan = f'{url} {params or ""}: {langkah}\n{query["sql"]}'
+                self.assertNotIn('USE TEMP B-TREE', langkah, pesan)
+                if langkah.startswith('SCAN ') and ' USING ' not in langkah:
+                    self.assertIn(langkah.split()[1], boleh_scan, pesan)
+        self.assertGreater(dicek, 0, url)
+        return response
+
+    def test_daftar_peminjaman_dan_filter(self):
+        for params in [None, {'status': 'aktif'}, {'status': 'selesai'},
+                       {'anggota': self.anggota.pk}, {'buku': self.buku.pk}]:
+            response = self.assertRencanaMemakaiIndex(reverse('peminjaman-list'), params)
+        # Halaman berikutnya (keyset) juga range scan pada index yang sama
+        response = self.client.get(reverse('peminjaman-list'), {'page_size': 5})
+        self.assertRencanaMemakaiIndex(response.data['next'])
+
+    def test_riwayat_anggota(self):
+        self.assertRencanaMemakaiIndex(reverse('anggota-riwayat', args=[self.anggota.pk]))
+        self.assertRencanaMemakaiIndex(reverse('riwayat-peminjaman', args=[self.anggota.pk]))
+
+    def test_peminjaman_terlambat(self):
+        self.assertRencanaMemakaiIndex(reverse('peminjaman-overdue'))
+        response = self.client.get(reverse('peminjaman-overdue'), {'page_size': 5})
+        self.assertRencanaMemakaiIndex(response.data['next'])
+
+    def test_daftar_peminjaman_template(self):
+        self.assertRencanaMemakaiIndex(reverse('daftar-peminjaman'))
+
+    def test_ketersediaan_dan_total_peminjaman(self):
+        buku = Buku._meta.db_table
+        for params in [None, {'available': 'true'}, {'available': 'false'}]:
+            self.assertRencanaMemakaiIndex(reverse('buku-list'), params, boleh_scan=[buku])
+        self.assertRencanaMemakaiIndex(reverse('buku-detail', args=[self.buku.pk]))
+        self.assertRencanaMemakaiIndex(reverse('anggota-list'), boleh_scan=[Anggota._meta.db_table])
+
+    def test_fallback_serializer(self):
+        with CaptureQueriesContext(connection) as queries:
+            BukuSerializer(self.buku).data
+            AnggotaSerializer(self.anggota).data
+        for query in queries:
+            for langkah in self.rencana(query['sql']):
+                self.assertFalse(langkah.startswith('SCAN '), langkah)
+                self.assertNotIn('USE TEMP B-TREE', langkah)
+
+
+class BenchmarkTest(TestCase):
+    """Seeder sintetis dan perbandingan hasil benchmark dengan baseline"""
+
+    def test_seeder_menghormati_satu_peminjaman_aktif(self):
+        buat_perpustakaan(buku=40, anggota=10, peminjaman=300, seed=1)
+        self.assertEqual((Buku.objects.count(), Anggota.objects.count(), Peminjaman.objects.count()), (40, 10, 300))
+        aktif = Peminjaman.objects.filter(status_peminjaman='aktif')
+        self.assertEqual(aktif.count(), aktif.values('buku').distinct().count())
+        self.assertEqual(self.client.get(reverse('api-dashboard')).data['total_buku'], 40)
+
+    def test_benchmark_dan_baseline(self):
+        buat_perpustakaan(buku=20, anggota=5, peminjaman=50)
+        folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, folder)
+        path = os.path.join(folder, 'hasil.json')
+
+        opsi = dict(database_sekarang=True, only=['api.dashboard', 'api.peminjaman.*'],
+                    skip=['*.export.*'], ulangan=2, pemanasan=0, stdout=StringIO())
+        call_command('benchmark', output=path, **opsi)
+        with open(path) as f:
+            hasil = json.load(f)['hasil']
+        self.assertIn('api.peminjaman.create', hasil)
+        self.assertNotIn('api.peminjaman.export.anggota', hasil)
+        self.assertEqual(hasil['api.dashboard']['status'], 200)
+        self.assertEqual(hasil['api.dashboard']['queries'], 1)
+        # Skenario tulis di-rollback
+        self.assertEqual(Peminjaman.objects.count(), 50)
+
+        # Baseline dengan query lebih sedikit -> regresi
+        hasil['api.dashboard']['queries'] = 0
+        with open(path, 'w') as f:
+            json.dump({'hasil': hasil}, f)
+        with self.assertRaisesMessage(CommandError, 'regresi'):
+            call_command('benchmark', baseline=path, **opsi)
+
+    def test_bandingkan_mengabaikan_derau_kecil(self):
+        lama = {'x': {'p50_ms': 1.0, 'p99_ms': 2.0, 'queries': 3, 'peak_kb': 100.0}}
+        self.assertEqual(bandingkan({'x': dict(lama['x'], p50_ms=1.5)}, lama), [])
+        self.assertEqual(
+            bandingkan({'x': dict(lama['x'], p99_ms=9.0, peak_kb=150.0)}, lama),
+            [('x', 'p99_ms', 2.0, 9.0), ('x', 'peak_kb', 100.0, 150.0)],
+        )
+
+
+class SeederDatabaseLainTest(TransactionTestCase):
+    """seed_library --database mengisi penghitung & versi di alias itu, bukan di default"""
+
+    def alias_baru(self):
+        # Salinan primer (skema lengkap) sebagai database kedua
+        folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, folder)
+        tujuan = os.path.join(folder, 'lain.sqlite3')
+        SyncReplica(stdout=StringIO()).salin(tujuan, pages=-1)
+        # Koneksi dinamis (di luar settings.DATABASES) diizinkan test runner
+        default = connections['default']
+        connections['lain'] = type(default)({**default.settings_dict, 'NAME': tujuan}, alias='lain')
+
+        def hapus():
+            connections['lain'].close()
+            del connections['lain']
+        self.addCleanup(hapus)
+        return 'lain'
+
+    def penghitung(self, using):
+        return dict(Penghitung.objects.using(using).values_list('nama', 'nilai'))
+
+    def test_seed_alias_lain_tidak_menyentuh_default(self):
+        buat_data_peminjaman(2)
+        counters.rekonsiliasi()
+        versions.naikkan(versions.BUKU, versions.ANGGOTA, versions.PEMINJAMAN)
+        alias = self.alias_baru()
+        sebelum = self.penghitung('default')
+
+        call_command('seed_library', buku=30, anggota=5, peminjaman=60, database=alias, stdout=StringIO())
+
+        self.assertEqual(self.penghitung('default'), sebelum)
+        sesudah = self.penghitung(alias)
+        self.assertEqual((sesudah[counters.BUKU], sesudah[counters.ANGGOTA]), (32, 6))
+        self.assertEqual(sesudah[counters.PEMINJAMAN_AKTIF] + sesudah[counters.PEMINJAMAN_SELESAI], 62)
+        for nama in (versions.BUKU, versions.ANGGOTA, versions.PEMINJAMAN):
+            self.assertGreater(sesudah[versions.kunci(nama)], sebelum[versions.kunci(nama)])
+
+
+class MetrikTest(APITestCase):
+    """Middleware metrik per endpoint dan /api/metrics/ (format Prometheus)"""
+
+    def setUp(self):
+        metrics.registry.reset()
+        cache.clear()
+
+    def metrik(self):
+        response = self.client.get(reverse('api-metrics'))
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        return response.content.decode()
+
+    def test_request_query_dan_ukuran_per_route(self):
+        buat_data_peminjaman(3)
+        ukuran = len(self.client.get(reverse('buku-list')).content)
+        self.client.get(reverse('buku-list'))
+        self.client.post(reverse('buku-list'), {})
+        self.client.get('/api/tidak-ada/')
+
+        teks = self.metrik()
+        self.assertIn('iventaris_http_requests_total{route="buku-list",method="GET",status="200"} 2', teks)
+        self.assertIn('iventaris_http_requests_total{route="buku-list",method="POST",status="401"} 1', teks)
+        self.assertIn('iventaris_http_requests_total{route="<unmatched>",method="GET",status="404"} 1', teks)
+        # Versi (ETag) + daftar buku, lalu hanya versi (respons anonim dari cache)
+        self.assertIn('iventaris_db_queries_per_request_sum{route="buku-list",method="GET"} 3', teks)
+        self.assertIn('iventaris_db_queries_per_request_bucket{route="buku-list",method="GET",le="0"} 0', teks)
+        self.assertIn('iventaris_db_queries_per_request_bucket{route="buku-list",method="GET",le="1"} 1', teks)
+        self.assertIn('iventaris_db_queries_per_request_bucket{route="buku-list",method="GET",le="2"} 2', teks)
+        self.assertIn(f'iventaris_http_response_size_bytes_sum{{route="buku-list",method="GET"}} {2 * ukuran}.0', teks)
+        self.assertIn('iventaris_http_request_duration_seconds_count{route="buku-list",method="GET"} 2', teks)
+        self.assertIn('iventaris_db_query_duration_seconds_total{route="buku-list",method="GET"}', teks)
+
+    def test_respons_stream_dicatat_setelah_selesai(self):
+        buat_data_peminjaman(3)
+        response = self.client.get(reverse('peminjaman-export'))
+        isi = b''.join(response.streaming_content)
+        teks = self.metrik()
+        self.assertIn(
+            f'iventaris_http_response_size_bytes_sum{{route="peminjaman-export",method="GET"}} {len(isi)}.0', teks
+        )
+        # Satu query per tabel (aktif + arsip)
+        self.assertIn('iventaris_db_queries_per_request_sum{route="peminjaman-export",method="GET"} 2', teks)
+
+    def test_registry_aman_antar_thread(self):
+        registry = metrics.Registry()
+
+        def kerja():
+            for _ in range(1000):
+                registry.catat('r', 'GET', 200, 0.01, 2, 0.001, 100)
+
+        threads = [threading.Thread(target=kerja) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        teks = registry.render()
+        self.assertIn('iventaris_http_requests_total{route="r",method="GET",status="200"} 8000', teks)
+        self.assertIn('iventaris_db_queries_per_request_sum{route="r",method="GET"} 16000', teks)
+
+
+class AsyncViewTest(TestCase):
+    """Endpoint baca async (ASGI) menghasilkan data yang sama dengan endpoint DRF"""
+
+    def setUp(self):
+        self.anggota = buat_data_peminjaman(5)
+        self.buku = Buku.objects.order_by('pk').first()
+        self.peminjaman = Peminjaman.objects.order_by('pk').first()
+
+    async def test_payload_sama_dengan_endpoint_sync(self):
+        pasangan = [
+            (reverse('api-dashboard'), reverse('api-async-dashboard')),
+            (reverse('buku-list') + '?available=true', reverse('api-async-buku-list') + '?available=true'),
+            (reverse('buku-detail', args=[self.buku.pk]), reverse('api-async-buku-detail', args=[self.buku.pk])),
+            (reverse('anggota-list'), reverse('api-async-anggota-list')),
+            (reverse('anggota-detail', args=[self.anggota.pk]),
+             reverse('api-async-anggota-detail', args=[self.anggota.pk])),
+            (reverse('anggota-riwayat', args=[self.anggota.pk]),
+             reverse('api-async-anggota-riwayat', args=[self.anggota.pk])),
+            (reverse('peminjaman-list') + '?status=aktif', reverse('api-async-peminjaman-list') + '?status=aktif'),
+            (reverse('peminjaman-detail', args=[self.peminjaman.pk]),
+             reverse('api-async-peminjaman-detail', args=[self.peminjaman.pk])),
+        ]
+        for url_sync, url_async in pasangan:
+            sync = await self.async_client.get(url_sync)
+            response = await self.async_client.get(url_async)
+            self.assertEqual(response.status_code, 200, url_async)
+            self.assertEqual(response['Content-Type'], 'application/json')
+            # Link cursor berbeda path, isinya sama
+            data_sync, data_async = sync.json(), response.json()
+            for kunci in ('next', 'previous'):
+                if isinstance(data_sync, dict) and data_sync.get(kunci):
+                    data_sync[kunci] = data_sync[kunci].replace('/api/', '/api/async/', 1)
+            self.assertEqual(data_async, data_sync, url_async)
+
+    async def test_cursor_etag_dan_404(self):
+        url = reverse('api-async-peminjaman-list')
+        halaman = (await self.async_client.get(url, {'page_size': 2})).json()
+        self.assertEqual(len(halaman['results']), 2)
+        lanjutan = (await self.async_client.get(halaman['next'])).json()
+        self.assertEqual(len(lanjutan['results']), 2)
+        self.assertNotEqual(halaman['results'][0]['id'], lanjutan['results'][0]['id'])
+
+        response = await self.async_client.get(url)
+        ulang = await self.async_client.get(url, headers={'if-none-match': response['ETag']})
+        self.assertEqual(ulang.status_code, 304)
+        self.assertEqual(ulang.content, b'')
+
+        response = await self.async_client.get(reverse('api-async-buku-detail', args=[999999]))
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json(), {'detail': 'No Buku matches the given query.'})
+        self.assertEqual((await self.async_client.get(url, {'cursor': 'rusak'})).status_code, 404)
+        self.assertEqual((await self.async_client.post(url)).status_code, 405)
+
+    async def test_metrik_mencatat_query_orm_async(self):
+        metrics.registry.reset()
+        url = reverse('api-async-buku-list')
+        response = await self.async_client.get(url)
+        await self.async_client.get(url, headers={'if-none-match': response['ETag']})
+        teks = metrics.registry.render()
+        self.assertIn('iventaris_http_requests_total{route="api-async-buku-list",method="GET",status="304"} 1', teks)
+        # Versi (ETag) + daftar buku, lalu hanya versi untuk 304
+        self.assertIn('iventaris_db_queries_per_request_sum{route="api-async-buku-list",method="GET"} 3', teks)
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplikaRouterTest(SimpleTestCase):
+    """Keputusan router tanpa menyentuh database"""
+
+    def setUp(self):
+        self.router = routers.ReplikaRouter()
+
+    def baca(self):
+        return self.router.db_for_read(Buku)
+
+    def test_baca_ke_replika_tulis_ke_primer(self):
+        # Konteks kosong: belum ada penulisan yang mempin ke primer
+        def kerja():
+            hasil = [self.baca()]
+            with routers.primer():
+                hasil.append(self.baca())
+            hasil.append(self.baca())
+            self.assertEqual(self.router.db_for_write(Buku), 'default')
+            # Setelah menulis, sisa konteks membaca dari primer
+            hasil.append(self.baca())
+            return hasil
+
+        self.assertEqual(contextvars.Context().run(kerja), ['replica', 'default', 'replica', 'default'])
+        self.assertFalse(self.router.allow_migrate('replica', 'iventaris_app'))
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_tanpa_replika_semua_ke_default(self):
+        self.assertEqual(contextvars.Context().run(self.baca), 'default')
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplikaRequestTest(TransactionTestCase):
+    """Request baca memakai replika, request tulis dipin ke primer"""
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='petugas', password='rahasia123')
+        self.buku = Buku.objects.create(judul='Laskar Pelangi', penulis='Andrea Hirata', tahun=2005)
+        self.anggota = Anggota.objects.create(nama='Sari', email='sari@mail.com')
+
+    def jalankan(self, fungsi):
+        with CaptureQueriesContext(connections['default']) as primer, \
+                CaptureQueriesContext(connections['replica']) as replika:
+            response = fungsi()
+        return response, len(primer), len(replika)
+
+    def test_get_dibaca_dari_replika(self):
+        for url in [reverse('buku-list'), reverse('api-dashboard'),
+                    reverse('anggota-riwayat', args=[self.anggota.pk])]:
+            response, primer, replika = self.jalankan(lambda: self.client.get(url))
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(primer, 0, url)
+            self.assertGreater(replika, 0, url)
+
+    def test_request_tulis_dipin_ke_primer(self):
+        self.client.force_login(self.user)
+        data = {'buku': self.buku.pk, 'anggota': self.anggota.pk, 'tanggal_pinjam': '2025-01-01'}
+        response, primer, replika = self.jalankan(
+            lambda: self.client.post(reverse('peminjaman-list'), data, content_type='application/json')
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(replika, 0)
+        self.assertGreater(primer, 0)
+
+        # Setelah request selesai, request baca berikutnya kembali ke replika
+        _, primer, replika = self.jalankan(lambda: self.client.get(reverse('buku-list')))
+        self.assertEqual((primer > 0, replika > 0), (False, True))
+
+
+class SyncReplicaTest(TransactionTestCase):
+    """Backup berjalan di luar transaksi (di dalam transaksi tulis, backup menunggu terus)"""
+
+    def test_salin_primer_ke_file_replika(self):
+        buat_data_peminjaman(3)
+        folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, folder)
+        tujuan = os.path.join(folder, 'replika.sqlite3')
+
+        SyncReplica(stdout=StringIO()).salin(tujuan, pages=16)
+        salinan = sqlite3.connect(tujuan)
+        self.addCleanup(salinan.close)
+        self.assertEqual(salinan.execute('SELECT count(*) FROM iventaris_app_buku').fetchone()[0], 3)
+        # Indeks pencarian ikut tersalin
+        self.assertEqual(
+            salinan.execute("SELECT count(*) FROM iventaris_app_buku_fts WHERE iventaris_app_buku_fts MATCH 'buku'").fetchone()[0],
+            3,
+        )
+
+
+class CachedJWTAuthenticationTest(APITestCase):
+    """User JWT diambil dari cache sampai user/grup/permission-nya berubah"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='petugas', password='rahasia123', email='a@mail.com')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+
+    def test_lookup_user_sekali_lalu_dari_cache(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(reverse('user_profile')).data['email'], 'a@mail.com')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(reverse('user_profile')).status_code, 200)
+
+    def test_perubahan_profil_dan_admin_langsung_berlaku(self):
+        self.client.get(reverse('user_profile'))
+        self.client.put(reverse('user_profile'), {'email': 'b@mail.com'})
+        self.assertEqual(self.client.get(reverse('user_profile')).data['email'], 'b@mail.com')
+
+        # Perubahan dari luar request (admin, shell)
+        user = User.objects.get(pk=self.user.pk)
+        user.is_active = False
+        user.save()
+        self.assertEqual(self.client.get(reverse('user_profile')).status_code, 401)
+
+    def test_permission_grup_menginvalidasi_cache(self):
+        grup = Group.objects.create(name='petugas')
+        self.user.groups.add(grup)
+        self.client.get(reverse('user_profile'))
+        grup.permissions.add(Permission.objects.get(codename='add_buku'))
+        with self.assertNumQueries(1):
+            self.client.get(reverse('user_profile'))
+
+    def test_cache_lru_terbatas_dan_kedaluwarsa(self):
+        cache = authentication.CacheUser(maks=2, ttl=60)
+        cache.simpan('a', 1)
+        cache.simpan('b', 2)
+        cache.ambil('a')
+        cache.simpan('c', 3)
+        self.assertEqual((cache.ambil('a'), cache.ambil('b'), cache.ambil('c')), (1, None, 3))
+        cache.ttl = 0
+        cache.simpan('d', 4)
+        self.assertIsNone(cache.ambil('d'))
+
+
+class RefreshTokenRevocationTest(APITestCase):
+    """Rotasi refresh token mencabut token lama lewat cache, tanpa query"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='petugas', password='rahasia123')
+
+    def test_token_lama_ditolak_setelah_rotasi(self):
+        refresh = str(RefreshToken.for_user(self.user))
+        with self.assertNumQueries(0):
+            response = self.client.post(reverse('token_refresh'), {'refresh': refresh})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.data['refresh'], refresh)
+
+        self.assertEqual(self.client.post(reverse('token_refresh'), {'refresh': refresh}).status_code, 401)
+        baru = self.client.post(reverse('token_refresh'), {'refresh': response.data['refresh']})
+        self.assertEqual(baru.status_code, 200)
+
+    def test_cabut_atomik_dan_kedaluwarsa(self):
+        token = RefreshToken.for_user(self.user)
+        jti, exp = token['jti'], token['exp']
+        self.assertFalse(revocation.dicabut(jti))
+        self.assertTrue(revocation.cabut(jti, exp))
+        self.assertFalse(revocation.cabut(jti, exp))
+        self.assertTrue(revocation.dicabut(jti))
+        # Token yang sudah kedaluwarsa tidak disimpan
+        self.assertTrue(revocation.cabut('lama', exp - 10 ** 6))
+        self.assertFalse(revocation.dicabut('lama'))
+
+    @override_settings(CACHES={**settings.CACHES, 'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'uji-gusur',
+        'OPTIONS': {'MAX_ENTRIES': 5},
+    }})
+    def test_banjir_cache_respons_tidak_menggusur_pencabutan(self):
+        token = RefreshToken.for_user(self.user)
+        revocation.cabut(token['jti'], token['exp'])
+        # URL unik anonim mengisi cache respons jauh melewati MAX_ENTRIES-nya
+        for i in range(20):
+            self.client.get(reverse('buku-list'), {'x': i})
+        self.assertTrue(revocation.dicabut(token['jti']))
+        self.assertEqual(self.client.post(reverse('token_refresh'), {'refresh': str(token)}).status_code, 401)
+
+    def test_cache_keamanan_hanya_membuang_entri_kedaluwarsa(self):
+        cache_keamanan = CacheTanpaGusur('uji-keamanan', {'OPTIONS': {'MAX_ENTRIES': 3}})
+        for i in range(5):
+            cache_keamanan.set(f'berlaku{i}', i, timeout=60)
+        cache_keamanan.set('kedaluwarsa', 1, timeout=-1)
+        cache_keamanan.set('lagi', 1, timeout=60)
+        self.assertEqual([cache_keamanan.get(f'berlaku{i}') for i in range(5)], list(range(5)))
+        self.assertNotIn(cache_keamanan.make_and_validate_key('kedaluwarsa'), cache_keamanan._cache)
+
+
+class TokenBucketThrottleTest(APITestCase):
+    """Login & register dibatasi per IP dan per username sebelum hashing password"""
+
+    def setUp(self):
+        keamanan().clear()
+        self.addCleanup(keamanan().clear)
+        User.objects.create_user(username='petugas', password='rahasia123')
+
+    @override_settings(REST_FRAMEWORK={'DEFAULT_THROTTLE_RATES': {'login.username': '2/min'}})
+    def test_per_username_429_dengan_retry_after(self):
+        data = {'username': 'petugas', 'password': 'salah'}
+        for _ in range(2):
+            self.assertEqual(self.client.post(reverse('token_obtain_pair'), data).status_code, 401)
+        response = self.client.post(reverse('token_obtain_pair'), dict(data, username=' PETUGAS '))
+        self.assertEqual(response.status_code, 429)
+        self.assertGreaterEqual(int(response['Retry-After']), 1)
+        # Username lain tidak ikut terkena
+        self.assertEqual(
+            self.client.post(reverse('token_obtain_pair'), {'username': 'lain', 'password': 'x'}).status_code, 401
+        )
+
+    @override_settings(REST_FRAMEWORK={'DEFAULT_THROTTLE_RATES': {'register.ip': '1/min'}})
+    def test_per_ip_sebelum_validasi(self):
+        self.client.post(reverse('register'), {})
+        with self.assertNumQueries(0):
+            response = self.client.post(reverse('register'), {'username': 'baru', 'password': 'rahasia123'})
+        self.assertEqual(response.status_code, 429)
+        # IP lain punya bucket sendiri
+        response = self.client.post(reverse('register'), {}, REMOTE_ADDR='10.0.0.2')
+        self.assertEqual(response.status_code, 400)
+        # X-Forwarded-For dari klien tidak memberi bucket baru tanpa NUM_PROXIES
+        response = self.client.post(reverse('register'), {}, HTTP_X_FORWARDED_FOR='10.9.9.9')
+        self.assertEqual(response.status_code, 429)
+
+    @override_settings(REST_FRAMEWORK={'DEFAULT_THROTTLE_RATES': {'register.ip': '1/min'}, 'NUM_PROXIES': 1})
+    def test_x_forwarded_for_dari_proxy_tepercaya(self):
+        self.client.post(reverse('register'), {}, HTTP_X_FORWARDED_FOR='10.9.9.9')
+        self.assertEqual(self.client.post(reverse('register'), {}, HTTP_X_FORWARDED_FOR='10.9.9.9').status_code, 429)
+        self.assertEqual(self.client.post(reverse('register'), {}, HTTP_X_FORWARDED_FOR='10.9.9.8').status_code, 400)
+
+    def test_bucket_terisi_kembali(self):
+        self.assertEqual(throttling.ambil_token('uji', 2, 1.0, sekarang=100.0), 0)
+        self.assertEqual(throttling.ambil_token('uji', 2, 1.0, sekarang=100.0), 0)
+        self.assertAlmostEqual(throttling.ambil_token('uji', 2, 1.0, sekarang=100.5), 0.5)
+        self.assertEqual(throttling.ambil_token('uji', 2, 1.0, sekarang=101.0), 0)
+
+    def test_ambil_token_paralel_tidak_melebihi_kapasitas(self):
+        hasil = []
+        mulai = threading.Barrier(20)
+        get_asli = CacheTanpaGusur.get
+
+        def get_lambat(self, *args, **kwargs):
+            # Perlebar jeda antara baca dan tulis bucket agar request saling tumpang tindih
+            nilai = get_asli(self, *args, **kwargs)
+            time.sleep(0.01)
+            return nilai
+
+        def ambil():
+            mulai.wait()
+            hasil.append(throttling.ambil_token('paralel', 5, 5 / 60, sekarang=100.0))
+
+        threads = [threading.Thread(target=ambil) for _ in range(20)]
+        with mock.patch.object(CacheTanpaGusur, 'get', get_lambat):
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+        self.assertEqual(hasil.count(0), 5)
+
+    def test_kunci_bucket_sibuk_ditolak(self):
+        keamanan().add('sibuk:kunci', 1)
+        with mock.patch.object(throttling, 'KUNCI_JEDA', 0):
+            self.assertEqual(throttling.ambil_token('sibuk', 5, 0.5), 2)
+        self.assertIsNone(keamanan().get('sibuk'))
+
+
+class CacheResponsAnonimTest(APITestCase):
+    """Data respons GET anonim di-cache per path, query param dan versi model"""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        buat_data_peminjaman(3)
+
+    def test_hit_cache_hanya_membaca_versi(self):
+        url = reverse('buku-list')
+        pertama = self.client.get(url, {'available': 'true', 'page_size': 2})
+        with self.assertNumQueries(1):
+            # Urutan query param berbeda, kunci sama
+            kedua = self.client.get(f'{url}?page_size=2&available=true')
+        self.assertEqual(kedua.json(), pertama.json())
+        self.assertEqual(kedua['ETag'], pertama['ETag'])
+
+    def test_penulisan_langsung_berlaku(self):
+        url = reverse('anggota-detail', args=[Anggota.objects.get().pk])
+        self.assertEqual(self.client.get(url).data['total_peminjaman'], 3)
+        Peminjaman.objects.create(
+            buku=Buku.objects.create(judul='Baru', penulis='P', tahun=2020),
+            anggota=Anggota.objects.get(), tanggal_pinjam=date(2025, 2, 1),
+        )
+        self.assertEqual(self.client.get(url).data['total_peminjaman'], 4)
+
+    @override_settings(CACHES={**settings.CACHES, 'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': tempfile.gettempdir() + '/iventaris-uji-cache',
+    }})
+    def test_backend_file_dan_user_login_tidak_dicache(self):
+        cache.clear()
+        url = reverse('buku-list')
+        self.client.get(url)
+        with self.assertNumQueries(1):
+            self.client.get(url)
+
+        self.client.force_authenticate(User.objects.create_user(username='petugas', password='rahasia123'))
+        with self.assertNumQueries(2):
+            self.client.get(url)
+
+
+class FieldDimintaTest(APITestCase):
+    """?fields= dan ?expand= membatasi field sekaligus join/anotasi queryset"""
+
+    def setUp(self):
+        cache.clear()
+        self.anggota = buat_data_peminjaman(3)
+
+    def test_default_tetap_lengkap(self):
+        item = self.client.get(reverse('peminjaman-list')).data['results'][0]
+        self.assertIn('buku_detail', item)
+        self.assertIn('total_peminjaman', item['anggota_detail'])
+
+    def test_fields_tanpa_relasi_tanpa_join(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('peminjaman-list'), {'fields': 'id,tanggal_pinjam,buku'})
+        self.assertEqual(set(response.data['results'][0]), {'id', 'tanggal_pinjam', 'buku'})
+        sql = queries.captured_queries[-1]['sql']
+        self.assertNotIn('JOIN', sql)
+        self.assertNotIn('EXISTS', sql)
+
+    def test_expand_satu_relasi(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('peminjaman-list'), {'expand': 'buku'})
+        item = response.data['results'][0]
+        self.assertIn('buku_detail', item)
+        self.assertNotIn('anggota_detail', item)
+        # Field lain tetap lengkap, serializer bersarang tidak ikut disaring
+        self.assertIn('tanggal_kembali', item)
+        self.assertEqual(set(item['buku_detail']), {'id', 'judul', 'penulis', 'tahun', 'is_available'})
+        self.assertNotIn('"iventaris_app_anggota"', queries.captured_queries[-1]['sql'])
+
+    def test_fields_buku_dan_anggota_tanpa_anotasi(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('buku-list'), {'fields': 'id,judul'})
+        self.assertEqual(set(response.data['results'][0]), {'id', 'judul'})
+        self.assertNotIn('EXISTS', queries.captured_queries[-1]['sql'])
+        response = self.client.get(reverse('anggota-detail', args=[self.anggota.pk]), {'fields': 'nama'})
+        self.assertEqual(response.data, {'nama': 'Budi'})
+        # Filter ketersediaan tetap jalan walau is_available tidak ditampilkan
+        response = self.client.get(reverse('buku-list'), {'fields': 'id', 'available': 'true'})
+        self.assertEqual(len(response.data['results']), 1)
+
+
+class HalamanDaftarTest(TestCase):
+    """Halaman template: berhalaman, tanpa N+1, dan baris di-cache per fragmen"""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_jumlah_query_tetap(self):
+        anggota = buat_data_peminjaman(3)
+        for nama, args in [('daftar-peminjaman', []), ('riwayat-peminjaman', [anggota.pk]), ('daftar-buku', [])]:
+            with CaptureQueriesContext(connection) as sedikit:
+                self.client.get(reverse(nama, args=args))
+            buat_data_peminjaman(12, anggota=anggota)
+            cache.clear()
+            with CaptureQueriesContext(connection) as banyak:
+                response = self.client.get(reverse(nama, args=args))
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(banyak), len(sedikit), nama)
+
+    def test_paginasi(self):
+        buat_data_peminjaman(60)
+        response = self.client.get(reverse('daftar-peminjaman'))
+        self.assertEqual(len(response.context['object_list']), 50)
+        self.assertEqual(response.context['paginator'].num_pages, 2)
+        response = self.client.get(reverse('daftar-peminjaman'), {'page': 2})
+        self.assertEqual(len(response.context['object_list']), 10)
+
+        response = self.client.get(reverse('daftar-buku'), {'q': 'Buku', 'page': 2})
+        self.assertEqual(len(response.context['buku_list']), 10)
+        self.assertContains(response, '?q=Buku&amp;page=1')
+
+    def test_fragmen_tidak_basi(self):
+        buat_data_peminjaman(1)
+        peminjaman = Peminjaman.objects.get()
+        self.assertContains(self.client.get(reverse('daftar-peminjaman')), 'Aktif (Dipinjam)')
+
+        # Tanpa signal (update massal) pun kunci baris ikut berubah
+        Peminjaman.objects.filter(pk=peminjaman.pk).update(status_peminjaman='selesai', tanggal_kembali=date(2025, 2, 1))
+        response = self.client.get(reverse('daftar-peminjaman'))
+        self.assertContains(response, 'Selesai (Dikembalikan)')
+        self.assertNotContains(response, 'Aktif (Dipinjam)')
+
+        # Judul buku ada di fragmen: perubahan buku menaikkan versi relasi
+        Buku.objects.filter(pk=peminjaman.buku_id).update(judul='Judul Baru')
+        self.assertContains(self.client.get(reverse('daftar-peminjaman')), 'Buku 0')
+        buku = Buku.objects.get(pk=peminjaman.buku_id)
+        buku.save()
+        self.assertContains(self.client.get(reverse('daftar-peminjaman')), 'Judul Baru')
+
+
+class PeminjamanTerlambatTest(APITestCase):
+    """Jatuh tempo, daftar /api/peminjaman/overdue/ dan snapshot harian dashboard"""
+
+    def setUp(self):
+        cache.clear()
+        self.anggota = Anggota.objects.create(nama='Sari', email='sari@mail.com')
+        self.hari_ini = timezone.localdate()
+
+    def pinjam(self, hari_lalu, status='aktif', **kwargs):
+        buku = Buku.objects.create(judul=f'Buku {hari_lalu}', penulis='Penulis', tahun=2020)
+        return Peminjaman.objects.create(
+            buku=buku, anggota=self.anggota, status_peminjaman=status,
+            tanggal_pinjam=self.hari_ini - timedelta(days=hari_lalu), **kwargs,
+        )
+
+    def test_jatuh_tempo_default_dari_kebijakan(self):
+        self.assertEqual(self.pinjam(0).jatuh_tempo, self.hari_ini + timedelta(days=14))
+        with self.settings(LAMA_PINJAM_HARI=7):
+            self.assertEqual(self.pinjam(1).jatuh_tempo, self.hari_ini + timedelta(days=6))
+        tempo = self.hari_ini + timedelta(days=30)
+        self.assertEqual(self.pinjam(2, jatuh_tempo=tempo).jatuh_tempo, tempo)
+
+    def test_daftar_terlambat(self):
+        lama = self.pinjam(40)
+        baru = self.pinjam(20)
+        self.pinjam(14)  # jatuh tempo hari ini: belum terlambat
+        self.pinjam(60, status='selesai')
+
+        response = self.client.get(reverse('peminjaman-overdue'))
+        self.assertEqual([p['id'] for p in response.data['results']], [lama.pk, baru.pk])
+        self.assertEqual(response.data['results'][0]['jatuh_tempo'], (self.hari_ini - timedelta(days=26)).isoformat())
+
+        response = self.client.get(reverse('peminjaman-overdue'), {'page_size': 1})
+        response = self.client.get(response.data['next'])
+        self.assertEqual([p['id'] for p in response.data['results']], [baru.pk])
+
+    def test_snapshot_dashboard(self):
+        self.pinjam(30)
+        self.pinjam(20)
+        self.pinjam(1)
+
+        out = StringIO()
+        call_command('snapshot_terlambat', stdout=out)
+        self.assertIn(f'2 peminjaman terlambat per {self.hari_ini.isoformat()}', out.getvalue())
+        with self.assertNumQueries(1):
+            data = self.client.get(reverse('api-dashboard')).data
+        self.assertEqual((data['total_terlambat'], data['terlambat_per']), (2, self.hari_ini.isoformat()))
+
+        besok = (self.hari_ini + timedelta(days=20)).isoformat()
+        call_command('snapshot_terlambat', tanggal=besok, stdout=StringIO())
+        self.assertEqual(self.client.get(reverse('api-dashboard')).data['total_terlambat'], 3)
+        self.assertContains(self.client.get(reverse('dashboard')), 'peminjaman lewat jatuh tempo')
+
+    def test_pinjam_massal_mengisi_jatuh_tempo(self):
+        self.client.force_authenticate(User.objects.create_user(username='petugas', password='rahasia123'))
+        buku = Buku.objects.create(judul='A', penulis='B', tahun=2000)
+        response = self.client.post(reverse('peminjaman-pinjam-massal'), {'items': [
+            {'buku': buku.pk, 'anggota': self.anggota.pk, 'tanggal_pinjam': '2025-06-01'},
+        ]}, format='json')
+        self.assertEqual(response.data['results'][0]['data']['jatuh_tempo'], '2025-06-15')
+
+
+class RekapAnalitikTest(APITestCase):
+    """Tabel rekap dirawat inkremental dan laporan analitik hanya membaca rentang tanggal"""
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(User.objects.create_user(username='petugas', password='rahasia123'))
+        self.anggota = [Anggota.objects.create(nama=n, email=f'{n}@mail.com') for n in ('sari', 'budi')]
+        self.buku = [Buku.objects.create(judul=f'Buku {i}', penulis='Penulis', tahun=2020) for i in range(4)]
+
+    def isi_rekap(self):
+        # Baris bernilai 0 (sumbangannya sudah dikurangi) sama dengan tidak ada
+        return (
+            sorted(RekapHarian.objects.exclude(dipinjam=0, dikembalikan=0).values_list('tanggal', 'dipinjam', 'dikembalikan')),
+            sorted(RekapBukuHarian.objects.exclude(dipinjam=0).values_list('tanggal', 'buku_id', 'dipinjam')),
+            sorted(RekapAnggotaHarian.objects.exclude(dipinjam=0).values_list('tanggal', 'anggota_id', 'dipinjam')),
+        )
+
+    def assertRekapSesuai(self):
+        inkremental = self.isi_rekap()
+        rollups.bangun_ulang()
+        self.assertEqual(inkremental, self.isi_rekap())
+
+    def pinjam(self, buku, anggota, tanggal):
+        return Peminjaman.objects.create(buku=buku, anggota=anggota, tanggal_pinjam=tanggal)
+
+    def test_perubahan_per_baris(self):
+        p1 = self.pinjam(self.buku[0], self.anggota[0], date(2025, 1, 1))
+        p2 = self.pinjam(self.buku[1], self.anggota[0], date(2025, 1, 1))
+        self.pinjam(self.buku[2], self.anggota[1], date(2025, 1, 3))
+
+        self.client.post(reverse('api-kembalikan', args=[p1.pk]))
+        self.client.patch(reverse('peminjaman-detail', args=[p2.pk]), {'anggota': self.anggota[1].pk, 'tanggal_pinjam': '2025-01-02'})
+        self.assertRekapSesuai()
+
+        # Objek yang tidak dimuat dari database tetap dihitung dari nilai lamanya
+        Peminjaman(pk=p2.pk, buku=self.buku[3], anggota=self.anggota[0], tanggal_pinjam=date(2025, 1, 5),
+                   jatuh_tempo=date(2025, 1, 19)).save(force_update=True)
+        self.assertRekapSesuai()
+
+        self.buku[2].delete()
+        self.client.delete(reverse('peminjaman-detail', args=[p1.pk]))
+        self.assertRekapSesuai()
+        self.assertEqual(RekapHarian.objects.get(tanggal=date(2025, 1, 5)).dipinjam, 1)
+
+    def test_operasi_massal(self):
+        response = self.client.post(reverse('peminjaman-pinjam-massal'), {'items': [
+            {'buku': b.pk, 'anggota': self.anggota[i % 2].pk, 'tanggal_pinjam': f'2025-02-0{i + 1}'}
+            for i, b in enumerate(self.buku)
+        ]}, format='json')
+        ids = [item['data']['id'] for item in response.data['results']]
+        self.client.post(reverse('peminjaman-kembalikan-massal'), {'ids': ids[:3]}, format='json')
+        self.assertRekapSesuai()
+        self.assertEqual(RekapHarian.objects.get(tanggal=timezone.localdate()).dikembalikan, 3)
+
+    def test_laporan(self):
+        self.client.force_authenticate(None)
+        for i, tanggal in enumerate([date(2025, 1, 30), date(2025, 1, 31), date(2025, 2, 1)]):
+            self.pinjam(self.buku[i], self.anggota[0], tanggal)
+        p = Peminjaman.objects.get(buku=self.buku[0])
+        p.status_peminjaman, p.tanggal_kembali = 'selesai', date(2025, 2, 3)
+        p.save()
+        self.pinjam(self.buku[0], self.anggota[1], date(2025, 2, 3))
+
+        rentang = {'dari': '2025-01-31', 'sampai': '2025-02-03'}
+        response = self.client.get(reverse('api-analitik-peminjaman'), rentang)
+        self.assertEqual(
+            [(r['periode'], r['dipinjam'], r['dikembalikan']) for r in response.data['results']],
+            [('2025-01-31', 1, 0), ('2025-02-01', 1, 0), ('2025-02-02', 0, 0), ('2025-02-03', 1, 1)],
+        )
+        response = self.client.get(reverse('api-analitik-peminjaman'), {'dari': '2025-01-01', 'per': 'bulan'})
+        self.assertEqual(
+            [(r['periode'], r['dipinjam']) for r in response.data['results'][:2]],
+            [('2025-01-01', 2), ('2025-02-01', 2)],
+        )
+
+        response = self.client.get(reverse('api-analitik-buku'), {'dari': '2025-01-01', 'sampai': '2025-02-28'})
+        self.assertEqual(response.data['results'][0], {
+            'buku': self.buku[0].pk, 'judul': 'Buku 0', 'penulis': 'Penulis', 'total_dipinjam': 2,
+        })
+        response = self.client.get(reverse('api-analitik-anggota'), dict(rentang, limit=1))
+        self.assertEqual(response.data['results'], [{'anggota': self.anggota[0].pk, 'nama': 'sari', 'total_dipinjam': 2}])
+
+        response = self.client.get(reverse('api-analitik-buku'), {'dari': '2025-03-01', 'sampai': '2025-02-01'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_biaya_tergantung_rentang(self):
+        for i, b in enumerate(self.buku):
+            self.pinjam(b, self.anggota[0], date(2020, 1, 1 + i))
+        rentang = {'dari': '2025-01-01', 'sampai': '2025-01-31'}
+        for nama in ('api-analitik-peminjaman', 'api-analitik-buku', 'api-analitik-anggota'):
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get(reverse(nama), rentang)
+            self.assertEqual(len(queries), 2, nama)  # versi (ETag) + rekap
+            self.assertNotIn(Peminjaman._meta.db_table + '"', queries[-1]['sql'], nama)
+            with connection.cursor() as cursor:
+                cursor.execute('EXPLAIN QUERY PLAN ' + queries[-1]['sql'])
+                rencana = [baris[-1] for baris in cursor.fetchall()]
+            self.assertTrue(rencana[0].startswith('SEARCH'), rencana)
+
+
+class ArsipPeminjamanTest(APITestCase):
+    """Peminjaman selesai yang lama dipindah ke arsip; riwayat & ekspor membaca kedua tabel"""
+
+    def setUp(self):
+        cache.clear()
+        self.anggota = Anggota.objects.create(nama='sari', email='sari@mail.com')
+        self.buku = [Buku.objects.create(judul=f'Buku {i}', penulis='Penulis', tahun=2020) for i in range(5)]
+        self.lama = [
+            Peminjaman.objects.create(
+                buku=b, anggota=self.anggota, tanggal_pinjam=date(2023, 1, 1 + i),
+                tanggal_kembali=date(2023, 1, 10), status_peminjaman='selesai',
+            )
+            for i, b in enumerate(self.buku[:3])
+        ]
+        self.baru = [
+            Peminjaman.objects.create(
+                buku=self.buku[3], anggota=self.anggota, tanggal_pinjam=date(2023, 1, 2),
+                tanggal_kembali=date(2025, 6, 1), status_peminjaman='selesai',
+            ),
+            Peminjaman.objects.create(buku=self.buku[4], anggota=self.anggota, tanggal_pinjam=date(2022, 1, 1)),
+        ]
+        # Urutan riwayat: -tanggal_pinjam, -id
+        self.urutan = [self.lama[2].pk, self.baru[0].pk, self.lama[1].pk, self.lama[0].pk, self.baru[1].pk]
+
+    def test_arsipkan(self):
+        dashboard = counters.data_dashboard()
+        rekap = list(RekapHarian.objects.order_by('tanggal').values_list('tanggal', 'dipinjam', 'dikembalikan'))
+
+        out = StringIO()
+        call_command('archive_loans', hari=(timezone.localdate() - date(2024, 1, 1)).days, batch_size=2, stdout=out)
+        self.assertIn('3 peminjaman', out.getvalue())
+        self.assertEqual(sorted(PeminjamanArsip.objects.values_list('pk', flat=True)), [p.pk for p in self.lama])
+        self.assertEqual(
+            sorted(Peminjaman.objects.values_list('pk', flat=True)), sorted(p.pk for p in self.baru)
+        )
+        self.assertEqual(arsip.arsipkan(date(2024, 1, 1)), 0)
+
+        # Gabungan kedua tabel tidak berubah: dashboard & rekap tetap sama
+        self.assertEqual(counters.data_dashboard(), dashboard)
+        self.assertEqual(counters.rekonsiliasi()[1], {})
+        rollups.bangun_ulang()
+        self.assertEqual(
+            list(RekapHarian.objects.order_by('tanggal').values_list('tanggal', 'dipinjam', 'dikembalikan')), rekap
+        )
+
+        # Arsip ikut terhapus bersama bukunya
+        self.buku[0].delete()
+        self.assertEqual(counters.rekonsiliasi()[1], {})
+
+    def test_batch_keyset_tanpa_sort_ulang(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(arsip.arsipkan(date(2024, 1, 1), ukuran_batch=2), 3)
+        pilih = [q['sql'] for q in queries if q['sql'].startswith('SELECT') and 'status_peminjaman' in q['sql']]
+        self.assertEqual(len(pilih), 3)
+        for sql in pilih:
+            with connection.cursor() as cursor:
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+                rencana = [baris[-1] for baris in cursor.fetchall()]
+            self.assertNotIn('USE TEMP B-TREE FOR ORDER BY', rencana, sql)
+            self.assertIn('peminjaman_status_id_idx', rencana[0], sql)
+
+    def test_impor_id_yang_sudah_diarsipkan(self):
+        arsip.arsipkan(date(2024, 1, 1))
+        lama = self.lama[0]
+        baris = [(1, {
+            'id': lama.pk, 'buku': lama.buku_id, 'anggota': lama.anggota_id,
+            'tanggal_pinjam': '2023-01-01', 'tanggal_kembali': '2023-01-10', 'status_peminjaman': 'selesai',
+        })]
+        for on_duplicate, hasil in [('error', 'error'), ('update', 'error'), ('skip', 'dilewati')]:
+            importer = Importer('peminjaman', on_duplicate=on_duplicate)
+            statistik = importer.jalankan(baris)
+            self.assertEqual((statistik[hasil], statistik['dibuat'], statistik['diperbarui']), (1, 0, 0))
+        self.assertEqual(importer.errors, [])
+        self.assertFalse(Peminjaman.objects.filter(pk=lama.pk).exists())
+        self.assertEqual(self.client.get(reverse('anggota-detail', args=[self.anggota.pk])).data['total_peminjaman'], 5)
+
+    def test_riwayat_dan_ekspor_membaca_arsip(self):
+        arsip.arsipkan(date(2024, 1, 1))
+        url = reverse('anggota-riwayat', args=[self.anggota.pk])
+        ids, response = [], self.client.get(url, {'page_size': 2, 'expand': 'anggota'})
+        self.assertEqual(response.data['results'][0]['anggota_detail']['total_peminjaman'], 5)
+        response_async = self.client.get(
+            reverse('api-async-anggota-riwayat', args=[self.anggota.pk]), {'page_size': 2, 'expand': 'anggota'}
+        )
+        self.assertEqual(response_async.json()['results'], json.loads(response.content)['results'])
+        while True:
+            ids += [r['id'] for r in response.data['results']]
+            if not response.data['next']:
+                break
+            response = self.client.get(response.data['next'])
+        self.assertEqual(ids, self.urutan)
+        # Kembali ke halaman sebelumnya lewat cursor terbalik
+        response = self.client.get(response.data['previous'])
+        self.assertEqual([r['id'] for r in response.data['results']], self.urutan[2:4])
+
+        self.assertEqual(self.client.get(reverse('anggota-detail', args=[self.anggota.pk])).data['total_peminjaman'], 5)
+        self.assertEqual(AnggotaSerializer(self.anggota).data['total_peminjaman'], 5)
+
+        response = self.client.get(reverse('anggota-riwayat-export', args=[self.anggota.pk]), {'format': 'ndjson'})
+        baris = [json.loads(b) for b in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual([b['id'] for b in baris], self.urutan)
+        response = self.client.get(reverse('peminjaman-export'), {'format': 'ndjson', 'status': 'selesai'})
+        self.assertEqual(len(b''.join(response.streaming_content).splitlines()), 4)
+
+        response = self.client.get(reverse('riwayat-peminjaman', args=[self.anggota.pk]))
+        self.assertEqual([p.pk for p in response.context['riwayat_list']], self.urutan)
+        self.assertContains(response, 'Buku 0')
+        self.assertEqual(response.context['paginator'].count, 5)
+        # Daftar peminjaman (tabel aktif saja) tidak ikut menghitung arsip
+        response = self.client.get(reverse('daftar-peminjaman'))
+        self.assertEqual(response.context['paginator'].count, 2)
+
+
+class LogPerubahanTest(APITestCase):
+    """/api/changes/ hanya mengirim objek yang berubah sejak `since`"""
+
+    def setUp(self):
+        self.client.force_authenticate(User.objects.create_user(username='petugas', password='rahasia123'))
+        self.seq = self.client.get(reverse('api-changes')).data['seq']
+
+    def perubahan(self, **params):
+        response = self.client.get(reverse('api-changes'), {'since': self.seq, **params})
+        self.assertEqual(response.status_code, 200)
+        self.seq = response.data['seq']
+        return [(r['model'], r['id'], r['aksi']) for r in response.data['results']], response.data
+
+    def test_crud_dan_peminjaman(self):
+        buku = self.client.post(reverse('buku-list'), {'judul': 'Laskar', 'penulis': 'Andrea', 'tahun': 2005}).data
+        anggota = self.client.post(reverse('anggota-list'), {'nama': 'sari', 'email': 'sari@mail.com'}).data
+        hasil, data = self.perubahan()
+        self.assertEqual(hasil, [('buku', buku['id'], 'buat'), ('anggota', anggota['id'], 'buat')])
+        self.assertEqual(data['results'][0]['data'], buku)
+        self.assertEqual(self.perubahan()[0], [])
+
+        self.client.post(reverse('peminjaman-list'), {
+            'buku': buku['id'], 'anggota': anggota['id'], 'tanggal_pinjam': '2025-01-01',
+        })
+        p = Peminjaman.objects.get()
+        self.client.post(reverse('api-kembalikan', args=[p.pk]))
+        hasil, data = self.perubahan()
+        # Satu entri per objek dengan keadaan terbarunya; buku & anggota ikut (is_available, total_peminjaman)
+        self.assertEqual(sorted(hasil), [
+            ('anggota', anggota['id'], 'ubah'), ('buku', buku['id'], 'ubah'), ('peminjaman', p.pk, 'ubah'),
+        ])
+        item = {r['model']: r['data'] for r in data['results']}
+        self.assertEqual(item['peminjaman']['status_peminjaman'], 'selesai')
+        self.assertNotIn('buku_detail', item['peminjaman'])
+        self.assertEqual(item['buku']['is_available'], True)
+        self.assertEqual(item['anggota']['total_peminjaman'], 1)
+
+        self.client.patch(reverse('buku-detail', args=[buku['id']]), {'judul': 'Laskar Pelangi'})
+        self.client.delete(reverse('anggota-detail', args=[anggota['id']]))
+        hasil, _ = self.perubahan()
+        self.assertEqual(sorted(hasil), [
+            ('anggota', anggota['id'], 'hapus'), ('buku', buku['id'], 'ubah'), ('peminjaman', p.pk, 'hapus'),
+        ])
+
+    def test_batas_dan_massal(self):
+        buku = [Buku.objects.create(judul=f'Buku {i}', penulis='Penulis', tahun=2020) for i in range(5)]
+        anggota = Anggota.objects.create(nama='budi', email='budi@mail.com')
+        self.client.post(reverse('peminjaman-pinjam-massal'), {'items': [
+            {'buku': b.pk, 'anggota': anggota.pk, 'tanggal_pinjam': '2025-02-01'} for b in buku
+        ]}, format='json')
+
+        with self.assertNumQueries(5):  # batas + log + buku + anggota + peminjaman
+            self.client.get(reverse('api-changes'), {'since': self.seq})
+
+        semua, data = self.perubahan(limit=4)
+        self.assertTrue(data['ada_lanjutan'])
+        while data['ada_lanjutan']:
+            hasil, data = self.perubahan(limit=4)
+            semua += hasil
+        self.assertEqual(len([h for h in semua if h[0] == 'peminjaman' and h[2] == 'buat']), 5)
+
+        # Impor massal tidak dicatat per objek, klien diminta memuat ulang daftarnya
+        folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, folder)
+        path = os.path.join(folder, 'peminjaman.csv')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(f'buku,anggota,tanggal_pinjam,status_peminjaman\n{buku[0].pk},{anggota.pk},2024-01-01,selesai\n')
+        call_command('import_data', 'peminjaman', path, stdout=StringIO(), stderr=StringIO())
+        self.assertEqual(self.perubahan()[0], [
+            ('peminjaman', None, 'reset'), ('buku', None, 'reset'), ('anggota', None, 'reset'),
+        ])
+
+    def test_pemadatan(self):
+        buku = Buku.objects.create(judul='Lama', penulis='Penulis', tahun=2020)
+        for tahun in (2021, 2022):
+            buku.tahun = tahun
+            buku.save()
+        Perubahan.objects.update(waktu=timezone.now() - timedelta(days=30))
+        lama = self.seq
+        Buku.objects.create(judul='Baru', penulis='Penulis', tahun=2024)
+        buku.save()
+
+        call_command('compact_changes', stdout=StringIO())
+        # Entri retensi lama dibuang, entri yang digantikan juga
+        self.assertEqual(Perubahan.objects.count(), 2)
+        response = self.client.get(reverse('api-changes'), {'since': lama})
+        self.assertTrue(response.data['reset'])
+        self.assertEqual(response.data['seq'], changes.seq_terakhir())
+        self.seq = response.data['seq']
+        self.assertEqual(self.perubahan()[0], [])
+
+    def test_rollback_tidak_dicatat(self):
+        buku = Buku.objects.create(judul='A', penulis='B', tahun=2020)
+        anggota = Anggota.objects.create(nama='c', email='c@mail.com')
+        Peminjaman.objects.create(buku=buku, anggota=anggota, tanggal_pinjam=date(2025, 1, 1))
+        self.perubahan()
+        # Entri log ditulis di transaksi yang sama dengan penyimpanannya
+        with self.assertRaises(BukuSedangDipinjam):
+            Peminjaman.objects.create(buku=buku, anggota=anggota, tanggal_pinjam=date(2025, 1, 2))
+        self.assertEqual(self.perubahan()[0], [])
+
+
+def baca_sse(potongan):
+    """[(event, data), ...] dari potongan stream SSE (komentar & blok tanpa data dilewati)"""
+    hasil = []
+    for blok in potongan.decode().split('\n\n'):
+        field = dict(baris.split(': ', 1) for baris in blok.splitlines() if not baris.startswith(':'))
+        if 'data' in field:
+            hasil.append((field['event'], json.loads(field['data'])))
+    return hasil
+
+
+class StreamSSETest(TestCase):
+    """/api/stream/ mengirim perubahan dashboard & peminjaman dari satu pemantau bersama"""
+
+    def setUp(self):
+        self.anggota = buat_data_peminjaman(2)
+
+    async def berikutnya(self, isi):
+        return await asyncio.wait_for(anext(isi), 5)
+
+    async def tutup(self, *isi):
+        # Klien putus: handler ASGI membatalkan task yang sedang menunggu event berikutnya
+        for i in isi:
+            menunggu = asyncio.ensure_future(anext(i))
+            await asyncio.sleep(0.01)
+            menunggu.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await menunggu
+        # Pemantau berhenti sendiri setelah klien terakhir putus
+        for _ in range(100):
+            if not events.hub.pelanggan and events.hub._tugas is None:
+                break
+            await asyncio.sleep(0.01)
+        self.assertEqual(events.hub.pelanggan, set())
+
+    async def test_dashboard_dan_peminjaman(self):
+        response = await self.async_client.get(reverse('api-stream'))
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertEqual(response['Cache-Control'], 'no-cache')
+        isi = aiter(response.streaming_content)
+        awal = await self.berikutnya(isi)
+        self.assertIn(b'retry: 3000\nid: ', awal)
+        [(event, dashboard)] = baca_sse(awal)
+        self.assertEqual((event, dashboard['total_buku'], dashboard['total_dipinjam']), ('dashboard', 2, 1))
+
+        buku = await Buku.objects.acreate(judul='Baru', penulis='Penulis', tahun=2021)
+        p = await Peminjaman.objects.acreate(buku=buku, anggota=self.anggota, tanggal_pinjam=date(2025, 2, 1))
+        # Di TestCase on_commit tidak pernah jalan, jadi bangunkan pemantau langsung
+        events.hub.bangunkan()
+        [(_, dashboard)] = baca_sse(await self.berikutnya(isi))
+        self.assertEqual((dashboard['total_buku'], dashboard['total_dipinjam']), (3, 2))
+        dipinjam = await self.berikutnya(isi)
+        [(event, data)] = baca_sse(dipinjam)
+        self.assertEqual((event, data['aksi'], data['id']), ('peminjaman', 'buat', p.pk))
+
+        p.status_peminjaman = 'selesai'
+        await p.asave()
+        events.hub.bangunkan()
+        [(_, dashboard)] = baca_sse(await self.berikutnya(isi))
+        self.assertEqual((dashboard['total_dipinjam'], dashboard['total_selesai']), (1, 2))
+        [(event, kembali)] = baca_sse(await self.berikutnya(isi))
+        self.assertEqual((event, kembali['aksi'], kembali['data']['status_peminjaman']), ('peminjaman', 'ubah', 'selesai'))
+
+        # Sambung ulang dengan Last-Event-ID: event yang terlewat dikirim ulang dari log
+        last_id = dipinjam.decode().split('id: ')[1].split('\n')[0]
+        ulang = await self.async_client.get(reverse('api-stream'), headers={'last-event-id': last_id})
+        isi_ulang = aiter(ulang.streaming_content)
+        self.assertEqual(
+            [(e, d.get('aksi')) for e, d in baca_sse(await self.berikutnya(isi_ulang))],
+            [('dashboard', None), ('peminjaman', 'ubah')],
+        )
+        await self.tutup(isi, isi_ulang)
+
+    async def test_query_pemantau_tidak_tercatat_di_request_pelanggan(self):
+        metrics.registry.reset()
+        # Request ini menyalakan pemantau, lalu pemantau membaca beberapa siklus
+        response = await self.async_client.get(reverse('api-stream'))
+        isi = aiter(response.streaming_content)
+        await self.berikutnya(isi)
+
+        buku = await Buku.objects.acreate(judul='Baru', penulis='Penulis', tahun=2021)
+        await Peminjaman.objects.acreate(buku=buku, anggota=self.anggota, tanggal_pinjam=date(2025, 2, 1))
+        events.hub.bangunkan()
+        self.assertEqual([baca_sse(await self.berikutnya(isi))[0][0] for _ in range(2)], ['dashboard', 'peminjaman'])
+        await self.tutup(isi)
+        teks = metrics.registry.render()
+        self.assertIn('iventaris_http_requests_total{route="api-stream",method="GET",status="200"} 1', teks)
+        self.assertIn('iventaris_db_queries_per_request_sum{route="api-stream",method="GET"} 0', teks)
+
+    async def test_backpressure_dan_batas_koneksi(self):
+        with self.settings(SSE_ANTRIAN=2):
+            lambat = events.hub.berlangganan()
+            cepat = events.hub.berlangganan()
+            for _ in range(3):
+                events.hub.siarkan(events.PING)
+                await cepat.antrian.get()
+        # Klien lambat tidak menahan yang lain: antriannya dibuang dan stream-nya ditutup
+        self.assertTrue(lambat.tertinggal)
+        self.assertFalse(cepat.tertinggal)
+        self.assertEqual([x async for x in events.alirkan(lambat, b'awal')], [b'awal'])
+        self.assertNotIn(lambat, events.hub.pelanggan)
+
+        with self.settings(SSE_MAKS_KLIEN=1):
+            self.assertEqual((await self.async_client.get(reverse('api-stream'))).status_code, 503)
+        events.hub.berhenti(cepat)
+        await self.tutup()
+
+    def test_hanya_asgi(self):
+        self.assertEqual(self.client.get(reverse('api-stream')).status_code, 501)
 
-# Create your tests here.
@@ -0,0 +1,126 @@
+"""
+Throttling token bucket untuk endpoint yang mahal di CPU (login, register).
+
+Setiap pemanggilan menjalankan hashing password PBKDF2, jadi burst request
+anonim bisa menghabiskan worker. Throttle di sini dicek di APIView.initial(),
+sebelum serializer (dan hashing) dijalankan, dan menjawab 429 + Retry-After.
+
+Rate diatur per route lewat `throttle_scope` di view dan
+REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'], mis. 'login.ip': '20/min' berarti
+bucket berisi maksimal 20 token yang terisi kembali 20 per menit. Scope
+tanpa rate tidak dibatasi. State bucket disimpan di cache `keamanan` (tidak
+menggusur entri yang masih berlaku) dan hilang sendiri setelah bucket penuh
+kembali. Baca-ubah-tulis bucket dijaga kunci `cache.add` (atomik, juga antar
+proses dengan Redis) agar request paralel tidak memakai token yang sama.
+"""
+import hashlib
+import math
+import time
+
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+from .cache_backends import keamanan
+
+
+DURASI = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate):
+    """'20/min' -> (20, 60), format sama dengan rate throttle DRF"""
+    jumlah, periode = rate.split('/')
+    return int(jumlah), DURASI[periode[0]]
+
+
+# Kunci bucket: umur (detik) agar tidak tertahan jika proses mati di tengah,
+# dan berapa kali mencoba sebelum request dianggap kehabisan token
+KUNCI_TIMEOUT = 2
+KUNCI_PERCOBAAN = 20
+KUNCI_JEDA = 0.005
+
+
+def ambil_token(kunci, kapasitas, per_detik, sekarang=None):
+    """
+    Ambil satu token dari bucket `kunci`. Mengembalikan 0 jika berhasil,
+    atau jumlah detik sampai token berikutnya tersedia.
+    """
+    cache = keamanan()
+    kunci_bucket = f'{kunci}:kunci'
+    for _ in range(KUNCI_PERCOBAAN):
+        if cache.add(kunci_bucket, 1, timeout=KUNCI_TIMEOUT):
+            break
+        time.sleep(KUNCI_JEDA)
+    else:
+        # Bucket yang sama terus dipakai bersamaan: tolak (gagal tertutup)
+        return 1 / per_detik
+    try:
+        sekarang = time.time() if sekarang is None else sekarang
+        isi = cache.get(kunci)
+        token, waktu = isi if isi else (kapasitas, sekarang)
+        token = min(kapasitas, token + max(0.0, sekarang - waktu) * per_detik)
+        if token < 1:
+            return (1 - token) / per_detik
+        # Entri yang tidak ada = bucket penuh, jadi cukup disimpan sampai penuh lagi
+        cache.set(kunci, (token - 1, sekarang), timeout=math.ceil((kapasitas - token + 1) / per_detik) + 1)
+        return 0
+    finally:
+        cache.delete(kunci_bucket)
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """Bucket per `scope` view; subclass menentukan identitas pemilik bucket"""
+    jenis = None
+    cache_format = 'throttle:%(scope)s:%(ident)s'
+
+    def __init__(self):
+        self.tunggu = None
+
+    def get_ident_bucket(self, request):
+        raise NotImplementedError
+
+    def allow_request(self, request, view):
+        scope = getattr(view, 'throttle_scope', None)
+        if not scope:
+            return True
+        scope = f'{scope}.{self.jenis}'
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(scope)
+        if rate is None:
+            return True
+        ident = self.get_ident_bucket(request)
+        if ident is None:
+            return True
+
+        jumlah, durasi = parse_rate(rate)
+        kunci = self.cache_format % {'scope': scope, 'ident': ident}
+        self.tunggu = ambil_token(kunci, jumlah, jumlah / durasi)
+        return not self.tunggu
+
+    def wait(self):
+        return self.tunggu
+
+
+class IPTokenBucketThrottle(TokenBucketThrottle):
+    """Satu bucket per alamat IP klien"""
+    jenis = 'ip'
+
+    def get_ident_bucket(self, request):
+        # Tanpa NUM_PROXIES, X-Forwarded-For diisi klien sendiri: tiap nilai
+        # palsu akan mendapat bucket baru
+        if api_settings.NUM_PROXIES is None:
+            return request.META.get('REMOTE_ADDR')
+        return self.get_ident(request)
+
+
+class UsernameTokenBucketThrottle(TokenBucketThrottle):
+    """
+    Satu bucket per username yang dicoba, sehingga tebakan password ke satu
+    akun tetap dibatasi walau datang dari banyak IP.
+    """
+    jenis = 'username'
+
+    def get_ident_bucket(self, request):
+        username = request.data.get('username') if hasattr(request.data, 'get') else None
+        if not isinstance(username, str) or not username.strip():
+            return None
+        # Di-hash: username bebas isinya, kunci cache harus aman
+        return hashlib.md5(username.strip().lower().encode()).hexdigest()
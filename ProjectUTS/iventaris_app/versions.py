@@ -0,0 +1,186 @@
+"""
+Versi per model untuk ETag / conditional GET.
+
+Setiap penulisan Buku, Anggota atau Peminjaman menaikkan versi model tersebut
+(lihat signals.py). Nilai versi adalah waktu perubahan terakhir dalam
+mikrodetik yang dijamin selalu naik, sehingga sekaligus dipakai sebagai
+Last-Modified. View yang dibungkus `kondisional()` membaca versi dalam satu
+query dan menjawab 304 sebelum queryset atau serializer dijalankan.
+"""
+import hashlib
+import time
+from datetime import datetime
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils import timezone
+from django.utils.http import http_date, urlencode
+from rest_framework.response import Response
+
+from .models import Anggota, Buku, Peminjaman, PeminjamanArsip, Penghitung
+
+
+BUKU = 'buku'
+ANGGOTA = 'anggota'
+PEMINJAMAN = 'peminjaman'
+
+PER_MODEL = {
+    Buku: BUKU,
+    Anggota: ANGGOTA,
+    Peminjaman: PEMINJAMAN,
+    # Arsip dibaca bersama tabel aktif (riwayat, ekspor), jadi satu versi
+    PeminjamanArsip: PEMINJAMAN,
+}
+
+
+def kunci(nama):
+    return f'versi.{nama}'
+
+
+def naikkan(*nama, using=None):
+    """Naikkan versi model `nama` (dipanggil di transaksi penulisan, di database `using`)"""
+    sekarang = Value(time.time_ns() // 1000)
+    baris = Penghitung.objects.using(using).filter(nama__in=[kunci(n) for n in nama])
+    if baris.update(nilai=Greatest(F('nilai') + 1, sekarang)) < len(nama):
+        Penghitung.objects.using(using).bulk_create(
+            [Penghitung(nama=kunci(n), nilai=0) for n in nama], ignore_conflicts=True
+        )
+        baris.update(nilai=Greatest(F('nilai') + 1, sekarang))
+
+
+def baca(*nama):
+    """Versi model `nama` dalam satu query (0 jika belum pernah ditulis)"""
+    nilai = dict(
+        Penghitung.objects.filter(nama__in=[kunci(n) for n in nama]).values_list('nama', 'nilai')
+    )
+    return {n: nilai.get(kunci(n), 0) for n in nama}
+
+
+async def abaca(*nama):
+    """Versi async dari `baca()` untuk view ASGI"""
+    nilai = {
+        k: v async for k, v in
+        Penghitung.objects.filter(nama__in=[kunci(n) for n in nama]).values_list('nama', 'nilai')
+    }
+    return {n: nilai.get(kunci(n), 0) for n in nama}
+
+
+def _etag(request, versi):
+    # Representasi juga bergantung pada URL (filter, cursor) dan Accept.
+    # Urutan query param dinormalisasi: ?a=1&b=2 sama dengan ?b=2&a=1
+    query = urlencode(sorted(request.GET.lists()), doseq=True)
+    isi = '|'.join(
+        [request.path, query, request.META.get('HTTP_ACCEPT', '')]
+        + [f'{n}:{v}' for n, v in sorted(versi.items())]
+    )
+    return '"%s"' % hashlib.md5(isi.encode()).hexdigest()
+
+
+def _dari_cache(request, etag, buat_respons):
+    """
+    Cache `response.data` untuk request anonim. Kunci = ETag, yang sudah
+    memuat path, query param dan versi model, jadi penulisan otomatis
+    membuat kunci baru tanpa perlu menghapus kunci lama (kedaluwarsa sendiri).
+    """
+    if request.method not in ('GET', 'HEAD') or request.user.is_authenticated:
+        return buat_respons
+    kunci_cache = 'respons:' + etag.strip('"')
+
+    def buat():
+        data = cache.get(kunci_cache)
+        if data is not None:
+            return Response(data)
+        response = buat_respons()
+        if response.status_code == 200 and isinstance(response, Response):
+            cache.set(kunci_cache, response.data, getattr(settings, 'API_CACHE_TIMEOUT', 300))
+        return response
+    return buat
+
+
+def _tandai(response, etag, terakhir):
+    if response.status_code in (200, 304):
+        response['ETag'] = etag
+        if terakhir:
+            response['Last-Modified'] = http_date(terakhir)
+        # Selalu validasi ulang ke server, jangan pakai heuristik cache browser
+        patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def _terakhir(versi):
+    return max(versi.values()) // 1_000_000 or None
+
+
+def _harian(versi):
+    """
+    Untuk respons yang isinya juga bergantung pada tanggal hari ini (mis.
+    peminjaman terlambat, rentang default "30 hari terakhir"): tanggal ikut
+    ETag dan Last-Modified minimal awal hari ini.
+    """
+    hari_ini = timezone.localdate()
+    awal_hari = datetime.combine(hari_ini, datetime.min.time(), tzinfo=timezone.get_current_timezone())
+    terakhir = max(_terakhir(versi) or 0, int(awal_hari.timestamp()))
+    return dict(versi, tanggal=hari_ini.toordinal()), terakhir
+
+
+def respons_kondisional(request, versi, buat_respons, terakhir=None):
+    """
+    Jawab 304 jika If-None-Match / If-Modified-Since klien masih cocok dengan
+    `versi`; selain itu panggil `buat_respons()`. ETag juga bergantung pada
+    URL (filter, cursor) dan header Accept.
+    """
+    etag = _etag(request, versi)
+    response = get_conditional_response(request, etag=etag, last_modified=terakhir)
+    if response is None:
+        response = buat_respons()
+    return _tandai(response, etag, terakhir)
+
+
+async def arespons_kondisional(request, versi, buat_respons, terakhir=None):
+    """Seperti `respons_kondisional()`, dengan `buat_respons()` berupa coroutine"""
+    etag = _etag(request, versi)
+    response = get_conditional_response(request, etag=etag, last_modified=terakhir)
+    if response is None:
+        response = await buat_respons()
+    return _tandai(response, etag, terakhir)
+
+
+def kondisional(*nama, cache_anonim=False, harian=False):
+    """
+    Decorator view GET: ETag & Last-Modified dari versi model `nama`
+    (semua model yang isinya ikut tampil di respons). Bisa dipakai untuk
+    view sync maupun async. Dengan `cache_anonim`, data respons view DRF
+    untuk request anonim disimpan di cache per ETag. Dengan `harian`,
+    respons juga berganti setiap tanggal berganti.
+    """
+    def siapkan(versi):
+        return _harian(versi) if harian else (versi, _terakhir(versi))
+
+    def decorator(view_func):
+        if iscoroutinefunction(view_func):
+            @wraps(view_func)
+            async def awrapper(request, *args, **kwargs):
+                versi, terakhir = siapkan(await abaca(*nama))
+                return await arespons_kondisional(
+                    request, versi, lambda: view_func(request, *args, **kwargs), terakhir=terakhir,
+                )
+            return awrapper
+
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            versi, terakhir = siapkan(baca(*nama))
+
+            def buat_respons():
+                return view_func(request, *args, **kwargs)
+
+            if cache_anonim:
+                buat_respons = _dari_cache(request, _etag(request, versi), buat_respons)
+            return respons_kondisional(request, versi, buat_respons, terakhir=terakhir)
+        return wrapper
+    return decorator
@@ -1,11 +1,13 @@
+from django.db.models import prefetch_related_objects
 from django.views.generic import ListView, CreateView, UpdateView, DeleteView, View
 from django.urls import reverse_lazy
-from django.db.models import Exists, OuterRef, Q
+from django.http import HttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.contrib import messages
 from django import forms
 from django.utils import timezone
 from django.contrib.auth.models import User
+from django.utils.decorators import method_decorator
 
 # REST Framework imports
 from rest_framework import viewsets, status, generics
@@ -13,9 +15,15 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny, IsAuthenticatedOrReadOnly
 from rest_framework.decorators import action
+from rest_framework_simplejwt.views import TokenObtainPairView
 from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiExample
 
-from .models import Peminjaman, Buku, Anggota
+from . import bulk, changes, counters, metrics, rollups, versions
+from .exports import CSVRenderer, NDJSONRenderer, respons_ekspor
+from .models import Peminjaman, PeminjamanArsip, Buku, Anggota, BukuSedangDipinjam
+from .pagination import AnggotaPagination, BukuPagination, PeminjamanPagination, TerlambatPagination
+from .search import PERINGKAT, cari
+from .throttling import IPTokenBucketThrottle, UsernameTokenBucketThrottle
 from .serializers import (
     PeminjamanSerializer,
     PeminjamanCreateSerializer,
@@ -23,6 +31,14 @@ from .serializers import (
     AnggotaSerializer,
     UserSerializer,
     DashboardSerializer,
+    PinjamMassalSerializer,
+    KembalikanMassalSerializer,
+    RentangAnalitikSerializer,
+    AnalitikPeminjamanSerializer,
+    AnalitikBukuSerializer,
+    AnalitikAnggotaSerializer,
+    ParamPerubahanSerializer,
+    DaftarPerubahanSerializer,
 )
 
 
@@ -100,6 +116,15 @@ class RegisterAPIView(generics.CreateAPIView):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = [AllowAny]
+    # Hashing password mahal: batasi sebelum serializer dijalankan
+    throttle_classes = [IPTokenBucketThrottle]
+    throttle_scope = 'register'
+
+
+class LoginAPIView(TokenObtainPairView):
+    """Login JWT dengan throttle per IP dan per username"""
+    throttle_classes = [IPTokenBucketThrottle, UsernameTokenBucketThrottle]
+    throttle_scope = 'login'
 
 
 @extend_schema(
@@ -137,22 +162,225 @@ class DashboardAPIView(APIView):
     permission_classes = [AllowAny]
     
     def get(self, request):
-        data = {
-            'total_buku': Buku.objects.count(),
-            'total_anggota': Anggota.objects.count(),
-            'total_dipinjam': Peminjaman.objects.filter(status_peminjaman='aktif').count(),
-            'total_selesai': Peminjaman.objects.filter(status_peminjaman='selesai').count(),
-            'buku_tersedia': Buku.objects.count() - Peminjaman.objects.filter(status_peminjaman='aktif').count(),
-        }
-        serializer = DashboardSerializer(data)
-        return Response(serializer.data)
+        # Dibaca dari tabel Penghitung (satu query), bukan COUNT(*) per tabel.
+        # Nilai penghitung sekaligus menjadi versi untuk ETag dashboard.
+        data = counters.data_dashboard()
+        return versions.respons_kondisional(
+            request, data, lambda: Response(DashboardSerializer(data, context={'request': request}).data)
+        )
+
+
+def metrik(request):
+    """Metrik latensi, query & ukuran respons per endpoint (format Prometheus)"""
+    return HttpResponse(metrics.registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+# =============================================================================
+# API VIEWS - Analitik
+# =============================================================================
+
+PARAM_RENTANG = [
+    OpenApiParameter(name='dari', description='Tanggal awal YYYY-MM-DD (default: 29 hari sebelum `sampai`)', type=str),
+    OpenApiParameter(name='sampai', description='Tanggal akhir YYYY-MM-DD (default: hari ini)', type=str),
+]
+PARAM_LIMIT = OpenApiParameter(name='limit', description='Jumlah data (default 10, maks. 100)', type=int)
+
+
+class AnalitikAPIView(APIView):
+    """
+    Dasar laporan analitik sirkulasi. Dibaca dari tabel rekap harian
+    (rollups.py), jadi biaya laporan sebanding dengan panjang rentang
+    tanggal, bukan dengan jumlah seluruh riwayat peminjaman.
+    """
+    permission_classes = [AllowAny]
+
+    def rentang(self, request):
+        serializer = RentangAnalitikSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        return serializer.validated_data
+
+
+@extend_schema(
+    tags=['Dashboard'],
+    parameters=PARAM_RENTANG + [
+        OpenApiParameter(name='per', description='Periode: hari (default) atau bulan', type=str),
+    ],
+    responses={200: AnalitikPeminjamanSerializer},
+    description='Jumlah peminjaman & pengembalian per hari atau per bulan',
+)
+@method_decorator(versions.kondisional(versions.PEMINJAMAN, harian=True), name='get')
+class AnalitikPeminjamanAPIView(AnalitikAPIView):
+    """API laporan peminjaman per periode"""
+
+    def get(self, request):
+        r = self.rentang(request)
+        data = dict(
+            dari=r['dari'], sampai=r['sampai'], per=r['per'],
+            results=rollups.per_periode(r['dari'], r['sampai'], r['per']),
+        )
+        return Response(AnalitikPeminjamanSerializer(data).data)
+
+
+@extend_schema(
+    tags=['Dashboard'],
+    parameters=PARAM_RENTANG + [PARAM_LIMIT],
+    responses={200: AnalitikBukuSerializer},
+    description='Buku yang paling sering dipinjam pada rentang tanggal',
+)
+@method_decorator(versions.kondisional(versions.BUKU, versions.PEMINJAMAN, harian=True), name='get')
+class BukuTerpopulerAPIView(AnalitikAPIView):
+    """API laporan buku terpopuler"""
+
+    def get(self, request):
+        r = self.rentang(request)
+        data = dict(
+            dari=r['dari'], sampai=r['sampai'],
+            results=rollups.buku_terpopuler(r['dari'], r['sampai'], r['limit']),
+        )
+        return Response(AnalitikBukuSerializer(data).data)
+
+
+@extend_schema(
+    tags=['Dashboard'],
+    parameters=PARAM_RENTANG + [PARAM_LIMIT],
+    responses={200: AnalitikAnggotaSerializer},
+    description='Anggota yang paling banyak meminjam pada rentang tanggal',
+)
+@method_decorator(versions.kondisional(versions.ANGGOTA, versions.PEMINJAMAN, harian=True), name='get')
+class AnggotaTeraktifAPIView(AnalitikAPIView):
+    """API laporan anggota teraktif"""
+
+    def get(self, request):
+        r = self.rentang(request)
+        data = dict(
+            dari=r['dari'], sampai=r['sampai'],
+            results=rollups.anggota_teraktif(r['dari'], r['sampai'], r['limit']),
+        )
+        return Response(AnalitikAnggotaSerializer(data).data)
+
+
+# =============================================================================
+# API VIEWS - Log Perubahan
+# =============================================================================
+
+@extend_schema(
+    tags=['Dashboard'],
+    parameters=[
+        OpenApiParameter(name='since', description='Seq terakhir yang sudah diterapkan klien (kosong = mulai baru)', type=int),
+        OpenApiParameter(name='limit', description='Maks. entri log per respons (default 500, maks. 1000)', type=int),
+    ],
+    responses={200: DaftarPerubahanSerializer},
+    description='Buku, anggota & peminjaman yang dibuat, diubah atau dihapus setelah `since`. '
+                'Simpan `seq` dari respons untuk panggilan berikutnya dan ulangi selama `ada_lanjutan`. '
+                'Jika `reset` true, muat ulang seluruh daftar lalu lanjutkan dari `seq`; '
+                'entri `reset` berarti daftar model tersebut perlu dimuat ulang.',
+)
+class PerubahanAPIView(APIView):
+    """API log perubahan untuk sinkronisasi inkremental (lihat changes.py)"""
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        serializer = ParamPerubahanSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        data = changes.sejak(serializer.validated_data.get('since'), serializer.validated_data['limit'])
+        return Response(DaftarPerubahanSerializer(data).data)
 
 
 # =============================================================================
 # API VIEWSETS - CRUD Operations
 # =============================================================================
 
+PARAM_FIELDS = OpenApiParameter(
+    name='fields', description='Hanya kirim field ini, pisahkan dengan koma (mis. id,judul)', type=str,
+)
+PARAM_EXPAND = OpenApiParameter(
+    name='expand', description='Relasi bersarang yang dikirim: buku, anggota (kosong = tidak ada)', type=str,
+)
+
+
+def queryset_buku(params):
+    """Queryset buku; anotasi ketersediaan hanya jika ditampilkan atau difilter"""
+    if 'is_available' in BukuSerializer.field_diminta(params) or 'available' in params:
+        return Buku.objects.dengan_ketersediaan()
+    return Buku.objects.all()
+
+
+def queryset_anggota(params):
+    """Queryset anggota; anotasi total_peminjaman hanya jika ditampilkan"""
+    if 'total_peminjaman' in AnggotaSerializer.field_diminta(params):
+        return Anggota.objects.dengan_total_peminjaman()
+    return Anggota.objects.all()
+
+
+def queryset_peminjaman(params):
+    """Queryset peminjaman; buku/anggota hanya di-join jika di-expand (?expand=)"""
+    diminta = PeminjamanSerializer.field_diminta(params)
+    return Peminjaman.objects.dengan_detail(buku='buku_detail' in diminta, anggota='anggota_detail' in diminta)
+
+
+def queryset_riwayat(params):
+    """
+    Queryset tabel aktif & arsip untuk riwayat peminjaman (lihat arsip.py).
+    Filter yang sama diterapkan ke keduanya.
+    """
+    diminta = PeminjamanSerializer.field_diminta(params)
+    detail = dict(buku='buku_detail' in diminta, anggota='anggota_detail' in diminta)
+    return [Peminjaman.objects.dengan_detail(**detail), PeminjamanArsip.objects.dengan_detail(**detail)]
+
+
+def filter_buku(queryset, params):
+    """Filter ?search= dan ?available= untuk daftar buku (sync & async)"""
+    # Filter berdasarkan pencarian (indeks full-text, urut relevansi)
+    search = params.get('search', None)
+    if search:
+        queryset = cari(queryset, search)
+    
+    # Filter berdasarkan ketersediaan (anotasi sudah_dipinjam memakai
+    # partial index peminjaman_aktif_unik)
+    available = params.get('available', None)
+    if available is not None:
+        if available.lower() == 'true':
+            # Buku yang tidak sedang dipinjam
+            queryset = queryset.filter(sudah_dipinjam=False)
+        elif available.lower() == 'false':
+            # Buku yang sedang dipinjam
+            queryset = queryset.filter(sudah_dipinjam=True)
+    
+    return queryset
+
+
+def filter_anggota(queryset, params):
+    """Filter ?search= untuk daftar anggota (sync & async)"""
+    # Filter berdasarkan pencarian (indeks full-text, urut relevansi)
+    search = params.get('search', None)
+    if search:
+        queryset = cari(queryset, search)
+    return queryset
+
+
+def filter_peminjaman(queryset, params):
+    """Filter ?status=, ?anggota= dan ?buku= untuk daftar & ekspor peminjaman"""
+    # Filter berdasarkan status
+    status_filter = params.get('status', None)
+    if status_filter:
+        queryset = queryset.filter(status_peminjaman=status_filter)
+    
+    # Filter berdasarkan anggota
+    anggota_id = params.get('anggota', None)
+    if anggota_id:
+        queryset = queryset.filter(anggota_id=anggota_id)
+    
+    # Filter berdasarkan buku
+    buku_id = params.get('buku', None)
+    if buku_id:
+        queryset = queryset.filter(buku_id=buku_id)
+    
+    return queryset
+
+
 @extend_schema(tags=['Buku'])
+@method_decorator(versions.kondisional(versions.BUKU, versions.PEMINJAMAN, cache_anonim=True), name='list')
+@method_decorator(versions.kondisional(versions.BUKU, versions.PEMINJAMAN, cache_anonim=True), name='retrieve')
 class BukuViewSet(viewsets.ModelViewSet):
     """
     ViewSet untuk operasi CRUD pada Buku.
@@ -167,42 +395,16 @@ class BukuViewSet(viewsets.ModelViewSet):
     queryset = Buku.objects.all()
     serializer_class = BukuSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
+    pagination_class = BukuPagination
     
     def get_queryset(self):
-        queryset = Buku.objects.all()
-        
-        # Filter berdasarkan pencarian
-        search = self.request.query_params.get('search', None)
-        if search:
-            queryset = queryset.filter(
-                Q(judul__icontains=search) |
-                Q(penulis__icontains=search)
-            )
-        
-        # Filter berdasarkan ketersediaan
-        available = self.request.query_params.get('available', None)
-        if available is not None:
-            if available.lower() == 'true':
-                # Buku yang tidak sedang dipinjam
-                queryset = queryset.exclude(
-                    id__in=Peminjaman.objects.filter(
-                        status_peminjaman='aktif'
-                    ).values_list('buku_id', flat=True)
-                )
-            elif available.lower() == 'false':
-                # Buku yang sedang dipinjam
-                queryset = queryset.filter(
-                    id__in=Peminjaman.objects.filter(
-                        status_peminjaman='aktif'
-                    ).values_list('buku_id', flat=True)
-                )
-        
-        return queryset
+        return filter_buku(queryset_buku(self.request.query_params), self.request.query_params)
     
     @extend_schema(
         parameters=[
-            OpenApiParameter(name='search', description='Cari berdasarkan judul atau penulis', type=str),
+            OpenApiParameter(name='search', description='Cari berdasarkan judul, penulis atau tahun (prefix, urut relevansi)', type=str),
             OpenApiParameter(name='available', description='Filter ketersediaan (true/false)', type=str),
+            PARAM_FIELDS,
         ]
     )
     def list(self, request, *args, **kwargs):
@@ -210,6 +412,8 @@ class BukuViewSet(viewsets.ModelViewSet):
 
 
 @extend_schema(tags=['Anggota'])
+@method_decorator(versions.kondisional(versions.ANGGOTA, versions.PEMINJAMAN, cache_anonim=True), name='list')
+@method_decorator(versions.kondisional(versions.ANGGOTA, versions.PEMINJAMAN, cache_anonim=True), name='retrieve')
 class AnggotaViewSet(viewsets.ModelViewSet):
     """
     ViewSet untuk operasi CRUD pada Anggota.
@@ -224,23 +428,15 @@ class AnggotaViewSet(viewsets.ModelViewSet):
     queryset = Anggota.objects.all()
     serializer_class = AnggotaSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
+    pagination_class = AnggotaPagination
     
     def get_queryset(self):
-        queryset = Anggota.objects.all()
-        
-        # Filter berdasarkan pencarian
-        search = self.request.query_params.get('search', None)
-        if search:
-            queryset = queryset.filter(
-                Q(nama__icontains=search) |
-                Q(email__icontains=search)
-            )
-        
-        return queryset
+        return filter_anggota(queryset_anggota(self.request.query_params), self.request.query_params)
     
     @extend_schema(
         parameters=[
-            OpenApiParameter(name='search', description='Cari berdasarkan nama atau email', type=str),
+            OpenApiParameter(name='search', description='Cari berdasarkan nama atau email (prefix, urut relevansi)', type=str),
+            PARAM_FIELDS,
         ]
     )
     def list(self, request, *args, **kwargs):
@@ -248,18 +444,52 @@ class AnggotaViewSet(viewsets.ModelViewSet):
     
     @extend_schema(
         description='Mendapatkan riwayat peminjaman anggota',
+        parameters=[
+            OpenApiParameter(name='cursor', description='Cursor halaman berikutnya/sebelumnya', type=str),
+            OpenApiParameter(name='page_size', description='Jumlah data per halaman (maks. 100)', type=int),
+        ],
         responses={200: PeminjamanSerializer(many=True)}
     )
     @action(detail=True, methods=['get'])
     def riwayat(self, request, pk=None):
         """Mendapatkan riwayat peminjaman anggota tertentu"""
         anggota = self.get_object()
-        peminjaman = Peminjaman.objects.filter(anggota=anggota).order_by('-tanggal_pinjam')
-        serializer = PeminjamanSerializer(peminjaman, many=True)
-        return Response(serializer.data)
+        # Tabel aktif + arsip, masing-masing range scan index (anggota, -tanggal_pinjam, -id)
+        querysets = [qs.filter(anggota=anggota) for qs in queryset_riwayat(request.query_params)]
+        
+        # Riwayat memakai cursor peminjaman (-tanggal_pinjam, -id), bukan cursor anggota
+        paginator = PeminjamanPagination()
+        page = paginator.paginate_querysets(querysets, request, view=self)
+        serializer = PeminjamanSerializer(page, many=True, context=self.get_serializer_context())
+        return paginator.get_paginated_response(serializer.data)
+    
+    @extend_schema(
+        description='Ekspor riwayat peminjaman anggota (stream) sebagai CSV atau NDJSON',
+        parameters=[
+            OpenApiParameter(name='format', description='csv (default) atau ndjson', type=str),
+            OpenApiParameter(name='status', description='Filter berdasarkan status (aktif/selesai)', type=str),
+            OpenApiParameter(name='buku', description='Filter berdasarkan ID buku', type=int),
+        ],
+        responses={(200, 'text/csv'): str, (200, 'application/x-ndjson'): str},
+    )
+    @action(detail=True, methods=['get'], url_path='riwayat/export', renderer_classes=[CSVRenderer, NDJSONRenderer])
+    def riwayat_export(self, request, pk=None):
+        """Ekspor riwayat peminjaman anggota sebagai CSV/NDJSON"""
+        anggota = get_object_or_404(Anggota, pk=pk)
+        querysets = [
+            filter_peminjaman(model.objects.filter(anggota=anggota).order_by('-tanggal_pinjam', '-id'), request.query_params)
+            for model in (Peminjaman, PeminjamanArsip)
+        ]
+        return respons_ekspor(querysets, request.accepted_renderer.format, f'riwayat-anggota-{anggota.pk}')
 
 
 @extend_schema(tags=['Peminjaman'])
+@method_decorator(versions.kondisional(versions.BUKU, versions.ANGGOTA, versions.PEMINJAMAN), name='list')
+@method_decorator(versions.kondisional(versions.BUKU, versions.ANGGOTA, versions.PEMINJAMAN), name='retrieve')
+# Daftar terlambat juga berubah saat tanggal berganti
+@method_decorator(
+    versions.kondisional(versions.BUKU, versions.ANGGOTA, versions.PEMINJAMAN, harian=True), name='overdue'
+)
 class PeminjamanViewSet(viewsets.ModelViewSet):
     """
     ViewSet untuk operasi CRUD pada Peminjaman.
@@ -273,6 +503,7 @@ class PeminjamanViewSet(viewsets.ModelViewSet):
     """
     queryset = Peminjaman.objects.all()
     permission_classes = [IsAuthenticatedOrReadOnly]
+    pagination_class = PeminjamanPagination
     
     def get_serializer_class(self):
         if self.action == 'create':
@@ -280,34 +511,95 @@ class PeminjamanViewSet(viewsets.ModelViewSet):
         return PeminjamanSerializer
     
     def get_queryset(self):
-        queryset = Peminjaman.objects.all().order_by('-tanggal_pinjam')
-        
-        # Filter berdasarkan status
-        status_filter = self.request.query_params.get('status', None)
-        if status_filter:
-            queryset = queryset.filter(status_peminjaman=status_filter)
-        
-        # Filter berdasarkan anggota
-        anggota_id = self.request.query_params.get('anggota', None)
-        if anggota_id:
-            queryset = queryset.filter(anggota_id=anggota_id)
-        
-        # Filter berdasarkan buku
-        buku_id = self.request.query_params.get('buku', None)
-        if buku_id:
-            queryset = queryset.filter(buku_id=buku_id)
-        
-        return queryset
+        queryset = queryset_peminjaman(self.request.query_params).order_by('-tanggal_pinjam')
+        return filter_peminjaman(queryset, self.request.query_params)
     
     @extend_schema(
         parameters=[
             OpenApiParameter(name='status', description='Filter berdasarkan status (aktif/selesai)', type=str),
             OpenApiParameter(name='anggota', description='Filter berdasarkan ID anggota', type=int),
             OpenApiParameter(name='buku', description='Filter berdasarkan ID buku', type=int),
+            PARAM_FIELDS,
+            PARAM_EXPAND,
         ]
     )
     def list(self, request, *args, **kwargs):
         return super().list(request, *args, **kwargs)
+    
+    @extend_schema(
+        description='Peminjaman aktif yang sudah lewat jatuh tempo per hari ini, '
+                    'urut jatuh tempo terlama lebih dulu.',
+        parameters=[
+            OpenApiParameter(name='cursor', description='Cursor halaman berikutnya/sebelumnya', type=str),
+            OpenApiParameter(name='page_size', description='Jumlah data per halaman (maks. 100)', type=int),
+            PARAM_FIELDS,
+            PARAM_EXPAND,
+        ],
+        responses={200: PeminjamanSerializer(many=True)},
+    )
+    @action(detail=False, methods=['get'])
+    def overdue(self, request):
+        """Daftar peminjaman terlambat (range scan index peminjaman_terlambat_idx)"""
+        queryset = queryset_peminjaman(request.query_params).terlambat(timezone.localdate())
+        paginator = TerlambatPagination()
+        page = paginator.paginate_queryset(queryset, request, view=self)
+        serializer = PeminjamanSerializer(page, many=True, context=self.get_serializer_context())
+        return paginator.get_paginated_response(serializer.data)
+    
+    @extend_schema(
+        description='Ekspor seluruh peminjaman (stream) sebagai CSV atau NDJSON. '
+                    'Mendukung filter yang sama dengan daftar peminjaman.',
+        parameters=[
+            OpenApiParameter(name='format', description='csv (default) atau ndjson', type=str),
+            OpenApiParameter(name='status', description='Filter berdasarkan status (aktif/selesai)', type=str),
+            OpenApiParameter(name='anggota', description='Filter berdasarkan ID anggota', type=int),
+            OpenApiParameter(name='buku', description='Filter berdasarkan ID buku', type=int),
+        ],
+        responses={(200, 'text/csv'): str, (200, 'application/x-ndjson'): str},
+    )
+    @action(detail=False, methods=['get'], renderer_classes=[CSVRenderer, NDJSONRenderer])
+    def export(self, request):
+        """Ekspor peminjaman (termasuk arsip) sebagai CSV/NDJSON"""
+        querysets = [
+            filter_peminjaman(model.objects.order_by('-tanggal_pinjam', '-id'), request.query_params)
+            for model in (Peminjaman, PeminjamanArsip)
+        ]
+        return respons_ekspor(querysets, request.accepted_renderer.format, 'peminjaman')
+    
+    @extend_schema(
+        description='Meminjam banyak buku sekaligus dalam satu transaksi. '
+                    'Hasil dilaporkan per item (201 berhasil, 400 gagal).',
+        request=PinjamMassalSerializer,
+        examples=[OpenApiExample('Pinjam massal', value={'items': [
+            {'buku': 1, 'anggota': 1, 'tanggal_pinjam': '2026-01-29'},
+            {'buku': 2, 'anggota': 1, 'tanggal_pinjam': '2026-01-29'},
+        ]}, request_only=True)],
+    )
+    @action(detail=False, methods=['post'], url_path='pinjam-massal', permission_classes=[IsAuthenticated])
+    def pinjam_massal(self, request):
+        """Meminjam banyak buku sekaligus"""
+        serializer = PinjamMassalSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        hasil = bulk.pinjam_massal(serializer.validated_data['items'], context=self.get_serializer_context())
+        return Response(self._ringkasan_massal(hasil))
+    
+    @extend_schema(
+        description='Mengembalikan banyak peminjaman sekaligus dalam satu transaksi. '
+                    'Hasil dilaporkan per item (200 berhasil, 400/404 gagal).',
+        request=KembalikanMassalSerializer,
+        examples=[OpenApiExample('Kembalikan massal', value={'ids': [1, 2, 3]}, request_only=True)],
+    )
+    @action(detail=False, methods=['post'], url_path='kembalikan-massal', permission_classes=[IsAuthenticated])
+    def kembalikan_massal(self, request):
+        """Mengembalikan banyak buku sekaligus"""
+        serializer = KembalikanMassalSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        hasil = bulk.kembalikan_massal(serializer.validated_data['ids'], context=self.get_serializer_context())
+        return Response(self._ringkasan_massal(hasil))
+    
+    def _ringkasan_massal(self, hasil):
+        berhasil = sum(1 for item in hasil if item['status'] < 400)
+        return {'berhasil': berhasil, 'gagal': len(hasil) - berhasil, 'results': hasil}
 
 
 @extend_schema(
@@ -343,10 +635,39 @@ class KembalikanPeminjamanAPIView(APIView):
 # TEMPLATE-BASED VIEWS (untuk backward compatibility)
 # =============================================================================
 
+def versi_relasi():
+    """
+    Bagian kunci cache fragmen baris peminjaman untuk judul buku & nama
+    anggota (lihat Peminjaman.kunci_tampilan untuk data peminjamannya).
+    """
+    versi = versions.baca(versions.BUKU, versions.ANGGOTA)
+    return f'{versi[versions.BUKU]}.{versi[versions.ANGGOTA]}'
+
+
 class PeminjamanListView(ListView):
     model = Peminjaman
     template_name = 'iventaris_app/peminjaman_list.html'
     context_object_name = 'peminjaman_list'
+    paginate_by = 50
+
+    def get_queryset(self):
+        # Buku & anggota ikut di-join (judul, nama, __str__ tanpa query per baris)
+        return Peminjaman.objects.select_related('buku', 'anggota').order_by('-tanggal_pinjam', '-id')
+
+    def get_paginator(self, queryset, per_page, **kwargs):
+        paginator = super().get_paginator(queryset, per_page, **kwargs)
+        # Jumlah peminjaman dari tabel penghitung, bukan COUNT(*) seluruh tabel.
+        # Daftar ini hanya tabel aktif, jadi yang sudah diarsipkan tidak dihitung.
+        nilai = counters.baca()
+        paginator.count = (
+            nilai[counters.PEMINJAMAN_AKTIF] + nilai[counters.PEMINJAMAN_SELESAI] - nilai[counters.PEMINJAMAN_ARSIP]
+        )
+        return paginator
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['versi_relasi'] = versi_relasi()
+        return context
 
 
 class PeminjamanCreateView(CreateView):
@@ -385,24 +706,14 @@ class BukuListView(ListView):
     model = Buku
     template_name = 'iventaris_app/buku_list.html'
     context_object_name = 'buku_list'
+    paginate_by = 50
 
     def get_queryset(self):
-        queryset = Buku.objects.annotate(
-            sudah_dipinjam=Exists(
-                Peminjaman.objects.filter(
-                    buku=OuterRef('pk'),
-                    status_peminjaman='aktif'
-                )
-            )
-        )
+        queryset = Buku.objects.dengan_ketersediaan()
         q = self.request.GET.get('q')
         if q:
-            queryset = queryset.filter(
-                Q(judul__icontains=q) |
-                Q(penulis__icontains=q) |
-                Q(tahun__icontains=q)
-            )
-        return queryset
+            return cari(queryset, q).order_by(PERINGKAT, 'id')
+        return queryset.order_by('id')
 
 
 class BukuCreateView(CreateView):
@@ -446,22 +757,19 @@ class PeminjamanBukuCreateView(CreateView):
         buku_id = self.kwargs.get('buku_id')
         buku = get_object_or_404(Buku, pk=buku_id)
         
-        # Cek apakah buku sedang AKTIF dipinjam
-        sudah_dipinjam = Peminjaman.objects.filter(
-            buku=buku, 
-            status_peminjaman='aktif'
-        ).exists()
-        
-        if sudah_dipinjam:
-            form.add_error(None, f"❌ Buku '{buku.judul}' sedang dipinjam oleh anggota lain!")
-            return self.form_invalid(form)
-        
         # Set data peminjaman
         form.instance.buku = buku
         form.instance.status_peminjaman = 'aktif'
         
+        # Buku yang sedang AKTIF dipinjam ditolak oleh constraint peminjaman_aktif_unik
+        try:
+            response = super().form_valid(form)
+        except BukuSedangDipinjam:
+            form.add_error(None, f"❌ Buku '{buku.judul}' sedang dipinjam oleh anggota lain!")
+            return self.form_invalid(form)
+        
         messages.success(self.request, f"✅ Peminjaman '{buku.judul}' berhasil disimpan!")
-        return super().form_valid(form)
+        return response
 
 
 class AnggotaCreateView(CreateView):
@@ -486,15 +794,14 @@ class KembalikanPeminjamanView(View):
 
 
 def dashboard(request):
-    total_buku = Buku.objects.count()
-    total_anggota = Anggota.objects.count()
-    total_dipinjam = Peminjaman.objects.filter(status_peminjaman='aktif').count()
-    total_selesai = Peminjaman.objects.filter(status_peminjaman='selesai').count()
+    data = counters.data_dashboard()
     return render(request, 'iventaris_app/dashboard.html', {
-        'total_buku': total_buku,
-        'total_anggota': total_anggota,
-        'total_dipinjam': total_dipinjam,
-        'total_selesai': total_selesai,
+        'total_buku': data['total_buku'],
+        'total_anggota': data['total_anggota'],
+        'total_dipinjam': data['total_dipinjam'],
+        'total_selesai': data['total_selesai'],
+        'total_terlambat': data['total_terlambat'],
+        'terlambat_per': data['terlambat_per'],
     })
 
 
@@ -502,7 +809,31 @@ class RiwayatPeminjamanListView(ListView):
     model = Peminjaman
     template_name = 'iventaris_app/riwayat_peminjaman.html'
     context_object_name = 'riwayat_list'
+    paginate_by = 50
+
+    KOLOM = ['id', 'buku_id', 'anggota_id', 'tanggal_pinjam', 'tanggal_kembali', 'jatuh_tempo', 'status_peminjaman']
 
     def get_queryset(self):
+        # UNION tabel aktif & arsip; LIMIT/OFFSET halaman berlaku pada gabungannya
         anggota_id = self.kwargs.get('anggota_id')
-        return Peminjaman.objects.filter(anggota_id=anggota_id).order_by('-tanggal_pinjam')
\ No newline at end of file
+        aktif, arsip = (
+            model.objects.filter(anggota_id=anggota_id).order_by().values(*self.KOLOM)
+            for model in (Peminjaman, PeminjamanArsip)
+        )
+        self.jumlah = [aktif, arsip]
+        return aktif.union(arsip, all=True).order_by('-tanggal_pinjam', '-id')
+
+    def get_paginator(self, queryset, per_page, **kwargs):
+        paginator = super().get_paginator(queryset, per_page, **kwargs)
+        # Dua COUNT lewat index anggota, bukan COUNT(*) atas hasil UNION
+        paginator.count = sum(qs.count() for qs in self.jumlah)
+        return paginator
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        # Baris halaman ini saja yang dijadikan objek, buku diambil satu query
+        riwayat = [Peminjaman(**baris) for baris in context['page_obj'].object_list]
+        prefetch_related_objects(riwayat, 'buku')
+        context['riwayat_list'] = context['object_list'] = riwayat
+        context['versi_relasi'] = versi_relasi()
+        return context
\ No newline at end of file